@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from bookings.instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('bookings.urls')),
     path('api/', include('bookings.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,9 +1,37 @@
+from django import forms
 from django.contrib import admin
-from .models import Booking
+from django.utils import timezone
+from .models import (
+    ArchivedBooking, AvailabilityCheckTask, AvailabilityResponse, Booking, BookingArchiveSegment, BookingSeries,
+)
+from .search import get_search_backend
+from .slot_locks import SLOT_FIELDS, conflicts_message, lock_for_update
+
+
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+
+    def clean(self):
+        """
+        Проверяет пересечения под блокировкой слота
+
+        Админка выполняет валидацию и сохранение в одной транзакции
+        (changeform_view), поэтому блокировка держится до save().
+        """
+        cleaned_data = super().clean()
+        fields = {name: cleaned_data.get(name, getattr(self.instance, name)) for name in SLOT_FIELDS}
+        if not self.errors and all(value is not None for value in fields.values()):
+            conflicts = lock_for_update(self.instance.pk, fields)
+            if conflicts:
+                raise forms.ValidationError(conflicts_message(conflicts))
+        return cleaned_data
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = [
         'id',
         'room_number',
@@ -15,22 +43,84 @@ class BookingAdmin(admin.ModelAdmin):
         'status',
         'created_at'
     ]
-    list_filter = ['status', 'booking_type', 'booking_date', 'created_at']
+    list_filter = ['status', 'booking_type', 'check_available', 'check_error', 'booking_date', 'created_at']
     search_fields = ['user_email', 'room_number', 'purpose']
-    readonly_fields = ['created_at', 'updated_at', 'availability_check_response']
+    readonly_fields = [
+        'created_at', 'updated_at', 'check_success', 'check_available', 'check_error', 'availability_check_response',
+    ]
+    raw_id_fields = ['series']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск через индекс (bookings/search.py) вместо LIKE '%...%' по search_fields
+        if not search_term:
+            return queryset, False
+        return get_search_backend().filter(queryset, search_term), False
 
     fieldsets = (
         ('Информация о пользователе', {
             'fields': ('user_email',)
         }),
         ('Детали бронирования', {
-            'fields': ('room_number', 'booking_date', 'start_time', 'end_time', 'booking_type', 'purpose')
+            'fields': ('room_number', 'booking_date', 'start_time', 'end_time', 'booking_type', 'purpose', 'series')
         }),
         ('Статус', {
-            'fields': ('status', 'availability_check_response')
+            'fields': ('status', 'check_success', 'check_available', 'check_error', 'availability_check_response')
         }),
         ('Метаданные', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(AvailabilityCheckTask)
+class AvailabilityCheckTaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'booking', 'status', 'attempts', 'available_at', 'locked_by', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['=request_id']
+    readonly_fields = ['created_at', 'updated_at', 'last_error', 'request_id']
+    raw_id_fields = ['booking']
+    actions = ['requeue']
+
+    @admin.action(description='Вернуть в очередь')
+    def requeue(self, request, queryset):
+        updated = queryset.update(
+            status='queued',
+            attempts=0,
+            available_at=timezone.now(),
+            locked_by='',
+            locked_until=None,
+        )
+        self.message_user(request, f'Возвращено в очередь задач: {updated}')
+
+
+@admin.register(AvailabilityResponse)
+class AvailabilityResponseAdmin(admin.ModelAdmin):
+    list_display = ['id', 'digest', 'compression', 'size', 'created_at']
+    list_filter = ['compression']
+    search_fields = ['=digest']
+    fields = ['digest', 'compression', 'size', 'data', 'created_at']
+    readonly_fields = fields
+
+
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ['id', 'room_number', 'start_time', 'end_time', 'frequency', 'start_date', 'until',
+                    'count', 'user_email', 'status']
+    list_filter = ['status', 'frequency', 'booking_type']
+    search_fields = ['user_email', 'room_number', 'purpose']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(BookingArchiveSegment)
+class BookingArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'file_name', 'compression', 'date_from', 'date_to', 'row_count', 'size_bytes', 'created_at']
+    list_filter = ['compression']
+    readonly_fields = ['file_name', 'compression', 'date_from', 'date_to', 'row_count', 'size_bytes', 'created_at']
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['booking_id', 'user_email', 'booking_date', 'segment']
+    search_fields = ['=booking_id', 'user_email']
+    raw_id_fields = ['segment']
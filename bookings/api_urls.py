@@ -1,12 +1,26 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api_views import BookingViewSet, CreateBookingView, HealthCheckView
+from .api_views import (
+    AsyncCreateBookingView,
+    BookingSeriesViewSet,
+    BookingViewSet,
+    BulkCreateBookingView,
+    CircuitBreakerStatusView,
+    CreateBookingView,
+    HealthCheckView,
+    OccupancyView
+)
 
 router = DefaultRouter()
 router.register(r'bookings', BookingViewSet, basename='booking')
+router.register(r'booking-series', BookingSeriesViewSet, basename='booking-series')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('create-booking/', CreateBookingView.as_view(), name='api_create_booking'),
+    path('bulk-create-booking/', BulkCreateBookingView.as_view(), name='api_bulk_create_booking'),
+    path('async/create-booking/', AsyncCreateBookingView.as_view(), name='api_async_create_booking'),
+    path('availability/circuit-breaker/', CircuitBreakerStatusView.as_view(), name='api_circuit_breaker'),
+    path('occupancy/', OccupancyView.as_view(), name='api_occupancy'),
     path('health/', HealthCheckView.as_view(), name='api_health'),
 ]
\ No newline at end of file
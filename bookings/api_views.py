@@ -1,26 +1,65 @@
+import json
+from collections import Counter
+from datetime import date
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
-from .models import Booking
-from .serializers import BookingSerializer, BookingCreateSerializer
-from .services import BookingService
+from .archive import get_archived_booking
+from .async_services import async_booking_service
+from .circuit_breaker import get_availability_breaker
+from .db_router import ReplicaReadMixin
+from .export import stream_csv, stream_ndjson
+from .fast_serializers import DETAIL_FIELDS, LIST_FIELDS, BookingRowSerializer, parse_fields
+from .http_cache import cached_api_response
+from .models import Booking, BookingSeries
+from .occupancy import occupancy_service
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .renderers import CSVPassthroughRenderer, NDJSONPassthroughRenderer
+from .recurrence import booking_series_service
+from .search import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, get_search_backend, parse_terms
+from .serializers import (
+    BookingCreateSerializer,
+    BookingSerializer,
+    BookingSeriesCreateSerializer,
+    BookingSeriesSerializer,
+)
+from .services import get_booking_service
+from .slot_locks import SLOT_FIELDS, conflicts_message, lock_for_update
+from .stats import booking_stats_service
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с бронированиями
 
     Endpoints:
-    - GET /api/bookings/ - список всех бронирований
+    - GET /api/bookings/ - список бронирований (keyset-пагинация: ?cursor=...&page_size=...)
     - GET /api/bookings/{id}/ - детали бронирования
+
+    Для list и retrieve можно выбрать поля: ?fields=id,status,start_time.
+    В списке по умолчанию нет availability_check_response.
     - POST /api/bookings/ - создание бронирования (не используется, см. CreateBookingView)
     - DELETE /api/bookings/{id}/ - удаление бронирования
+    - GET /api/bookings/export/?format=ndjson|csv - потоковая выгрузка
+    - GET /api/bookings/search/?q=... - поиск с ранжированием
     """
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Фильтрация по email пользователя, если указан"""
@@ -32,24 +71,278 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def perform_update(self, serializer):
+        """PUT/PATCH подтверждённого бронирования — под той же блокировкой слота, что и подтверждение"""
+        booking = serializer.instance
+        fields = {name: serializer.validated_data.get(name, getattr(booking, name)) for name in SLOT_FIELDS}
+        with transaction.atomic():
+            conflicts = lock_for_update(booking.pk, fields)
+            if conflicts:
+                raise ValidationError(conflicts_message(conflicts))
+            serializer.save()
+
+    def list(self, request, *args, **kwargs):
+        """Список с условным GET и кэшем ответа (см. bookings/http_cache.py)"""
+        return cached_api_response(
+            self, request, lambda: self._list(request),
+            user_email=request.query_params.get('user_email') or None,
+        )
+
+    def _list(self, request):
+        """Список через .values() и BookingRowSerializer, без объектов модели"""
+        try:
+            row_serializer = BookingRowSerializer(parse_fields(request.query_params.get('fields'), LIST_FIELDS))
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*row_serializer.columns('created_at', 'id')))
+        return self.get_paginated_response(row_serializer.serialize(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_api_response(self, request, lambda: self._retrieve(request, kwargs['pk']))
+
+    def _retrieve(self, request, pk):
+        try:
+            row_serializer = BookingRowSerializer(parse_fields(request.query_params.get('fields'), DETAIL_FIELDS))
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        row = self.get_queryset().values(*row_serializer.columns()).filter(pk=pk).first()
+        if row is not None:
+            return Response(row_serializer.serialize([row])[0])
+
+        # Бронирования прошлых дат могли быть перенесены в архив (manage.py archive_bookings)
+        archived = get_archived_booking(pk, self.request.query_params.get('user_email') or None)
+        if archived is None:
+            raise Http404
+        return Response({name: archived[name] for name in row_serializer.fields})
+
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[NDJSONPassthroughRenderer, CSVPassthroughRenderer],
+    )
+    def export(self, request):
+        """
+        Потоковая выгрузка бронирований
+        GET /api/bookings/export/?format=ndjson|csv
+
+        Фильтры те же, что у списка (user_email).
+        """
+        queryset = self.get_queryset()
+
+        if request.accepted_renderer.format == 'csv':
+            content, content_type, extension = stream_csv(queryset), 'text/csv', 'csv'
+        else:
+            content, content_type, extension = stream_ndjson(queryset), 'application/x-ndjson', 'ndjson'
+
+        response = StreamingHttpResponse(content, content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="bookings.{extension}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Поиск по аудитории, email и цели бронирования
+        GET /api/bookings/search/?q=ivanov лекц&page_size=20&offset=0
+
+        Слова запроса ищутся как префиксы, результаты упорядочены по
+        релевантности (bookings/search.py). Необязательные фильтры:
+        user_email, status; поля — ?fields= как у списка.
+        """
+        return cached_api_response(
+            self, request, lambda: self._search(request),
+            user_email=request.query_params.get('user_email') or None,
+        )
+
+    def _search(self, request):
+        params = request.query_params
+        query = params.get('q', '')
+        if not parse_terms(query):
+            return Response({
+                'success': False,
+                'message': 'Укажите поисковый запрос: ?q=...'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            row_serializer = BookingRowSerializer(parse_fields(params.get('fields'), LIST_FIELDS))
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page_size = max(1, min(int(params.get('page_size', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE))
+            offset = max(0, int(params.get('offset', 0)))
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'page_size и offset должны быть целыми числами'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {name: params[name] for name in ('user_email', 'status') if params.get(name)}
+        # Лишняя строка показывает, есть ли следующая страница
+        ids = get_search_backend().ranked_ids(query, filters, page_size + 1, offset)
+        has_more = len(ids) > page_size
+        ids = ids[:page_size]
+
+        rows = {row['id']: row for row in Booking.objects.filter(pk__in=ids).values(*row_serializer.columns('id'))}
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'offset', offset + page_size) if has_more else None,
+            'previous': replace_query_param(url, 'offset', max(0, offset - page_size)) if offset else None,
+            'results': row_serializer.serialize(rows[booking_id] for booking_id in ids if booking_id in rows),
+        })
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """
         Статистика бронирований
         GET /api/bookings/stats/
+
+        Необязательные параметры: room_number, date_from, date_to, booking_type,
+        group_by=room|booking_type|date
         """
-        total = Booking.objects.count()
-        confirmed = Booking.objects.filter(status='confirmed').count()
-        rejected = Booking.objects.filter(status='rejected').count()
-        pending = Booking.objects.filter(status='pending').count()
+        return cached_api_response(self, request, lambda: self._stats(request))
+
+    def _stats(self, request):
+        params = request.query_params
+        try:
+            stats = booking_stats_service.get_stats(
+                room_number=params.get('room_number'),
+                date_from=params.get('date_from'),
+                date_to=params.get('date_to'),
+                booking_type=params.get('booking_type'),
+                group_by=params.get('group_by'),
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except DjangoValidationError as e:
+            return Response({
+                'success': False,
+                'message': ' '.join(e.messages)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(stats)
+
+
+class BookingSeriesViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet для серий повторяющихся бронирований
+
+    Endpoints:
+    - GET /api/booking-series/ - список серий
+    - GET /api/booking-series/{id}/ - детали серии
+    - POST /api/booking-series/ - создание серии и всех её вхождений
+    - PATCH /api/booking-series/{id}/?from_date=... - изменение серии с указанной даты
+    - POST /api/booking-series/{id}/cancel/?from_date=... - отмена серии
+
+    Request body (POST):
+    {
+        "user_email": "user@example.com",
+        "room_number": "101",
+        "start_time": "10:00",
+        "end_time": "11:30",
+        "booking_type": "lesson",
+        "frequency": "weekly",
+        "weekdays": [0, 3],
+        "start_date": "2026-09-01",
+        "until": "2026-12-25"
+    }
+    """
+    queryset = BookingSeries.objects.all()
+    serializer_class = BookingSeriesSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        """Фильтрация по email пользователя, если указан"""
+        queryset = BookingSeries.objects.all()
+        user_email = self.request.query_params.get('user_email', None)
+
+        if user_email:
+            queryset = queryset.filter(user_email=user_email)
+
+        return queryset
+
+    def create(self, request):
+        serializer = BookingSeriesCreateSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Ошибка валидации данных',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        series, created = booking_series_service.create_series(serializer.validated_data)
 
         return Response({
-            'total': total,
-            'confirmed': confirmed,
-            'rejected': rejected,
-            'pending': pending
+            'success': True,
+            'series': BookingSeriesSerializer(series).data,
+            **BulkCreateBookingView.summarize(created)
+        }, status=status.HTTP_201_CREATED)
+
+    def partial_update(self, request, pk=None):
+        series = self.get_object()
+        if series.status == 'cancelled':
+            return Response({
+                'success': False,
+                'message': 'Серия отменена'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            from_date = self._from_date(request)
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Изменения накладываются на текущие значения и проверяются целиком
+        data = {**BookingSeriesCreateSerializer(series).data, **request.data}
+        serializer = BookingSeriesCreateSerializer(data=data)
+
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Ошибка валидации данных',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        series, created = booking_series_service.update_series(
+            series, serializer.validated_data, from_date=from_date
+        )
+
+        return Response({
+            'success': True,
+            'series': BookingSeriesSerializer(series).data,
+            **BulkCreateBookingView.summarize(created)
         })
 
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Отмена серии и её вхождений начиная с from_date (по умолчанию — с сегодняшнего дня)"""
+        series = self.get_object()
+        try:
+            from_date = self._from_date(request)
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cancelled = booking_series_service.cancel_series(series, from_date=from_date)
+
+        return Response({
+            'success': True,
+            'series': BookingSeriesSerializer(series).data,
+            'cancelled': cancelled
+        })
+
+    @staticmethod
+    def _from_date(request):
+        value = request.query_params.get('from_date') or request.data.get('from_date')
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Некорректная дата from_date, ожидается YYYY-MM-DD')
+
 
 class CreateBookingView(APIView):
     """
@@ -88,7 +381,7 @@ class CreateBookingView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         booking_data = serializer.validated_data
-        booking_service = BookingService()
+        booking_service = get_booking_service()
 
         try:
             booking, availability_result = booking_service.create_booking(booking_data)
@@ -98,7 +391,7 @@ class CreateBookingView(APIView):
                 'message': self._get_success_message(booking, availability_result),
                 'booking': BookingSerializer(booking).data,
                 'availability_check': availability_result
-            }, status=status.HTTP_201_CREATED)
+            }, status=self._get_status_code(booking))
 
         except Exception as e:
             return Response({
@@ -106,14 +399,224 @@ class CreateBookingView(APIView):
                 'message': f'Ошибка при создании бронирования: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _get_status_code(booking):
+        """202 для бронирования, ожидающего проверки в очереди"""
+        if booking.status == 'pending':
+            return status.HTTP_202_ACCEPTED
+        return status.HTTP_201_CREATED
+
     def _get_success_message(self, booking, availability_result):
         """Формирует сообщение на основе результата проверки"""
         if booking.status == 'confirmed':
             return 'Бронирование успешно подтверждено!'
+        elif booking.status == 'pending':
+            return f'Бронирование ожидает проверки: {availability_result.get("message", "")}'
         else:
             return f'Бронирование отклонено: {availability_result.get("message", "Аудитория недоступна")}'
 
 
+class BulkCreateBookingView(APIView):
+    """
+    API для пакетного создания бронирований
+
+    POST /api/bulk-create-booking/
+
+    Тело запроса — JSON-массив объектов в формате CreateBookingView
+    либо поток NDJSON (Content-Type: application/x-ndjson).
+
+    Response:
+    {
+        "success": true,
+        "total": 2,
+        "confirmed": 1,
+        "rejected": 1,
+        "results": [
+            {"index": 0, "booking_id": 10, "status": "confirmed", "message": "..."},
+            {"index": 1, "booking_id": 11, "status": "rejected", "message": "...", "conflicts": [...]}
+        ]
+    }
+    """
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({
+                'success': False,
+                'message': 'Ожидается массив бронирований'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_items = getattr(settings, 'BULK_BOOKING_MAX_ITEMS', 100000)
+        if len(items) > max_items:
+            return Response({
+                'success': False,
+                'message': f'Слишком много бронирований в одном запросе (максимум {max_items})'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingCreateSerializer(data=items, many=True)
+
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Ошибка валидации данных',
+                'errors': [
+                    {'index': index, 'errors': errors}
+                    for index, errors in enumerate(serializer.errors) if errors
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created = get_booking_service().create_bookings_bulk(serializer.validated_data)
+        except Exception as e:
+            return Response({
+                'success': False,
+                'message': f'Ошибка при создании бронирований: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'success': True,
+            **self.summarize(created)
+        }, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def summarize(created):
+        """Итоги пакетного создания: счётчики и результат по каждому бронированию"""
+        results = []
+        for index, (booking, availability_result) in enumerate(created):
+            item = {
+                'index': index,
+                'booking_id': booking.pk,
+                'status': booking.status,
+                'message': availability_result.get('message', ''),
+            }
+            if availability_result.get('conflicts'):
+                item['conflicts'] = availability_result['conflicts']
+            results.append(item)
+
+        statuses = Counter(booking.status for booking, _ in created)
+
+        return {
+            'total': len(created),
+            'confirmed': statuses['confirmed'],
+            'rejected': statuses['rejected'],
+            'pending': statuses['pending'],
+            'results': results
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCreateBookingView(View):
+    """
+    Асинхронный вариант CreateBookingView для ASGI
+
+    POST /api/async/create-booking/
+
+    Формат запроса и ответа совпадает с CreateBookingView. DRF 3.14 не
+    поддерживает асинхронные APIView, поэтому используется обычный View.
+    """
+    http_method_names = ['post', 'options']
+
+    _get_success_message = CreateBookingView._get_success_message
+    _get_status_code = staticmethod(CreateBookingView._get_status_code)
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as e:
+            return self._json({
+                'success': False,
+                'message': f'Некорректный JSON: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingCreateSerializer(data=data)
+
+        if not serializer.is_valid():
+            return self._json({
+                'success': False,
+                'message': 'Ошибка валидации данных',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            booking, availability_result = await async_booking_service.create_booking(
+                serializer.validated_data
+            )
+
+            return self._json({
+                'success': True,
+                'message': self._get_success_message(booking, availability_result),
+                'booking': BookingSerializer(booking).data,
+                'availability_check': availability_result
+            }, status=self._get_status_code(booking))
+
+        except Exception as e:
+            return self._json({
+                'success': False,
+                'message': f'Ошибка при создании бронирования: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def _json(data, status):
+        return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+class CircuitBreakerStatusView(APIView):
+    """
+    Состояние и метрики circuit breaker сервиса доступности
+    GET /api/availability/circuit-breaker/
+    """
+
+    def get(self, request):
+        return Response(get_availability_breaker().metrics())
+
+
+class OccupancyView(ReplicaReadMixin, APIView):
+    """
+    Свободные и занятые интервалы аудиторий
+    GET /api/occupancy/?date_from=2026-02-01&date_to=2026-02-28
+
+    Необязательные параметры: room_number (несколько через запятую),
+    from_time, to_time (рабочее окно дня), min_duration (минуты)
+
+    Response:
+    {
+        "slot_minutes": 5,
+        "results": [
+            {"room_number": "101", "date": "2026-02-01",
+             "busy": [{"start_time": "10:00", "end_time": "12:00"}],
+             "free": [{"start_time": "00:00", "end_time": "10:00"}, ...]}
+        ]
+    }
+    """
+
+    def get(self, request):
+        params = request.query_params
+        if not params.get('date_from'):
+            return Response({
+                'success': False,
+                'message': 'Параметр date_from обязателен'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        room_numbers = [room.strip() for room in params.get('room_number', '').split(',') if room.strip()]
+        try:
+            occupancy = occupancy_service.get_occupancy(
+                date_from=params['date_from'],
+                date_to=params.get('date_to'),
+                room_numbers=room_numbers or None,
+                from_time=params.get('from_time'),
+                to_time=params.get('to_time'),
+                min_duration=params.get('min_duration') or 0,
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(occupancy)
+
+
 class HealthCheckView(APIView):
     """
     Проверка работоспособности сервиса
@@ -4,4 +4,18 @@ from django.apps import AppConfig
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
-    verbose_name = 'Система бронирования'
\ No newline at end of file
+    verbose_name = 'Система бронирования'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from booking_project.database import apply_sqlite_pragmas
+
+        from . import signals  # noqa: F401
+        from .instrumentation import install_db_wrapper
+        from .search import ensure_search_index
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
+        connection_created.connect(install_db_wrapper, dispatch_uid='install_db_wrapper')
+        post_migrate.connect(ensure_search_index, sender=self, dispatch_uid='ensure_search_index')
@@ -0,0 +1,207 @@
+"""
+Архивирование бронирований прошлых дат
+
+Горячая таблица Booking хранит текущие, будущие и недавние бронирования.
+Более старые переносятся в сжатые NDJSON-сегменты (zstd, без zstandard —
+gzip) в BOOKING_ARCHIVE['DIR']: один сегмент — до SEGMENT_SIZE строк,
+отсортированных по дате. Для каждой перенесённой строки в ArchivedBooking
+остаётся указатель id → сегмент, поэтому архивное бронирование можно
+получить по id (GET /api/bookings/{id}/ ищет в архиве, если строки нет
+в Booking).
+
+Перенос потоковый: строки сегмента читаются пачками и сразу пишутся
+в компрессор, в памяти держатся только их id. Файл записывается до
+транзакции, которая добавляет указатели и удаляет строки из Booking;
+при ошибке транзакции файл удаляется.
+"""
+import gzip
+import io
+import json
+import os
+import uuid
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .availability_index import availability_index
+from .availability_responses import summary_fields
+from .cache import bump_bookings_version
+from .fast_serializers import DETAIL_FIELDS, BookingRowSerializer
+from .models import ArchivedBooking, AvailabilityCheckTask, Booking, BookingArchiveSegment
+
+try:
+    import zstandard
+except ImportError:  # zstandard необязателен, сегменты пишутся в gzip
+    zstandard = None
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    'DIR': 'archive',
+    'COMPRESSION': 'zstd',
+    'ZSTD_LEVEL': 10,
+    'AFTER_DAYS': 365,
+    'SEGMENT_SIZE': 50000,
+    'CHUNK_SIZE': 2000,
+}
+
+EXTENSIONS = {'zstd': '.ndjson.zst', 'gzip': '.ndjson.gz'}
+
+
+def get_archive_settings() -> dict:
+    return {**DEFAULT_ARCHIVE_SETTINGS, **getattr(settings, 'BOOKING_ARCHIVE', {})}
+
+
+def get_compression(config: dict = None) -> str:
+    config = config or get_archive_settings()
+    if config['COMPRESSION'] == 'zstd' and zstandard is not None:
+        return 'zstd'
+    return 'gzip'
+
+
+def segment_path(file_name: str, config: dict = None) -> str:
+    config = config or get_archive_settings()
+    return os.path.join(str(config['DIR']), file_name)
+
+
+def open_segment_writer(path: str, compression: str, config: dict):
+    """Двоичный поток записи с компрессией; закрытие потока закрывает файл"""
+    if compression == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=config['ZSTD_LEVEL'])
+        return compressor.stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, 'wb')
+
+
+def open_segment_reader(path: str, compression: str):
+    """Текстовый построчный поток чтения сегмента"""
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Для чтения сегмента zstd нужен пакет zstandard')
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+
+def iter_segment(segment: BookingArchiveSegment) -> Iterator[Dict[str, Any]]:
+    with open_segment_reader(segment_path(segment.file_name), segment.compression) as reader:
+        for line in reader:
+            row = json.loads(line)
+            # В сегментах, записанных до появления check_* (миграция 0010),
+            # этих полей нет — они восстанавливаются из полного ответа
+            yield {**summary_fields(row.get('availability_check_response')), **row}
+
+
+def get_archived_booking(booking_id, user_email: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Архивное бронирование в формате GET /api/bookings/{id}/ или None
+
+    Распаковывается только сегмент, на который указывает ArchivedBooking.
+    """
+    try:
+        pointer = ArchivedBooking.objects.select_related('segment').get(pk=booking_id)
+    except (ArchivedBooking.DoesNotExist, ValueError):
+        return None
+    if user_email and pointer.user_email != user_email:
+        return None
+
+    for row in iter_segment(pointer.segment):
+        if row['id'] == pointer.booking_id:
+            return row
+    return None
+
+
+class BookingArchiver:
+    """Перенос бронирований с датой раньше before в архивные сегменты"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or get_archive_settings()
+        self.compression = get_compression(self.config)
+        self.row_serializer = BookingRowSerializer(DETAIL_FIELDS)
+
+    def candidates(self, before: date):
+        # Порядок совпадает с индексом booking_date_created_idx
+        return Booking.objects.filter(booking_date__lt=before).order_by('booking_date', '-created_at', '-id')
+
+    def archive(self, before: date, progress: Callable[[BookingArchiveSegment], None] = None) -> List[BookingArchiveSegment]:
+        """
+        Переносит все бронирования раньше before, сегмент за сегментом
+
+        Каждый сегмент — отдельная транзакция, поэтому прерванный перенос
+        можно продолжить повторным запуском.
+        """
+        os.makedirs(str(self.config['DIR']), exist_ok=True)
+        segments = []
+        while True:
+            ids = list(self.candidates(before).values_list('id', flat=True)[:self.config['SEGMENT_SIZE']])
+            if not ids:
+                break
+            segment = self.archive_segment(ids)
+            segments.append(segment)
+            if progress:
+                progress(segment)
+        return segments
+
+    def archive_segment(self, ids: List[int]) -> BookingArchiveSegment:
+        file_name = f'bookings-{uuid.uuid4().hex}{EXTENSIONS[self.compression]}'
+        path = segment_path(file_name, self.config)
+        pointers = []
+
+        try:
+            with open_segment_writer(path, self.compression, self.config) as writer:
+                for row in self._iter_rows(ids):
+                    writer.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode() + b'\n')
+                    pointers.append(ArchivedBooking(
+                        booking_id=row['id'],
+                        user_email=row['user_email'],
+                        booking_date=row['booking_date'],
+                    ))
+
+            dates = [pointer.booking_date for pointer in pointers]
+            with transaction.atomic():
+                segment = BookingArchiveSegment.objects.create(
+                    file_name=file_name,
+                    compression=self.compression,
+                    date_from=min(dates),
+                    date_to=max(dates),
+                    row_count=len(pointers),
+                    size_bytes=os.path.getsize(path),
+                )
+                for pointer in pointers:
+                    pointer.segment = segment
+                ArchivedBooking.objects.bulk_create(pointers, batch_size=self.config['CHUNK_SIZE'])
+                self._delete(ids)
+                emails = {pointer.user_email for pointer in pointers}
+                transaction.on_commit(lambda: self._after_commit(ids, emails))
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return segment
+
+    def _iter_rows(self, ids: List[int]) -> Iterator[Dict[str, Any]]:
+        chunk_size = self.config['CHUNK_SIZE']
+        columns = self.row_serializer.columns()
+        for start in range(0, len(ids), chunk_size):
+            rows = Booking.objects.filter(pk__in=ids[start:start + chunk_size]).order_by('booking_date', 'id')
+            yield from self.row_serializer.serialize(rows.values(*columns))
+
+    @staticmethod
+    def _after_commit(ids: List[int], emails):
+        for booking_id in ids:
+            availability_index.remove(booking_id)
+        bump_bookings_version(emails)
+
+    def _delete(self, ids: List[int]):
+        """
+        Удаление без сигналов post_delete
+
+        Сигналы загрузили бы каждую строку в память и пересчитали бы карты
+        занятости прошлых дней, которые остаются как история. Индекс и версия
+        данных обновляются после коммита (_after_commit).
+        """
+        chunk_size = self.config['CHUNK_SIZE']
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            AvailabilityCheckTask.objects.filter(booking_id__in=chunk).delete()
+            queryset = Booking.objects.filter(pk__in=chunk)
+            queryset._raw_delete(queryset.db)
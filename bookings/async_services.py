@@ -0,0 +1,181 @@
+"""
+Асинхронный вариант создания бронирования
+
+Используется ASGI-представлением AsyncCreateBookingView: ожидание ответа
+сервиса доступности не занимает поток, поэтому один воркер uvicorn может
+держать тысячи бронирований «в полёте».
+"""
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import http_client
+from .availability_cache import get_availability_cache
+from .availability_index import LocalAvailabilityService
+from .circuit_breaker import CircuitOpenError, get_availability_breaker, get_breaker_settings
+from .instrumentation import timed
+from .structured_logging import payload_sampled, request_id_headers
+from .services import AvailabilityService, BookingService, get_booking_service
+
+logger = logging.getLogger(__name__)
+
+# httpx.AsyncClient привязан к циклу событий, поэтому клиент свой у каждого цикла
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Общий для текущего цикла событий пул соединений"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        config = http_client.get_http_settings()
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=config.get('ASYNC_POOL_SIZE', 1000),
+                max_keepalive_connections=config['POOL_SIZE'],
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=config['RETRIES']),
+            headers={'Content-Type': 'application/json'},
+        )
+        _clients[loop] = client
+    return client
+
+
+class AsyncAvailabilityService:
+    """
+    Асинхронный клиент сервиса доступности
+
+    Формат запроса и ответа совпадает с AvailabilityService.
+    """
+
+    async def check_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        url = f"{settings.AVAILABILITY_SERVICE_URL}/check-availability/"
+        payload = AvailabilityService.build_payload(booking_data)
+
+        try:
+            with timed('upstream'):
+                response = await get_async_client().post(url, json=payload, headers=request_id_headers())
+            response.raise_for_status()
+            result = response.json()
+
+            if payload_sampled():
+                logger.info(
+                    "Проверка доступности аудитории %s: %s", payload['room_number'],
+                    'свободна' if result.get('available') else 'занята',
+                    extra={'payload': payload, 'response': result},
+                )
+
+            return AvailabilityService.parse_result(result)
+
+        except httpx.TimeoutException:
+            logger.error("Превышено время ожидания ответа от сервиса доступности",
+                         extra={'payload': payload})
+            return {
+                'success': False,
+                'available': False,
+                'message': 'Сервис проверки доступности не отвечает (timeout)',
+                'error': 'timeout'
+            }
+
+        except httpx.TransportError:
+            logger.error("Ошибка подключения к сервису доступности", extra={'payload': payload})
+            return {
+                'success': False,
+                'available': False,
+                'message': 'Не удалось подключиться к сервису проверки доступности',
+                'error': 'connection_error'
+            }
+
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP ошибка от сервиса доступности: %s", e, extra={'payload': payload})
+            try:
+                error_data = e.response.json()
+            except ValueError:
+                error_data = {'detail': str(e)}
+
+            return {
+                'success': False,
+                'available': False,
+                'message': f'Ошибка сервиса доступности: {error_data.get("detail", str(e))}',
+                'error': 'http_error',
+                'status_code': e.response.status_code,
+                'response_data': error_data
+            }
+
+        except Exception as e:
+            logger.exception("Неожиданная ошибка при проверке доступности: %s", e)
+            return {
+                'success': False,
+                'available': False,
+                'message': f'Произошла ошибка при проверке доступности: {str(e)}',
+                'error': 'unexpected_error'
+            }
+
+
+class AsyncBookingService:
+    """
+    Асинхронная версия BookingService
+    """
+
+    def __init__(self):
+        self.availability_service = AsyncAvailabilityService()
+        self.local_availability_service = LocalAvailabilityService()
+
+    async def check_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Локальный индекс может подгрузить корзину из БД, поэтому вызывается в потоке
+        local_result = await sync_to_async(self.local_availability_service.check_availability)(
+            booking_data
+        )
+
+        mode = getattr(settings, 'AVAILABILITY_MODE', 'local')
+        if mode != 'authoritative' or not local_result['available']:
+            return local_result
+
+        return await self.check_remote_availability(booking_data)
+
+    async def check_remote_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Проверка во внешнем сервисе через кэш результатов, как в BookingService"""
+        cache = get_availability_cache()
+        if cache is None:
+            return await self._call_availability_service(booking_data)
+        return await cache.aget_or_check(booking_data, self._call_availability_service)
+
+    async def _call_availability_service(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Запрос к внешнему сервису через circuit breaker (если он включён)"""
+        config = get_breaker_settings()
+        if not config['ENABLED']:
+            return await self.availability_service.check_availability(booking_data)
+
+        breaker = get_availability_breaker()
+        try:
+            await sync_to_async(breaker.before_call)()
+        except CircuitOpenError:
+            logger.warning("Circuit breaker открыт, применяется политика %s", config['FALLBACK'])
+            # Политика local читает индекс занятости, который может обратиться к БД
+            return await sync_to_async(get_booking_service()._circuit_open_fallback)(
+                booking_data, config['FALLBACK']
+            )
+
+        result = await self.availability_service.check_availability(booking_data)
+        await sync_to_async(breaker.record_result)(result)
+        return result
+
+    async def create_booking(self, booking_data: Dict[str, Any]) -> tuple:
+        if getattr(settings, 'BOOKING_CHECK_MODE', 'inline') == 'deferred':
+            availability_result = BookingService.deferred_result()
+        else:
+            availability_result = await self.check_availability(booking_data)
+
+        # Запись идёт в транзакции с блокировкой слота, поэтому синхронно в пуле потоков
+        return await sync_to_async(get_booking_service().save_booking)(booking_data, availability_result)
+
+
+async_booking_service = AsyncBookingService()
@@ -0,0 +1,281 @@
+"""
+Кэш результатов проверки доступности
+
+Ключ — (аудитория, дата, начало, окончание, тип бронирования) плюс номер
+поколения пары (аудитория, дата). Любое изменение бронирования этой
+аудитории в этот день увеличивает поколение, и все закэшированные
+результаты по этому дню, включая пересекающиеся слоты, перестают читаться.
+
+Одновременные одинаковые запросы объединяются (single-flight): к внешнему
+сервису уходит один запрос, остальные потоки ждут его результат.
+aget_or_check делает то же для корутин AsyncBookingService.
+"""
+import asyncio
+import hashlib
+import threading
+import weakref
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .availability_index import as_date, as_time
+
+DEFAULT_CACHE_SETTINGS = {
+    'BACKEND': 'lru',  # lru, django или None (кэш выключен)
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def _digest(*parts) -> str:
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class LRUBackend:
+    """
+    Локальный для процесса LRU-кэш с TTL
+
+    Поколение пары (аудитория, дата) нужно, пока живы записи, сохранённые
+    под прежним номером: ttl секунд плюс столько же на проверки, начатые
+    до увеличения. Более старые поколения удаляются, и словарь не растёт
+    со временем. Номера берутся из общего счётчика и не повторяются: после
+    удаления поколения пара снова получает 0, а записи под прежними
+    номерами к этому времени истекли.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        # ключ -> (поколение, время увеличения), по возрастанию времени
+        self._generations: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._generation_counter = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_generations(self, now: float):
+        while self._generations:
+            key, (_, bumped_at) = next(iter(self._generations.items()))
+            if bumped_at + 2 * self.ttl >= now:
+                break
+            del self._generations[key]
+
+    def get_generation(self, key: str) -> int:
+        with self._lock:
+            self._prune_generations(time.monotonic())
+            generation = self._generations.get(key)
+            return generation[0] if generation else 0
+
+    def bump_generation(self, key: str):
+        with self._lock:
+            now = time.monotonic()
+            self._prune_generations(now)
+            self._generation_counter += 1
+            self._generations[key] = (self._generation_counter, now)
+            self._generations.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class DjangoCacheBackend:
+    """Кэш Django (например, Redis) — общий для всех воркеров"""
+
+    def __init__(self, alias: str = 'default'):
+        self.cache = caches[alias]
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.cache.set(key, value, ttl)
+
+    def get_generation(self, key: str) -> int:
+        return self.cache.get(key, 0)
+
+    def bump_generation(self, key: str):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def clear(self):
+        pass
+
+
+class _Flight:
+    __slots__ = ('event', 'result')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class AvailabilityCache:
+    """
+    Кэш результатов AvailabilityService.check_availability
+    """
+
+    def __init__(self, backend, ttl: float = 30):
+        self.backend = backend
+        self.ttl = ttl
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        # Future привязан к циклу событий, поэтому ожидания свои у каждого цикла
+        self._async_flights: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]' = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @staticmethod
+    def _generation_key(room_number, booking_date) -> str:
+        return f'availability:gen:{_digest(room_number, as_date(booking_date))}'
+
+    def _key(self, booking_data: Dict[str, Any]) -> str:
+        room_number = booking_data['room_number']
+        booking_date = as_date(booking_data['booking_date'])
+        generation = self.backend.get_generation(self._generation_key(room_number, booking_date))
+        return 'availability:slot:' + _digest(
+            generation,
+            room_number,
+            booking_date,
+            as_time(booking_data['start_time']),
+            as_time(booking_data['end_time']),
+            booking_data.get('booking_type'),
+        )
+
+    def get_or_check(self, booking_data: Dict[str, Any],
+                     check: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Возвращает закэшированный результат или вызывает check
+
+        Кэшируются только успешные ответы сервиса: ошибки (timeout и т.п.)
+        должны повторяться при следующем запросе.
+        """
+        key = self._key(booking_data)
+        result = self.backend.get(key)
+        if result is not None:
+            return {**result, 'cached': True}
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.result is not None:
+                return flight.result
+            return check(booking_data)
+
+        try:
+            result = check(booking_data)
+            # Ответы-заглушки circuit breaker не кэшируются
+            if result.get('success') and not result.get('fallback'):
+                self.backend.set(key, result, self.ttl)
+            flight.result = result
+            return result
+        finally:
+            flight.event.set()
+            with self._flights_lock:
+                self._flights.pop(key, None)
+
+    def _lookup(self, booking_data: Dict[str, Any]) -> tuple:
+        key = self._key(booking_data)
+        return key, self.backend.get(key)
+
+    async def aget_or_check(self, booking_data: Dict[str, Any],
+                            check: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Асинхронный вариант get_or_check
+
+        Бэкенд может ходить в сеть (Redis), поэтому обращения к нему идут
+        через sync_to_async; одновременные одинаковые проверки в цикле
+        событий ждут одну.
+        """
+        key, result = await sync_to_async(self._lookup)(booking_data)
+        if result is not None:
+            return {**result, 'cached': True}
+
+        flights = self._async_flights.setdefault(asyncio.get_running_loop(), {})
+        flight = flights.get(key)
+        if flight is not None:
+            result = await asyncio.shield(flight)
+            if result is not None:
+                return result
+            return await check(booking_data)
+
+        flight = flights[key] = asyncio.get_running_loop().create_future()
+        result = None
+        try:
+            result = await check(booking_data)
+            if result.get('success') and not result.get('fallback'):
+                await sync_to_async(self.backend.set)(key, result, self.ttl)
+            return result
+        finally:
+            flight.set_result(result)
+            flights.pop(key, None)
+
+    def invalidate(self, room_number: str, booking_date):
+        """Сбрасывает все результаты для аудитории на указанную дату"""
+        self.backend.bump_generation(self._generation_key(room_number, booking_date))
+
+
+_availability_cache = None
+_availability_cache_lock = threading.Lock()
+
+
+def get_cache_settings() -> dict:
+    return {**DEFAULT_CACHE_SETTINGS, **getattr(settings, 'AVAILABILITY_CACHE', {})}
+
+
+def get_availability_cache() -> Optional[AvailabilityCache]:
+    """Общий для процесса кэш или None, если кэширование выключено"""
+    global _availability_cache
+
+    config = get_cache_settings()
+    if not config['BACKEND']:
+        return None
+
+    if _availability_cache is None:
+        with _availability_cache_lock:
+            if _availability_cache is None:
+                if config['BACKEND'] == 'django':
+                    backend = DjangoCacheBackend(config['CACHE_ALIAS'])
+                else:
+                    backend = LRUBackend(config['MAX_ENTRIES'], ttl=config['TTL'])
+                _availability_cache = AvailabilityCache(backend, ttl=config['TTL'])
+    return _availability_cache
+
+
+def reset_availability_cache():
+    global _availability_cache
+
+    with _availability_cache_lock:
+        _availability_cache = None
@@ -0,0 +1,305 @@
+"""
+Локальный индекс занятости аудиторий
+
+Для каждой пары (аудитория, дата) хранится отсортированный по времени начала
+список подтверждённых бронирований. Проверка пересечения выполняется бинарным
+поиском за O(log n) без обращения к внешнему сервису.
+"""
+import threading
+import time as time_module
+from bisect import bisect_left
+from datetime import date, time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+
+def as_date(value) -> date:
+    """Приводит строку из формы/JSON к date"""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def as_time(value) -> time:
+    """Приводит строку из формы/JSON к time"""
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value))
+
+
+class DayBucket:
+    """
+    Интервалы одной аудитории за один день
+
+    starts/ends/ids — параллельные списки, отсортированные по времени начала.
+    max_ends[i] — максимальное время окончания среди интервалов 0..i, что позволяет
+    находить пересечения бинарным поиском даже если интервалы перекрываются.
+    """
+
+    __slots__ = ('starts', 'ends', 'ids', 'max_ends', 'loaded_at')
+
+    def __init__(self):
+        self.starts: List[time] = []
+        self.ends: List[time] = []
+        self.ids: List[Hashable] = []
+        self.max_ends: List[time] = []
+        self.loaded_at = time_module.monotonic()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _rebuild_max_ends(self, position: int):
+        for i in range(position, len(self.ends)):
+            if i == 0:
+                self.max_ends[i] = self.ends[0]
+            else:
+                self.max_ends[i] = max(self.max_ends[i - 1], self.ends[i])
+
+    def add(self, start: time, end: time, booking_id: Hashable):
+        position = bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, booking_id)
+        self.max_ends.insert(position, end)
+        self._rebuild_max_ends(position)
+
+    def remove(self, booking_id: Hashable) -> bool:
+        try:
+            position = self.ids.index(booking_id)
+        except ValueError:
+            return False
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+        del self.max_ends[position]
+        self._rebuild_max_ends(position)
+        return True
+
+    def has_overlap(self, start: time, end: time) -> bool:
+        """Есть ли интервал, пересекающийся с [start, end) — O(log n)"""
+        position = bisect_left(self.starts, end)
+        return position > 0 and self.max_ends[position - 1] > start
+
+    def overlaps(self, start: time, end: time) -> List[Tuple[Hashable, time, time]]:
+        """Список пересекающихся интервалов — O(log n + k)"""
+        result = []
+        position = bisect_left(self.starts, end) - 1
+        while position >= 0 and self.max_ends[position] > start:
+            if self.ends[position] > start:
+                result.append((self.ids[position], self.starts[position], self.ends[position]))
+            position -= 1
+        result.reverse()
+        return result
+
+
+class AvailabilityIndex:
+    """
+    Потокобезопасный индекс подтверждённых бронирований по (аудитория, дата)
+
+    Корзины загружаются из БД лениво при первом запросе и обновляются
+    сигналами модели Booking. Если задан ttl, корзина перечитывается из БД
+    по истечении ttl секунд — так процесс видит бронирования, созданные
+    другими воркерами.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._buckets: Dict[Tuple[str, date], DayBucket] = {}
+        self._locations: Dict[Hashable, Tuple[str, date]] = {}
+        # После полного построения отсутствующая корзина означает пустой день
+        self._complete = False
+
+    def __len__(self):
+        return len(self._locations)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._locations.clear()
+            self._complete = False
+
+    @staticmethod
+    def bucket_queryset(room_number: str, booking_date):
+        """Запрос подтверждённых бронирований аудитории за день (индекс booking_room_date_start_idx)"""
+        from .models import Booking
+
+        return Booking.objects.filter(
+            room_number=room_number,
+            booking_date=booking_date,
+            status='confirmed',
+        ).order_by('start_time').values_list('id', 'start_time', 'end_time')
+
+    def _load_bucket(self, key: Tuple[str, date]) -> DayBucket:
+        rows = self.bucket_queryset(*key)
+
+        bucket = DayBucket()
+        for booking_id, start, end in rows:
+            bucket.starts.append(start)
+            bucket.ends.append(end)
+            bucket.ids.append(booking_id)
+            bucket.max_ends.append(end)
+        bucket._rebuild_max_ends(0)
+
+        stale = self._buckets.get(key)
+        if stale is not None:
+            for booking_id in stale.ids:
+                self._locations.pop(booking_id, None)
+        for booking_id in bucket.ids:
+            self._locations[booking_id] = key
+        self._buckets[key] = bucket
+        return bucket
+
+    def _get_bucket(self, key: Tuple[str, date]) -> DayBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if self._complete and self.ttl is None:
+                return self._buckets.setdefault(key, DayBucket())
+            return self._load_bucket(key)
+        if self.ttl is not None and time_module.monotonic() - bucket.loaded_at > self.ttl:
+            return self._load_bucket(key)
+        return bucket
+
+    def add(self, room_number: str, booking_date, start_time, end_time, booking_id: Hashable,
+            load: bool = True):
+        """
+        Добавляет интервал в индекс
+
+        При load=False корзина не подгружается из БД (используется при
+        массовом построении индекса).
+        """
+        key = (room_number, as_date(booking_date))
+        with self._lock:
+            self.remove(booking_id)
+            if load:
+                bucket = self._get_bucket(key)
+                if booking_id in self._locations:
+                    # Корзина только что загружена из БД и уже содержит запись
+                    return
+            else:
+                bucket = self._buckets.setdefault(key, DayBucket())
+            bucket.add(as_time(start_time), as_time(end_time), booking_id)
+            self._locations[booking_id] = key
+
+    def add_many(self, rows: Iterable[Tuple[Hashable, str, Any, Any, Any]]):
+        """
+        Добавляет пачку интервалов (id, аудитория, дата, начало, окончание)
+        без запросов к БД
+
+        Интервал попадает только в уже загруженные корзины: незагруженная
+        корзина прочитает его из БД при первом обращении.
+        """
+        with self._lock:
+            for booking_id, room_number, booking_date, start, end in rows:
+                key = (room_number, as_date(booking_date))
+                self.remove(booking_id)
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if not self._complete:
+                        continue
+                    bucket = self._buckets[key] = DayBucket()
+                bucket.add(as_time(start), as_time(end), booking_id)
+                self._locations[booking_id] = key
+
+    def remove(self, booking_id: Hashable) -> bool:
+        with self._lock:
+            key = self._locations.pop(booking_id, None)
+            if key is None:
+                return False
+            bucket = self._buckets.get(key)
+            return bucket is not None and bucket.remove(booking_id)
+
+    def find_conflicts(self, room_number: str, booking_date, start_time,
+                       end_time) -> List[Tuple[Hashable, time, time]]:
+        key = (room_number, as_date(booking_date))
+        with self._lock:
+            return self._get_bucket(key).overlaps(as_time(start_time), as_time(end_time))
+
+    def build(self, queryset=None):
+        """Полностью перестраивает индекс по подтверждённым бронированиям"""
+        from .models import Booking
+
+        if queryset is None:
+            queryset = Booking.objects.filter(status='confirmed')
+
+        rows = queryset.values_list('id', 'room_number', 'booking_date', 'start_time', 'end_time')
+        self.build_from_rows(rows.iterator(chunk_size=5000))
+
+    def build_from_rows(self, rows: Iterable[Tuple[Hashable, str, Any, Any, Any]]):
+        """Строит индекс из кортежей (id, аудитория, дата, начало, окончание)"""
+        with self._lock:
+            self.clear()
+            for booking_id, room_number, booking_date, start, end in rows:
+                self.add(room_number, booking_date, start, end, booking_id, load=False)
+            self._complete = True
+
+    # Обработчики сигналов модели Booking
+
+    def on_booking_saved(self, instance, **kwargs):
+        if instance.status == 'confirmed':
+            self.add(
+                instance.room_number,
+                instance.booking_date,
+                instance.start_time,
+                instance.end_time,
+                instance.pk,
+            )
+        else:
+            self.remove(instance.pk)
+
+    def on_booking_deleted(self, instance, **kwargs):
+        self.remove(instance.pk)
+
+
+availability_index = AvailabilityIndex(
+    ttl=getattr(settings, 'AVAILABILITY_INDEX_TTL', None)
+)
+
+
+class LocalAvailabilityService:
+    """
+    Проверка доступности по локальному индексу
+
+    Возвращает ответ в том же формате, что и AvailabilityService.
+    """
+
+    def __init__(self, index: AvailabilityIndex = None):
+        self.index = index if index is not None else availability_index
+
+    def check_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        conflicts = self.index.find_conflicts(
+            booking_data['room_number'],
+            booking_data['booking_date'],
+            booking_data['start_time'],
+            booking_data['end_time'],
+        )
+        return self.build_result(conflicts)
+
+    @staticmethod
+    def build_result(conflicts: List[Tuple[Hashable, time, time]],
+                     message: str = 'Аудитория уже забронирована на это время') -> Dict[str, Any]:
+        """Ответ в формате AvailabilityService по найденным конфликтам"""
+        if conflicts:
+            return {
+                'success': True,
+                'available': False,
+                'message': message,
+                'conflicts': [
+                    {
+                        'booking_id': booking_id,
+                        'start_time': start.strftime('%H:%M'),
+                        'end_time': end.strftime('%H:%M'),
+                    }
+                    for booking_id, start, end in conflicts
+                ],
+                'source': 'local'
+            }
+
+        return {
+            'success': True,
+            'available': True,
+            'message': 'Аудитория свободна',
+            'conflicts': [],
+            'source': 'local'
+        }
@@ -0,0 +1,154 @@
+"""
+Хранение ответов сервиса доступности
+
+Ответ проверки (Booking.availability_check_response) хранится не в строке
+бронирования, а в таблице AvailabilityResponse. Одинаковые ответы (те же
+флаги, сообщение и конфликты) сохраняются один раз по SHA-256 канонического
+JSON, крупные сжимаются zlib. В строке Booking остаются ссылка и поля,
+по которым фильтруют: check_success, check_available, check_error.
+
+Полный ответ читается только при обращении: свойство модели загружает его
+одним запросом, BookingRowSerializer — одним запросом на страницу.
+
+Ответы не удаляются вместе с бронированиями: один ответ общий для многих
+строк, а осиротевшие (после удаления или архивирования) занимают мало места.
+"""
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULT_STORAGE_SETTINGS = {
+    # 'zlib' или 'none'
+    'COMPRESSION': 'zlib',
+    # Короткие ответы zlib не уменьшает
+    'COMPRESS_MIN_BYTES': 256,
+    'ZLIB_LEVEL': 6,
+}
+
+# Ограничение числа параметров в digest__in / pk__in (SQLite — 999)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def get_storage_settings() -> dict:
+    return {**DEFAULT_STORAGE_SETTINGS, **getattr(settings, 'AVAILABILITY_RESPONSE_STORAGE', {})}
+
+
+def encode_payload(payload: Dict[str, Any], config: dict = None) -> Tuple[str, str, bytes, int]:
+    """(digest, compression, данные, размер без сжатия) для ответа"""
+    config = config or get_storage_settings()
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode()
+    digest = hashlib.sha256(raw).hexdigest()
+    if config['COMPRESSION'] == 'zlib' and len(raw) >= config['COMPRESS_MIN_BYTES']:
+        compressed = zlib.compress(raw, config['ZLIB_LEVEL'])
+        if len(compressed) < len(raw):
+            return digest, 'zlib', compressed, len(raw)
+    return digest, 'none', raw, len(raw)
+
+
+def decode_payload(compression: str, data) -> Dict[str, Any]:
+    # PostgreSQL возвращает BinaryField как memoryview
+    data = bytes(data)
+    if compression == 'zlib':
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+def summary_fields(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Поля Booking, которые дублируют часть ответа для фильтрации"""
+    if payload is None:
+        return {'check_success': None, 'check_available': None, 'check_error': ''}
+    return {
+        'check_success': bool(payload.get('success')),
+        'check_available': bool(payload.get('available')),
+        'check_error': str(payload.get('error') or '')[:50],
+    }
+
+
+def store_payloads(payloads: List[Optional[Dict[str, Any]]]) -> List[Optional[int]]:
+    """
+    id AvailabilityResponse для каждого ответа (None для None)
+
+    Все ответы вставляются одним bulk_create с ignore_conflicts (уже
+    сохранённые и вставленные параллельно пропускаются), затем их id
+    читаются по digest.
+    """
+    from .models import AvailabilityResponse
+
+    config = get_storage_settings()
+    encoded = {}
+    digests = []
+    for payload in payloads:
+        if payload is None:
+            digests.append(None)
+            continue
+        digest, compression, data, size = encode_payload(payload, config)
+        digests.append(digest)
+        encoded.setdefault(digest, (compression, data, size))
+
+    if not encoded:
+        return digests
+
+    # Сначала запись, потом чтение: на SQLite транзакция сразу получает
+    # блокировку записи и не упирается в повышение блокировки чтения
+    # («database is locked» при параллельных созданиях, см. slot_locks.lock_slots)
+    AvailabilityResponse.objects.bulk_create(
+        [
+            AvailabilityResponse(digest=digest, compression=compression, payload=data, size=size)
+            for digest, (compression, data, size) in encoded.items()
+        ],
+        batch_size=LOOKUP_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    ids = _ids_by_digest(list(encoded))
+    return [None if digest is None else ids[digest] for digest in digests]
+
+
+def _ids_by_digest(digests: List[str]) -> Dict[str, int]:
+    from .models import AvailabilityResponse
+
+    ids = {}
+    for start in range(0, len(digests), LOOKUP_CHUNK_SIZE):
+        ids.update(
+            AvailabilityResponse.objects
+            .filter(digest__in=digests[start:start + LOOKUP_CHUNK_SIZE])
+            .values_list('digest', 'id')
+        )
+    return ids
+
+
+def assign_responses(bookings: Iterable) -> None:
+    """
+    Сохраняет ответы, заданные через Booking.availability_check_response
+
+    Нужна перед bulk_create: он не вызывает Booking.save().
+    """
+    pending = [booking for booking in bookings if booking.__dict__.pop('_availability_payload_dirty', False)]
+    if not pending:
+        return
+    ids = store_payloads([booking.availability_check_response for booking in pending])
+    for booking, response_id in zip(pending, ids):
+        booking.availability_response_id = response_id
+
+
+def load_payloads(ids: Iterable[Optional[int]]) -> Dict[int, Dict[str, Any]]:
+    """Ответы по id AvailabilityResponse, по запросу на LOOKUP_CHUNK_SIZE id"""
+    from .models import AvailabilityResponse
+
+    ids = [response_id for response_id in set(ids) if response_id is not None]
+    payloads = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+        rows = AvailabilityResponse.objects.filter(pk__in=ids[start:start + LOOKUP_CHUNK_SIZE]).values_list(
+            'id', 'compression', 'payload'
+        )
+        for response_id, compression, data in rows:
+            payloads[response_id] = decode_payload(compression, data)
+    return payloads
+
+
+def load_payload(response_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    if response_id is None:
+        return None
+    return load_payloads([response_id]).get(response_id)
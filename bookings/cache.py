@@ -0,0 +1,125 @@
+"""
+Версия данных бронирований для инвалидации кэшей
+
+Любое изменение Booking увеличивает общую версию и версию каждого
+затронутого пользователя, а ключи кэшей включают её номер — устаревшие
+записи просто перестают читаться и истекают по TTL. Представления,
+отфильтрованные по user_email, зависят только от версии пользователя и не
+сбрасываются при изменении чужих бронирований.
+
+Начальное значение версии берётся из текущего времени, поэтому ключ,
+вытесненный из кэша и созданный заново, не повторит старые номера.
+
+Версия живёт в CACHES: без REDIS_URL это LocMem, отдельный у каждого
+процесса, и изменение видно только процессу, который его сделал. Поэтому
+ETag и Last-Modified (bookings/http_cache.py) строятся не по версии,
+а по состоянию самих данных (get_bookings_state), а отметкам изменения
+верят, только если кэш общий (markers_shared).
+"""
+import hashlib
+import time
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+
+BOOKINGS_VERSION_KEY = 'bookings:version'
+BOOKINGS_MODIFIED_KEY = 'bookings:modified'
+
+
+def markers_shared() -> bool:
+    """Видны ли версии и отметки изменения всем процессам (общий кэш вроде Redis)"""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def _scope_suffix(user_email: Optional[str]) -> str:
+    if user_email is None:
+        return ''
+    return ':user:' + hashlib.md5(user_email.encode()).hexdigest()
+
+
+def _initial_version() -> int:
+    return int(time.time() * 1000)
+
+
+def get_bookings_version(user_email: Optional[str] = None) -> int:
+    key = BOOKINGS_VERSION_KEY + _scope_suffix(user_email)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def get_bookings_modified(user_email: Optional[str] = None) -> float:
+    """
+    Время последнего изменения (unix time)
+
+    Если отметки нет (ещё не было изменений или она вытеснена из кэша),
+    она создаётся с текущим временем — так условный GET по Last-Modified
+    никогда не ответит 304 ошибочно, а чтение с реплик (bookings/db_router.py)
+    начнётся после окна REPLICA_STICKY_SECONDS.
+    """
+    key = BOOKINGS_MODIFIED_KEY + _scope_suffix(user_email)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, time.time(), timeout=None)
+        modified = cache.get(key, time.time())
+    return modified
+
+
+class BookingsState(NamedTuple):
+    modified: Optional[datetime]
+    last_id: Optional[int]
+    count: int
+
+
+def get_bookings_state(user_email: Optional[str] = None) -> BookingsState:
+    """
+    Последний updated_at, максимальный id и число бронирований области
+
+    Читается из основной БД по индексам (booking_updated_idx,
+    booking_email_created_idx), поэтому одинаково во всех процессах и не
+    отстаёт от реплик. Изменения меняют updated_at, вставки — id,
+    удаления — число строк.
+    """
+    from .models import Booking
+
+    queryset = Booking.objects.using(DEFAULT_DB_ALIAS).order_by()
+    if user_email is not None:
+        queryset = queryset.filter(user_email=user_email)
+    # Отдельными запросами: MAX без других агрегатов читается из края индекса,
+    # а вместе с COUNT — полным просмотром таблицы
+    return BookingsState(
+        modified=queryset.aggregate(value=Max('updated_at'))['value'],
+        last_id=queryset.aggregate(value=Max('id'))['value'],
+        count=queryset.count(),
+    )
+
+
+def bump_bookings_version(user_emails: Iterable[str] = ()) -> int:
+    """
+    Увеличивает общую версию и версии пользователей user_emails
+
+    Вызывается после коммита транзакции (transaction.on_commit), иначе
+    параллельный запрос может закэшировать старые данные под новой версией.
+    """
+    suffixes = [''] + [_scope_suffix(email) for email in set(user_emails) if email]
+    for suffix in suffixes:
+        key = BOOKINGS_VERSION_KEY + suffix
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            # Ключ ещё не создан или вытеснен из кэша
+            cache.add(key, _initial_version(), timeout=None)
+            version = cache.incr(key)
+        if not suffix:
+            global_version = version
+
+    now = time.time()
+    cache.set_many({BOOKINGS_MODIFIED_KEY + suffix: now for suffix in suffixes}, timeout=None)
+    return global_version
@@ -0,0 +1,194 @@
+"""
+Автоматический выключатель (circuit breaker) для сервиса доступности
+
+Состояние хранится в кэше Django, поэтому при общем кэше (Redis) оно одно
+на все воркеры gunicorn:
+
+- closed: запросы идут в сервис, считается доля ошибок в окне WINDOW секунд;
+- open: доля ошибок превысила порог — запросы не отправляются OPEN_TIMEOUT секунд,
+  вместо ответа сервиса применяется политика FALLBACK;
+- half-open: после OPEN_TIMEOUT пропускается один пробный запрос; успех
+  закрывает выключатель, ошибка снова открывает его.
+"""
+import time
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import caches
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_BREAKER_SETTINGS = {
+    'ENABLED': True,
+    'FAILURE_RATE_THRESHOLD': 0.5,
+    'MIN_REQUESTS': 10,
+    'WINDOW': 30,
+    'OPEN_TIMEOUT': 15,
+    'FALLBACK': 'pending',  # pending, local или reject
+    'CACHE_ALIAS': 'default',
+}
+
+METRICS = ('calls', 'successes', 'failures', 'short_circuited', 'opened', 'closed')
+
+# Ошибки, говорящие о проблемах сервиса, а не о некорректном запросе
+FAILURE_ERRORS = {'timeout', 'connection_error', 'unexpected_error'}
+
+
+def get_breaker_settings() -> dict:
+    return {**DEFAULT_BREAKER_SETTINGS, **getattr(settings, 'AVAILABILITY_CIRCUIT_BREAKER', {})}
+
+
+def is_failure(result: Dict[str, Any]) -> bool:
+    """Считается ли ответ AvailabilityService отказом сервиса"""
+    if result.get('success'):
+        return False
+    error = result.get('error')
+    if error == 'http_error':
+        return result.get('status_code', 500) >= 500
+    return error in FAILURE_ERRORS
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Выключатель с состоянием в кэше Django
+    """
+
+    def __init__(self, name: str, config: dict = None):
+        self.name = name
+        self.config = config or get_breaker_settings()
+        self.cache = caches[self.config['CACHE_ALIAS']]
+
+    def _key(self, suffix: str) -> str:
+        return f'breaker:{self.name}:{suffix}'
+
+    def _incr(self, key: str, timeout=None) -> int:
+        if self.cache.add(key, 1, timeout=timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout=timeout)
+            return 1
+
+    def _record_metric(self, metric: str):
+        self._incr(self._key(f'metric:{metric}'))
+
+    def _window_keys(self):
+        window = int(time.time() // self.config['WINDOW'])
+        return self._key(f'window:{window}:total'), self._key(f'window:{window}:failures')
+
+    @property
+    def state(self) -> str:
+        opened_until = self.cache.get(self._key('opened_until'))
+        if opened_until is None:
+            return CLOSED
+        if time.time() < opened_until:
+            return OPEN
+        return HALF_OPEN
+
+    def _open(self):
+        self.cache.set(
+            self._key('opened_until'),
+            time.time() + self.config['OPEN_TIMEOUT'],
+            timeout=None,
+        )
+        self.cache.delete(self._key('trial'))
+        self._record_metric('opened')
+
+    def _close(self):
+        self.cache.delete_many([self._key('opened_until'), self._key('trial'), *self._window_keys()])
+        self._record_metric('closed')
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            # Пробный запрос пропускается только один (add атомарен)
+            return self.cache.add(self._key('trial'), 1, timeout=self.config['OPEN_TIMEOUT'])
+        return False
+
+    def record_success(self):
+        self._record_metric('successes')
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        total_key, _ = self._window_keys()
+        self._incr(total_key, timeout=self.config['WINDOW'] * 2)
+
+    def record_failure(self):
+        self._record_metric('failures')
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+
+        total_key, failures_key = self._window_keys()
+        total = self._incr(total_key, timeout=self.config['WINDOW'] * 2)
+        failures = self._incr(failures_key, timeout=self.config['WINDOW'] * 2)
+        if total >= self.config['MIN_REQUESTS'] and failures / total >= self.config['FAILURE_RATE_THRESHOLD']:
+            self._open()
+
+    def call(self, func: Callable[[Dict[str, Any]], Dict[str, Any]],
+             booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Вызывает func через выключатель
+
+        Raises:
+            CircuitOpenError: выключатель открыт, запрос не отправлялся
+        """
+        self.before_call()
+        result = func(booking_data)
+        self.record_result(result)
+        return result
+
+    def before_call(self):
+        """
+        Проверяет, можно ли отправить запрос (для асинхронного кода)
+
+        Raises:
+            CircuitOpenError: выключатель открыт
+        """
+        if not self.allow_request():
+            self._record_metric('short_circuited')
+            raise CircuitOpenError(self.name)
+        self._record_metric('calls')
+
+    def record_result(self, result: Dict[str, Any]):
+        if is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def metrics(self) -> Dict[str, Any]:
+        total_key, failures_key = self._window_keys()
+        counters = self.cache.get_many([self._key(f'metric:{metric}') for metric in METRICS])
+        window = self.cache.get_many([total_key, failures_key])
+        return {
+            'name': self.name,
+            'state': self.state,
+            'window_requests': window.get(total_key, 0),
+            'window_failures': window.get(failures_key, 0),
+            **{metric: counters.get(self._key(f'metric:{metric}'), 0) for metric in METRICS},
+            'config': {
+                key.lower(): value for key, value in self.config.items()
+                if key != 'CACHE_ALIAS'
+            },
+        }
+
+    def reset(self):
+        self.cache.delete_many([
+            self._key('opened_until'),
+            self._key('trial'),
+            *self._window_keys(),
+            *(self._key(f'metric:{metric}') for metric in METRICS),
+        ])
+
+
+def get_availability_breaker() -> CircuitBreaker:
+    return CircuitBreaker('availability')
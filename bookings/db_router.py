@@ -0,0 +1,155 @@
+"""
+Чтение с реплик БД
+
+Реплики задаются DATABASE_REPLICA_URLS (см. settings.py). Запись и чтение
+внутри транзакций всегда идут в основную БД; с реплики читают только
+представления с ReplicaReadMixin и только безопасными методами.
+
+Чтобы пользователь сразу видел своё бронирование (read-your-writes),
+основная БД используется REPLICA_STICKY_SECONDS секунд:
+- после любого изменяющего запроса клиента (cookie, ставит
+  ReplicaStickinessMiddleware) — для браузера;
+- после изменения бронирований пользователя, если запрос отфильтрован по
+  его user_email (время изменения из bookings/cache.py) — для API-клиентов
+  без cookie. Отметку ставит процесс, сделавший запись (в том числе воркер
+  очереди), поэтому ей верят только при общем кэше (REDIS_URL); с кэшем
+  в памяти процесса такие запросы всегда читают основную БД;
+- после любого изменения в области ответа, который попадёт в кэш или
+  получит ETag (fresh_reads), — иначе отстающая реплика закэширует
+  старые данные под новой версией.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import get_bookings_modified, markers_shared
+
+STICKY_COOKIE = 'booking_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('booking_read_alias', default=None)
+
+
+def get_replicas() -> List[str]:
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+def get_sticky_seconds() -> float:
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def current_read_alias() -> str:
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+def recently_modified(modified: float) -> bool:
+    return time.time() - modified < get_sticky_seconds()
+
+
+def choose_read_alias(request, user_email: Optional[str] = None) -> Optional[str]:
+    """
+    Реплика для чтения в этом запросе или None (основная БД)
+
+    Реплика выбирается один раз на запрос, чтобы все его запросы видели
+    один и тот же снимок данных.
+    """
+    replicas = get_replicas()
+    if not replicas or request.method not in SAFE_METHODS:
+        return None
+
+    try:
+        if float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time():
+            return None
+    except ValueError:
+        pass
+
+    if user_email and (not markers_shared() or recently_modified(get_bookings_modified(user_email))):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def replica_reads(request, user_email: Optional[str] = None):
+    token = _read_alias.set(choose_read_alias(request, user_email))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def fresh_reads(modified: float):
+    """Переключает чтение на основную БД, если данные области изменились недавно"""
+    if _read_alias.get() is None or not recently_modified(modified):
+        yield
+        return
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Роутер БД: чтение с реплики, выбранной для текущего запроса, всё остальное — в default"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Представление, читающее с реплики (GET/HEAD/OPTIONS)"""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(request, request.GET.get('user_email') or None):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """После изменяющего запроса клиент читает из основной БД REPLICA_STICKY_SECONDS секунд"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.mark_sticky(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.mark_sticky(request, await self.get_response(request))
+
+    @staticmethod
+    def mark_sticky(request, response):
+        if get_replicas() and request.method not in SAFE_METHODS and response.status_code < 400:
+            sticky = get_sticky_seconds()
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + sticky:.3f}',
+                max_age=max(1, int(sticky)), httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,75 @@
+"""
+Потоковая выгрузка бронирований в NDJSON и CSV
+
+Строки читаются серверным курсором (.iterator) и преобразуются вручную,
+без DRF-сериализаторов, поэтому память не зависит от объёма выгрузки.
+"""
+import csv
+import json
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from .fast_serializers import datetime_value, isoformat_value
+
+
+def _identity(value):
+    return value
+
+
+EXPORT_FIELDS: List[Tuple[str, Callable]] = [
+    ('id', _identity),
+    ('user_email', _identity),
+    ('room_number', _identity),
+    ('booking_date', isoformat_value),
+    ('start_time', isoformat_value),
+    ('end_time', isoformat_value),
+    ('booking_type', _identity),
+    ('purpose', _identity),
+    ('status', _identity),
+    ('created_at', datetime_value),
+    ('updated_at', datetime_value),
+]
+
+FIELD_NAMES = [name for name, _ in EXPORT_FIELDS]
+CONVERTERS = [converter for _, converter in EXPORT_FIELDS]
+
+
+def iter_rows(queryset, chunk_size: int = 2000) -> Iterator[list]:
+    """Строки выгрузки в порядке FIELD_NAMES"""
+    rows = queryset.order_by('id').values_list(*FIELD_NAMES).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [convert(value) for convert, value in zip(CONVERTERS, row)]
+
+
+def _batched(lines: Iterable[str], batch_size: int) -> Iterator[str]:
+    """Склеивает строки, чтобы не отдавать клиенту по одной строке за раз"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_ndjson(queryset, chunk_size: int = 2000) -> Iterator[str]:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    lines = (
+        dumps(dict(zip(FIELD_NAMES, row))) + '\n'
+        for row in iter_rows(queryset, chunk_size)
+    )
+    return _batched(lines, chunk_size)
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, chunk_size: int = 2000) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    lines = (writer.writerow(row) for row in iter_rows(queryset, chunk_size))
+    yield writer.writerow(FIELD_NAMES)
+    yield from _batched(lines, chunk_size)
@@ -0,0 +1,107 @@
+"""
+Быстрая сериализация бронирований для чтения
+
+Списки и детали читаются через .values() и преобразуются заранее
+подобранными функциями, без создания объектов модели и без полей DRF.
+Формат значений совпадает с BookingSerializer.
+
+availability_check_response хранится в отдельной таблице
+(bookings/availability_responses.py): в .values() выбирается ссылка,
+а ответы загружаются одним запросом на страницу.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from .availability_responses import load_payloads
+from .instrumentation import timed
+
+
+def datetime_value(value):
+    # Тот же формат, что у DRF DateTimeField: ISO 8601 с суффиксом Z для UTC
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def isoformat_value(value):
+    return value.isoformat()
+
+
+# Поле ответа -> преобразование значения из .values()
+BOOKING_FIELDS: Dict[str, Optional[Callable]] = {
+    'id': None,
+    'user_email': None,
+    'room_number': None,
+    'booking_date': isoformat_value,
+    'start_time': isoformat_value,
+    'end_time': isoformat_value,
+    'booking_type': None,
+    'purpose': None,
+    'status': None,
+    'series': None,
+    'check_success': None,
+    'check_available': None,
+    'check_error': None,
+    'availability_check_response': None,
+    'created_at': datetime_value,
+    'updated_at': datetime_value,
+}
+
+DETAIL_FIELDS = list(BOOKING_FIELDS)
+# Ответ сервиса доступности занимает больше места, чем остальные поля
+# вместе, поэтому в списке он только по явному ?fields=
+LIST_FIELDS = [name for name in BOOKING_FIELDS if name != 'availability_check_response']
+
+# Ответ сервиса доступности: поле ответа API и колонка .values() со ссылкой на него
+PAYLOAD_FIELD = 'availability_check_response'
+PAYLOAD_COLUMN = 'availability_response'
+
+
+def parse_fields(value: Optional[str], default: Sequence[str]) -> List[str]:
+    """
+    Разбирает параметр ?fields=id,status,...
+
+    Raises:
+        ValueError: неизвестное поле
+    """
+    if not value:
+        return list(default)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in BOOKING_FIELDS]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return list(dict.fromkeys(fields))
+
+
+class BookingRowSerializer:
+    """
+    Сериализатор строк .values() для выбранного набора полей
+
+    Преобразования подбираются один раз при создании, порядок ключей
+    совпадает с порядком fields.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = list(fields)
+        self._pairs = [(name, BOOKING_FIELDS[name]) for name in self.fields]
+
+    def columns(self, *required: str) -> List[str]:
+        """Колонки для .values(): выбранные поля и обязательные (например, для курсора)"""
+        columns = [PAYLOAD_COLUMN if name == PAYLOAD_FIELD else name for name in self.fields]
+        return list(dict.fromkeys([*columns, *required]))
+
+    def to_representation(self, row: dict) -> dict:
+        """Строка с уже загруженным ответом сервиса доступности (см. serialize)"""
+        return {
+            name: row[name] if convert is None or row[name] is None else convert(row[name])
+            for name, convert in self._pairs
+        }
+
+    def serialize(self, rows: Iterable[dict]) -> List[dict]:
+        with timed('serialize'):
+            if PAYLOAD_FIELD in self.fields:
+                rows = list(rows)
+                payloads = load_payloads(row[PAYLOAD_COLUMN] for row in rows)
+                for row in rows:
+                    row[PAYLOAD_FIELD] = payloads.get(row[PAYLOAD_COLUMN])
+            return [self.to_representation(row) for row in rows]
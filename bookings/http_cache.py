@@ -0,0 +1,103 @@
+"""
+Кэш ответов и условные GET для чтения бронирований
+
+ETag считается из состояния данных области (последний updated_at,
+максимальный id и число бронирований, bookings/cache.py), пути с
+параметрами и заголовка Accept, поэтому повторный опрос без изменений
+получает 304 после одного агрегирующего запроса по индексам, без выборки
+строк и сериализации. Состояние читается из БД, а не из кэша процесса,
+поэтому все воркеры выдают одинаковый ETag. Last-Modified — последний
+updated_at области; удаление его не меняет, но меняет ETag, а
+If-None-Match важнее If-Modified-Since.
+
+Тело кэшируется под ETag, поэтому кэши, из которых его собирает build
+(статистика, bookings/stats.py), тоже должны зависеть от состояния
+данных, а не от версии в кэше процесса, — иначе под новым ETag
+сохранится старое тело.
+
+Для ответов с user_email область — бронирования пользователя: изменения
+чужих бронирований их не сбрасывают.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_bookings_modified, get_bookings_state
+from .db_router import fresh_reads
+
+
+class CacheScope:
+    """Состояние данных, время изменения и ETag для запроса в области всех бронирований или одного пользователя"""
+
+    def __init__(self, request, user_email: Optional[str] = None, *vary: str):
+        state = get_bookings_state(user_email)
+        self.modified = int(state.modified.timestamp()) if state.modified else 0
+        # Чтение с реплики безопасно, только если область давно не менялась;
+        # отметка кэша точнее updated_at в процессе, который удалял строки
+        self.changed = max(self.modified, get_bookings_modified(user_email))
+        scope = 'all' if user_email is None else f'user:{user_email}'
+        digest = hashlib.md5('|'.join([
+            state.modified.isoformat() if state.modified else '',
+            str(state.last_id),
+            str(state.count),
+            scope,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            *vary,
+        ]).encode()).hexdigest()
+        self.etag = f'"{digest}"'
+
+    def not_modified(self, request) -> Optional[HttpResponse]:
+        """Ответ 304, если у клиента актуальная версия"""
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.modified)
+        if response is not None:
+            self.set_headers(response)
+        return response
+
+    def set_headers(self, response):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.modified)
+        # Ответ зависит от состояния данных, поэтому клиент должен каждый раз сверяться
+        response['Cache-Control'] = 'no-cache'
+
+
+def cached_api_response(view, request, build: Callable, user_email: Optional[str] = None):
+    """
+    Ответ DRF-представления с условным GET и кэшем отрендеренного тела
+
+    Args:
+        view: Экземпляр APIView (нужен для finalize_response)
+        request: Запрос DRF
+        build: Функция без аргументов, возвращающая Response
+        user_email: Область инвалидации — ответ содержит только бронирования этого пользователя
+    """
+    scope = CacheScope(request, user_email)
+    response = scope.not_modified(request)
+    if response is not None:
+        return response
+
+    key = 'bookings:response:' + scope.etag.strip('"')
+    cached = cache.get(key)
+    if cached is not None:
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        # Тело попадёт в кэш под текущим состоянием — собирать его с отстающей реплики нельзя
+        with fresh_reads(scope.changed):
+            response = view.finalize_response(request, build())
+            response.render()
+        if response.status_code != 200:
+            return response
+        cache.set(key, (response.content, response['Content-Type']), get_response_cache_timeout())
+
+    scope.set_headers(response)
+    return response
+
+
+def get_response_cache_timeout() -> int:
+    return getattr(settings, 'BOOKING_RESPONSE_CACHE_TIMEOUT', 60)
@@ -0,0 +1,97 @@
+"""
+Общий для процесса пул HTTP-соединений к сервису доступности
+
+Одна requests.Session на процесс: соединения переиспользуются (keep-alive),
+размер пула настраивается, повторные попытки (ошибки соединения и ответы
+502/503/504, но не таймаут чтения) выполняются с экспоненциальной задержкой
+и случайным разбросом. Пул urllib3 потокобезопасен, поэтому сессию
+можно использовать из всех потоков воркера gunicorn.
+"""
+import threading
+from typing import Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HTTP_SETTINGS = {
+    'POOL_SIZE': 20,
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 10.0,
+    'RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'BACKOFF_JITTER': 0.1,
+    'RETRY_STATUSES': (502, 503, 504),
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_settings() -> dict:
+    """Настройки HTTP-клиента с учётом AVAILABILITY_HTTP из settings"""
+    return {**DEFAULT_HTTP_SETTINGS, **getattr(settings, 'AVAILABILITY_HTTP', {})}
+
+
+def get_timeout() -> Tuple[float, float]:
+    """Раздельные таймауты (connect, read) для requests"""
+    config = get_http_settings()
+    return config['CONNECT_TIMEOUT'], config['READ_TIMEOUT']
+
+
+def build_session() -> requests.Session:
+    config = get_http_settings()
+
+    retry = Retry(
+        total=config['RETRIES'],
+        connect=config['RETRIES'],
+        # Таймаут чтения не повторяется: каждая попытка ждала бы READ_TIMEOUT
+        # заново, и запрос висел бы до (RETRIES + 1) * READ_TIMEOUT секунд,
+        # а сервис к этому времени уже получил POST и, возможно, обработал его
+        read=0,
+        status=config['RETRIES'],
+        # Проверка доступности ничего не изменяет, поэтому POST можно повторять
+        # при ошибке соединения и ответах шлюза из RETRY_STATUSES
+        allowed_methods=frozenset({'GET', 'POST'}),
+        status_forcelist=config['RETRY_STATUSES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        backoff_jitter=config['BACKOFF_JITTER'],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config['POOL_SIZE'],
+        max_retries=retry,
+        pool_block=False,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Content-Type': 'application/json',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_session() -> requests.Session:
+    """Возвращает общую для процесса сессию, создавая её при первом обращении"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session():
+    """Закрывает текущую сессию (например, после изменения настроек или fork)"""
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,331 @@
+"""
+Инструментирование запросов: разбивка времени по фазам и метрики Prometheus
+
+Для каждого запроса InstrumentationMiddleware собирает:
+- db        — число и суммарное время SQL-запросов (connection.execute_wrapper);
+- upstream  — время HTTP-вызовов сервиса доступности;
+- serialize — время сериализации и кодирования ответа API;
+- template  — время рендеринга шаблонов (InstrumentedDjangoTemplates).
+
+Разбивка отдаётся заголовком Server-Timing и накапливается в гистограммах,
+доступных по GET /metrics в текстовом формате Prometheus. Метрики хранятся
+в памяти процесса: при нескольких воркерах gunicorn каждый отдаёт свои.
+
+Накладные расходы — пара вызовов perf_counter на фазу и на SQL-запрос,
+поэтому инструментирование можно держать включённым в продакшене.
+
+Middleware работает и в синхронной, и в асинхронной цепочке: синхронное
+middleware в начале списка заставило бы Django выполнять под ASGI всю
+цепочку через async_to_sync. Поэтому SQL-запросы учитываются не обёрткой,
+поставленной на время запроса, а обёрткой на каждом соединении
+(install_db_wrapper): соединения Django локальны для потока, а представление
+под ASGI выполняется в другом потоке, куда contextvar с разбивкой
+копируется через sync_to_async.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_INSTRUMENTATION_SETTINGS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'METRICS_ENABLED': True,
+}
+
+# Фазы в порядке вывода в Server-Timing
+PHASES = ('db', 'upstream', 'serialize', 'template')
+
+_current = contextvars.ContextVar('booking_request_timings', default=None)
+
+
+def get_instrumentation_settings() -> dict:
+    config = dict(DEFAULT_INSTRUMENTATION_SETTINGS)
+    config.update(getattr(settings, 'INSTRUMENTATION', {}))
+    return config
+
+
+class RequestTimings:
+    """Накопленное время (секунды) и число вызовов по фазам одного запроса"""
+
+    __slots__ = ('phases', 'started')
+
+    def __init__(self):
+        self.phases: Dict[str, list] = {}
+        self.started = time.perf_counter()
+
+    def add(self, phase: str, seconds: float):
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def duration(self, phase: str) -> float:
+        entry = self.phases.get(phase)
+        return entry[0] if entry else 0.0
+
+    def count(self, phase: str) -> int:
+        entry = self.phases.get(phase)
+        return entry[1] if entry else 0
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for phase in PHASES:
+            if phase == 'db':
+                parts.append(f'db;dur={self.duration(phase) * 1000:.1f};desc="{self.count(phase)} queries"')
+            elif phase in self.phases:
+                parts.append(f'{phase};dur={self.duration(phase) * 1000:.1f}')
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Учитывает время блока в фазе phase текущего запроса
+
+    Вне запроса (воркеры очереди, management-команды) ничего не делает.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    """Обработчик connection_created: учитывает SQL-запросы соединения в фазе db"""
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+class Histogram:
+    """Гистограмма Prometheus с фиксированными корзинами, по наборам меток"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, label_values: tuple, value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            # [счётчики корзин..., +Inf, сумма]
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for label_values, series in sorted(self._series.items()):
+            labels = _format_labels(self.labels, label_values)
+            prefix = labels[:-1] + ',' if labels else '{'
+            for bound, count in zip(self.buckets, series):
+                yield f'{self.name}_bucket{prefix}le="{bound}"}} {count}'
+            yield f'{self.name}_bucket{prefix}le="+Inf"}} {series[-2]}'
+            yield f'{self.name}_sum{labels} {series[-1]}'
+            yield f'{self.name}_count{labels} {series[-2]}'
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series: Dict[tuple, float] = {}
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for label_values, value in sorted(self._series.items()):
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {value}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class RequestMetrics:
+    """Метрики запросов процесса; запись и вывод под одной блокировкой"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Histogram(
+            'booking_http_request_duration_seconds',
+            'Длительность обработки HTTP-запроса',
+            ('method', 'view', 'status'),
+        )
+        self.phases = Histogram(
+            'booking_http_request_phase_seconds',
+            'Время запроса по фазам: db, upstream, serialize, template',
+            ('view', 'phase'),
+        )
+        self.db_queries = Counter(
+            'booking_db_queries_total',
+            'Число SQL-запросов',
+            ('view',),
+        )
+
+    def record(self, method: str, view: str, status: int, total: float, timings: RequestTimings):
+        with self._lock:
+            self.requests.observe((method, view, str(status)), total)
+            for phase in PHASES:
+                if phase in timings.phases:
+                    self.phases.observe((view, phase), timings.duration(phase))
+            self.db_queries.inc((view,), timings.count('db'))
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                *self.requests.render(),
+                *self.phases.render(),
+                *self.db_queries.render(),
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+
+request_metrics = RequestMetrics()
+
+
+def _view_label(request) -> str:
+    """Имя маршрута, а не путь: число рядов метрик не растёт с числом id"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class InstrumentationMiddleware:
+    """
+    Собирает разбивку времени запроса, отдаёт Server-Timing и пишет метрики
+
+    Ставится первым в MIDDLEWARE, чтобы учитывать время остальных middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        config = get_instrumentation_settings()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, config)
+
+    async def __acall__(self, request):
+        config = get_instrumentation_settings()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, config)
+
+    @staticmethod
+    def _finish(request, response, timings: RequestTimings, config: dict):
+        total = time.perf_counter() - timings.started
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = timings.server_timing(total)
+        if config['METRICS_ENABLED']:
+            request_metrics.record(request.method, _view_label(request), response.status_code, total, timings)
+        return response
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus
+    GET /metrics
+    """
+    if not get_instrumentation_settings()['METRICS_ENABLED']:
+        return HttpResponse(status=404)
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class InstrumentedTemplate:
+    """Обёртка шаблона бэкенда Django, учитывающая время рендеринга в фазе template"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates с замером рендеринга; указывается в TEMPLATES['BACKEND']"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
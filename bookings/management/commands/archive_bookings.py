@@ -0,0 +1,60 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.archive import BookingArchiver, get_archive_settings, get_compression
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит бронирования прошлых дат из таблицы Booking в сжатые '
+        'NDJSON-сегменты архива (zstd или gzip). Архивные бронирования '
+        'остаются доступны по GET /api/bookings/{id}/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help='Архивировать даты раньше этой (YYYY-MM-DD)')
+        parser.add_argument('--older-than-days', type=int,
+                            help='Архивировать даты старше N дней (по умолчанию BOOKING_ARCHIVE AFTER_DAYS)')
+        parser.add_argument('--segment-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать строки')
+
+    def handle(self, *args, **options):
+        config = get_archive_settings()
+        if options['segment_size']:
+            config['SEGMENT_SIZE'] = options['segment_size']
+
+        if options['before'] and options['older_than_days'] is not None:
+            raise CommandError('Укажите либо --before, либо --older-than-days')
+        before = options['before'] or date.today() - timedelta(
+            days=config['AFTER_DAYS'] if options['older_than_days'] is None else options['older_than_days']
+        )
+        if before > date.today():
+            raise CommandError('Архивировать можно только прошлые даты')
+
+        archiver = BookingArchiver(config)
+        if options['dry_run']:
+            count = archiver.candidates(before).count()
+            self.stdout.write(f'К архивированию: {count} бронирований с датой раньше {before}')
+            return
+
+        self.stdout.write(f'Архивирование дат раньше {before} ({get_compression(config)}) в {config["DIR"]}')
+        started = time.perf_counter()
+        totals = {'rows': 0, 'bytes': 0}
+
+        def progress(segment):
+            totals['rows'] += segment.row_count
+            totals['bytes'] += segment.size_bytes
+            self.stdout.write(
+                f'  {segment.file_name}: {segment.row_count} строк, '
+                f'{segment.date_from} — {segment.date_to}, {segment.size_bytes / 1024:.0f}KiB'
+            )
+
+        segments = archiver.archive(before, progress=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено {totals["rows"]} бронирований в {len(segments)} сегментов '
+            f'({totals["bytes"] / 1024:.0f}KiB) за {elapsed:.1f}s'
+        ))
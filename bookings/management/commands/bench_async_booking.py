@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from bookings.perf.database import temporary_database
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.timing import format_summary, summarize
+
+
+def booking_payload(number: int) -> dict:
+    # Каждое бронирование в своей аудитории, чтобы не было конфликтов
+    return {
+        'user_email': f'user{number}@example.com',
+        'room_number': str(1000 + number),
+        'booking_date': str(date.today() + timedelta(days=1)),
+        'start_time': '10:00',
+        'end_time': '12:00',
+        'booking_type': 'lesson',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение синхронного и асинхронного создания бронирований при медленном '
+        'сервисе доступности. Клиент работает в том же процессе, поэтому абсолютные '
+        'задержки включают его накладные расходы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=32,
+                            help='Число потоков синхронного воркера (gunicorn --threads)')
+        parser.add_argument('--latency', type=float, default=2.0,
+                            help='Задержка заглушки сервиса доступности, секунды')
+        parser.add_argument('--memory', action='store_true',
+                            help='Замерять память через tracemalloc (заметно замедляет оба прогона)')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        self.trace_memory = options['memory']
+
+        with temporary_database(), StubAvailabilityServer(latency=options['latency']) as stub:
+            with override_settings(AVAILABILITY_SERVICE_URL=stub.url,
+                                   AVAILABILITY_MODE='authoritative'):
+                sync_result = self._run_sync(total, options['threads'])
+                async_result = self._run_async(total)
+
+        for name, (samples, elapsed, peak, in_flight) in (('sync (threads)', sync_result),
+                                                          ('async (asgi)', async_result)):
+            self.stdout.write(format_summary(name, summarize(samples)))
+            line = (
+                f'{"":<32} время={elapsed:.2f}s бронирований/с={total / elapsed:.0f} '
+                f'одновременно={in_flight}'
+            )
+            if self.trace_memory:
+                line += f' память на запрос={peak / max(in_flight, 1) / 1024:.1f}KiB'
+            self.stdout.write(line)
+
+        if self.trace_memory:
+            self.stdout.write(
+                'Для потоков дополнительно резервируется стек '
+                f'({threading.stack_size() or 8 * 1024 * 1024} байт виртуальной памяти на поток).'
+            )
+
+    def _start_tracing(self):
+        if self.trace_memory:
+            tracemalloc.start()
+
+    def _stop_tracing(self) -> int:
+        if not self.trace_memory:
+            return 0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def _run_sync(self, total, threads):
+        client = Client()
+
+        def one(number):
+            started = time.perf_counter()
+            response = client.post('/api/create-booking/', booking_payload(number),
+                                   content_type='application/json')
+            assert response.status_code == 201, response.content
+            return time.perf_counter() - started
+
+        self._start_tracing()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            samples = list(executor.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+        peak = self._stop_tracing()
+        return samples, elapsed, peak, min(threads, total)
+
+    def _run_async(self, total):
+        client = AsyncClient()
+
+        async def one(number):
+            started = time.perf_counter()
+            response = await client.post('/api/async/create-booking/',
+                                         booking_payload(total + number),
+                                         content_type='application/json')
+            assert response.status_code == 201, response.content
+            return time.perf_counter() - started
+
+        async def run_all():
+            return await asyncio.gather(*(one(number) for number in range(total)))
+
+        self._start_tracing()
+        started = time.perf_counter()
+        samples = asyncio.run(run_all())
+        elapsed = time.perf_counter() - started
+        peak = self._stop_tracing()
+        return samples, elapsed, peak, total
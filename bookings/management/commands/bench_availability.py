@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from bookings.availability_index import AvailabilityIndex
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.timing import format_summary, summarize
+
+
+class Command(BaseCommand):
+    help = 'Сравнение локального индекса занятости с HTTP-запросом к сервису доступности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--queries', type=int, default=10_000)
+        parser.add_argument('--http-queries', type=int, default=500)
+        parser.add_argument('--rooms', type=int, default=300)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Искусственная задержка заглушки, секунды')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        rooms = [str(100 + i) for i in range(options['rooms'])]
+        first_day = date(2026, 1, 1)
+        days = [first_day + timedelta(days=i) for i in range(options['days'])]
+
+        for size in options['sizes']:
+            rows = []
+            for booking_id in range(size):
+                start_hour = rng.randint(8, 20)
+                rows.append((
+                    booking_id,
+                    rng.choice(rooms),
+                    rng.choice(days),
+                    dtime(start_hour),
+                    dtime(start_hour + 1, 30),
+                ))
+
+            index = AvailabilityIndex()
+            started = time.perf_counter()
+            index.build_from_rows(rows)
+            build_time = time.perf_counter() - started
+
+            samples = []
+            for _ in range(options['queries']):
+                start_hour = rng.randint(8, 20)
+                room, day = rng.choice(rooms), rng.choice(days)
+                started = time.perf_counter()
+                index.find_conflicts(room, day, dtime(start_hour), dtime(start_hour + 1))
+                samples.append(time.perf_counter() - started)
+
+            self.stdout.write(f'Индекс на {size} бронирований построен за {build_time:.2f}s')
+            self.stdout.write(format_summary(f'local index ({size})', summarize(samples)))
+
+        import requests
+
+        with StubAvailabilityServer(latency=options['latency']) as stub:
+            url = f'{stub.url}/check-availability/'
+            payload = {
+                'room_number': '101',
+                'booking_date': '2026-02-15',
+                'start_time': '10:00:00',
+                'end_time': '12:00:00',
+                'booking_type': 'lesson',
+            }
+            samples = []
+            for _ in range(options['http_queries']):
+                started = time.perf_counter()
+                requests.post(url, json=payload, timeout=10).json()
+                samples.append(time.perf_counter() - started)
+
+        # Время HTTP-запроса не зависит от количества бронирований у нас,
+        # поэтому замеряется один раз
+        self.stdout.write(format_summary('http round-trip (stub)', summarize(samples)))
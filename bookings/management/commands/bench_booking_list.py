@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import viewsets
+from rest_framework.test import APIRequestFactory
+
+from bookings.api_views import BookingViewSet
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.perf.timing import format_summary, summarize
+
+
+class ModelSerializerBookingViewSet(BookingViewSet):
+    """Прежний путь: объекты модели + BookingSerializer со всеми полями"""
+    list = viewsets.ModelViewSet.list
+    retrieve = viewsets.ModelViewSet.retrieve
+
+
+class UncachedBookingViewSet(BookingViewSet):
+    """Текущий путь без кэша ответов: измеряется сериализация, а не попадания в кэш"""
+
+    def list(self, request, *args, **kwargs):
+        return self._list(request)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение GET /api/bookings/ через BookingSerializer и через .values() + BookingRowSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        url = f'/api/bookings/?page_size={options["page_size"]}&format=json'
+        variants = [
+            ('ModelSerializer (все поля)', ModelSerializerBookingViewSet, url),
+            ('values() (по умолчанию)', UncachedBookingViewSet, url),
+            ('values() ?fields=id,status', UncachedBookingViewSet, url + '&fields=id,status'),
+        ]
+
+        with temporary_database():
+            seed_bookings(max(options['rows'], options['page_size']))
+
+            for name, viewset, variant_url in variants:
+                view = viewset.as_view({'get': 'list'})
+                # Прогрев: первые запросы компилируют SQL и заполняют кэши
+                for _ in range(3):
+                    view(factory.get(variant_url)).render()
+
+                samples = []
+                size = 0
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    response = view(factory.get(variant_url))
+                    response.render()
+                    samples.append(time.perf_counter() - started)
+                    size = len(response.content)
+
+                stats = summarize(samples)
+                self.stdout.write(format_summary(name, stats))
+                self.stdout.write(
+                    f'{"":<32} запросов/с={len(samples) / sum(samples):.1f} '
+                    f'размер ответа={size / 1024:.0f}KiB'
+                )
@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from booking_project.database import sqlite_pragmas
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.perf.timing import format_summary, summarize
+
+# Режим: (PRAGMA SQLite или None для PostgreSQL, CONN_MAX_AGE)
+SQLITE_MODES = {
+    'sqlite-default': ('default', 0),
+    'sqlite-tuned': ('tuned', 0),
+    'sqlite-tuned-persistent': ('tuned', 60),
+}
+POSTGRES_MODES = {
+    'postgres': (None, 0),
+    'postgres-persistent': (None, 60),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные писатели (POST /api/create-booking/) и читатели (GET /api/bookings/) '
+        'в разных режимах БД: журнал SQLite по умолчанию, WAL + synchronous=NORMAL, '
+        'постоянные соединения. Для PostgreSQL задайте DATABASE_URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=50, help='Запросов на поток')
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--modes', help='Режимы через запятую (по умолчанию все для текущей СУБД)')
+
+    def handle(self, *args, **options):
+        available = SQLITE_MODES if connection.vendor == 'sqlite' else POSTGRES_MODES
+        names = options['modes'].split(',') if options['modes'] else list(available)
+        unknown = set(names) - set(available)
+        if unknown:
+            raise CommandError(f'Неизвестные режимы для {connection.vendor}: {", ".join(sorted(unknown))}')
+
+        settings_dict = connections['default'].settings_dict
+        original_max_age = settings_dict['CONN_MAX_AGE']
+        busy_timeout = settings_dict['OPTIONS'].get('timeout', 20) * 1000
+        try:
+            for name in names:
+                pragma_mode, max_age = available[name]
+                # Словарь общий для соединений всех потоков: новые соединения
+                # открываются уже с этими параметрами
+                settings_dict['CONN_MAX_AGE'] = max_age
+                pragmas = sqlite_pragmas(pragma_mode, busy_timeout) if pragma_mode else None
+                with override_settings(SQLITE_PRAGMAS=pragmas, BOOKING_RESPONSE_CACHE_TIMEOUT=0,
+                                       AVAILABILITY_MODE='local', BOOKING_CHECK_MODE='inline'):
+                    connections.close_all()
+                    with temporary_database():
+                        seed_bookings(options['rows'])
+                        self._run(name, options)
+        finally:
+            settings_dict['CONN_MAX_AGE'] = original_max_age
+
+    def _run(self, name, options):
+        first_day = date.today() + timedelta(days=1000)
+
+        def write(number):
+            client = Client(raise_request_exception=False)
+            samples, errors = [], 0
+            try:
+                for i in range(options['requests']):
+                    # Каждый поток в своей аудитории, дни не пересекаются: конфликтов нет
+                    started = time.perf_counter()
+                    response = client.post('/api/create-booking/', {
+                        'user_email': f'writer{number}@example.com',
+                        'room_number': f'W{number}',
+                        'booking_date': str(first_day + timedelta(days=i)),
+                        'start_time': '10:00',
+                        'end_time': '11:00',
+                        'booking_type': 'lesson',
+                    }, content_type='application/json')
+                    samples.append(time.perf_counter() - started)
+                    errors += response.status_code >= 400
+            finally:
+                connections.close_all()
+            return samples, errors
+
+        def read(number):
+            client = Client(raise_request_exception=False)
+            samples, errors = [], 0
+            try:
+                for i in range(options['requests']):
+                    started = time.perf_counter()
+                    response = client.get('/api/bookings/', {'user_email': f'user{number * 97 + i}@university.edu'})
+                    samples.append(time.perf_counter() - started)
+                    errors += response.status_code >= 400
+            finally:
+                connections.close_all()
+            return samples, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['writers'] + options['readers']) as executor:
+            writers = [executor.submit(write, number) for number in range(options['writers'])]
+            readers = [executor.submit(read, number) for number in range(options['readers'])]
+            write_results = [future.result() for future in writers]
+            read_results = [future.result() for future in readers]
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for label, results in (('POST create-booking', write_results), ('GET bookings', read_results)):
+            samples = [sample for thread_samples, _ in results for sample in thread_samples]
+            if not samples:
+                continue
+            self.stdout.write(format_summary(label, summarize(samples)))
+            self.stdout.write(
+                f'{"":<32} запросов/с={len(samples) / elapsed:.0f} '
+                f'ошибок={sum(errors for _, errors in results)}'
+            )
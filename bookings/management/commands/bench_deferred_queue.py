@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from bookings.models import AvailabilityCheckTask, Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.timing import format_summary, summarize
+from bookings.services import BookingService
+from bookings.task_queue import run_worker
+
+
+def booking_payload(number: int) -> dict:
+    # Каждое бронирование в своей аудитории, чтобы не было конфликтов
+    return {
+        'user_email': f'user{number}@example.com',
+        'room_number': str(1000 + number),
+        'booking_date': str(date.today() + timedelta(days=1)),
+        'start_time': '10:00',
+        'end_time': '12:00',
+        'booking_type': 'lesson',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку POST /api/create-booking/ в режимах inline и deferred '
+        'и измеряет пропускную способность воркеров очереди при медленном '
+        'сервисе доступности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--latency', type=float, default=0.2,
+                            help='Задержка заглушки сервиса доступности, секунды')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+
+        with temporary_database(), StubAvailabilityServer(latency=options['latency']) as stub:
+            with override_settings(AVAILABILITY_SERVICE_URL=stub.url,
+                                   AVAILABILITY_MODE='authoritative',
+                                   AVAILABILITY_CACHE={'BACKEND': None}):
+                inline = self._post_all(total, offset=0, mode='inline', expected=201)
+                deferred = self._post_all(total, offset=total, mode='deferred', expected=202)
+
+                self.stdout.write(format_summary('POST inline', summarize(inline)))
+                self.stdout.write(format_summary('POST deferred', summarize(deferred)))
+
+                queued = AvailabilityCheckTask.objects.filter(status='queued').count()
+                elapsed = self._drain(options['workers'], options['batch_size'])
+
+        self.stdout.write(
+            f'Очередь: задач={queued} воркеров={options["workers"]} '
+            f'время={elapsed:.2f}s проверок/с={queued / elapsed:.0f}'
+        )
+
+    def _post_all(self, total, offset, mode, expected):
+        client = Client()
+        samples = []
+        with override_settings(BOOKING_CHECK_MODE=mode):
+            for number in range(offset, offset + total):
+                started = time.perf_counter()
+                response = client.post('/api/create-booking/', booking_payload(number),
+                                       content_type='application/json')
+                samples.append(time.perf_counter() - started)
+                assert response.status_code == expected, response.content
+        return samples
+
+    def _drain(self, workers, batch_size):
+        stop_event = threading.Event()
+        service = BookingService()
+        threads = [
+            threading.Thread(target=run_worker, args=(service, stop_event),
+                             kwargs={'batch_size': batch_size, 'exit_when_empty': True})
+            for _ in range(workers)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        pending = Booking.objects.filter(status='pending').count()
+        assert pending == 0, f'Остались непроверенные бронирования: {pending}'
+        return elapsed
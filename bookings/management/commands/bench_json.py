@@ -0,0 +1,117 @@
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from bookings.fast_serializers import DETAIL_FIELDS, BookingRowSerializer
+from bookings.models import Booking
+from bookings.parsers import ORJSONParser, orjson
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.renderers import ORJSONRenderer
+from bookings.serializers import BookingSerializer
+
+CREATE_REQUEST = {
+    'user_email': 'user@example.com',
+    'room_number': '101',
+    'booking_date': '2026-02-15',
+    'start_time': '10:00',
+    'end_time': '12:00',
+    'booking_type': 'lesson',
+    'purpose': 'Лекция по программированию',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Микробенчмарк кодирования и разбора JSON для реальных ответов '
+        'CreateBookingView и BookingViewSet: JSONRenderer/JSONParser DRF против orjson'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--min-time', type=float, default=0.5,
+                            help='Минимальное время замера одного случая, секунды')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен')
+
+        row_serializer = BookingRowSerializer(DETAIL_FIELDS)
+        with temporary_database():
+            seed_bookings(options['page_size'])
+            booking = Booking.objects.order_by('id').first()
+            booking_data = BookingSerializer(booking).data
+            rows = row_serializer.serialize(
+                Booking.objects.order_by('-created_at', '-id').values(*row_serializer.columns())
+            )
+
+        shapes = {
+            'create-booking (ответ)': {
+                'success': True,
+                'message': 'Бронирование успешно подтверждено!',
+                'booking': booking_data,
+                'availability_check': booking.availability_check_response,
+            },
+            'bookings detail': rows[0],
+            f'bookings list ({len(rows)} строк)': {
+                'next': 'http://testserver/api/bookings/?cursor=abc',
+                'previous': None,
+                'results': rows,
+            },
+            # Типы, которые приходят не из сериализаторов
+            'сырые типы Python': {
+                'created_at': booking.created_at,
+                'booking_date': booking.booking_date,
+                'start_time': booking.start_time,
+                'price': Decimal('1250.50'),
+                'nested': {'conflicts': [{'booking_id': 1, 'start_time': '10:00'}], 1: 'int key'},
+            },
+        }
+
+        drf_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+        drf_parser, fast_parser = JSONParser(), ORJSONParser()
+
+        self.stdout.write('Кодирование:')
+        for name, data in shapes.items():
+            expected = json.loads(drf_renderer.render(data))
+            if json.loads(fast_renderer.render(data)) != expected:
+                raise CommandError(f'{name}: ответ orjson отличается от DRF')
+            self._compare(name, lambda: drf_renderer.render(data), lambda: fast_renderer.render(data),
+                          options['min_time'])
+
+        self.stdout.write('Разбор:')
+        bodies = {
+            'create-booking (запрос)': json.dumps(CREATE_REQUEST).encode(),
+            f'bookings list ({len(rows)} строк)': drf_renderer.render(shapes[f'bookings list ({len(rows)} строк)']),
+        }
+        for name, body in bodies.items():
+            if drf_parser.parse(io.BytesIO(body)) != fast_parser.parse(io.BytesIO(body)):
+                raise CommandError(f'{name}: разбор orjson отличается от DRF')
+            self._compare(name, lambda: drf_parser.parse(io.BytesIO(body)),
+                          lambda: fast_parser.parse(io.BytesIO(body)), options['min_time'])
+
+    def _compare(self, name, baseline, candidate, min_time):
+        baseline_us = self._measure(baseline, min_time)
+        candidate_us = self._measure(candidate, min_time)
+        self.stdout.write(
+            f'  {name:<32} DRF={baseline_us:>10.1f}µs orjson={candidate_us:>10.1f}µs '
+            f'ускорение={baseline_us / candidate_us:.1f}x'
+        )
+
+    @staticmethod
+    def _measure(func, min_time: float) -> float:
+        """Среднее время вызова в микросекундах"""
+        loops = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                return elapsed / loops * 1e6
+            loops *= 2
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from bookings.models import Booking
+from bookings.pagination import encode_cursor, keyset_page
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.perf.timing import format_summary, summarize
+
+
+class Command(BaseCommand):
+    help = 'Сравнение OFFSET- и keyset-пагинации на глубоких страницах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=250_000)
+        parser.add_argument('--page', type=int, default=10_000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_number, page_size = options['page'], options['page_size']
+
+        with temporary_database():
+            seed_bookings(max(options['rows'], page_number * page_size + page_size))
+            queryset = Booking.objects.all()
+
+            offset_samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                # Так работал ListView с paginate_by: COUNT(*) + LIMIT/OFFSET
+                list(Paginator(queryset, page_size).page(page_number).object_list)
+                offset_samples.append(time.perf_counter() - started)
+
+            # Курсор на последнюю запись предыдущей страницы — его клиент получает
+            # из ответа на предыдущую страницу, поэтому в замер не входит
+            anchor = queryset.values('created_at', 'id')[(page_number - 1) * page_size - 1]
+            cursor = encode_cursor(anchor['created_at'], anchor['id'])
+
+            keyset_samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                keyset_page(queryset, cursor, page_size)
+                keyset_samples.append(time.perf_counter() - started)
+
+            offset_ids = [b.pk for b in Paginator(queryset, page_size).page(page_number).object_list]
+            keyset_ids = [b.pk for b in keyset_page(queryset, cursor, page_size)[0]]
+            if offset_ids != keyset_ids:
+                self.stderr.write('Страницы OFFSET и keyset не совпадают')
+
+        self.stdout.write(format_summary(f'offset page {page_number}', summarize(offset_samples)))
+        self.stdout.write(format_summary(f'keyset page {page_number}', summarize(keyset_samples)))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from bookings.models import Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.perf.timing import format_summary, summarize
+from bookings.search import get_search_backend
+
+# Запросы по данным сидера: редкий email, префикс email + слово цели, аудитория + цель
+QUERIES = ('user1234', 'user12 лекц', 'консультация 205', 'user19999@university.edu')
+EMAIL = 'user1234@university.edu'
+
+
+class Command(BaseCommand):
+    help = (
+        'Поиск бронирований: GET /api/bookings/search/, HTML-список с ?q= '
+        'и фильтр по подстроке email (contains)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000,
+                            help='Строк в таблице (цель — до 50 мс при 5 000 000)')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with temporary_database(), override_settings(BOOKING_RESPONSE_CACHE_TIMEOUT=0):
+            seed_bookings(options['rows'], progress=self._progress)
+            self.stdout.write(f'Поиск: {type(get_search_backend()).__name__}')
+            client = Client()
+
+            for query in QUERIES:
+                self._measure(f'API search {query!r}', options['repeat'], lambda: client.get(
+                    '/api/bookings/search/', {'q': query},
+                ))
+            self._measure('HTML list ?q=user1234', options['repeat'], lambda: client.get(
+                '/bookings/', {'q': 'user1234'},
+            ))
+
+            search = get_search_backend()
+            self._measure('email: contains', options['repeat'], lambda: list(
+                search.contains(Booking.objects.all(), 'user_email', EMAIL)[:20]
+            ))
+
+    def _measure(self, name, repeat, run):
+        run()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = run()
+            samples.append(time.perf_counter() - started)
+            if getattr(response, 'status_code', 200) != 200:
+                self.stderr.write(f'{name}: HTTP {response.status_code}')
+                return
+        self.stdout.write(format_summary(name, summarize(samples)))
+
+    def _progress(self, created):
+        if created % 500_000 == 0:
+            self.stdout.write(f'  создано {created}')
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from bookings.circuit_breaker import CLOSED, HALF_OPEN, OPEN, get_availability_breaker, get_breaker_settings
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.services import BookingService
+
+BOOKING_DATA = {
+    'user_email': 'user@example.com',
+    'room_number': '101',
+    'booking_date': '2026-02-15',
+    'start_time': '10:00',
+    'end_time': '12:00',
+    'booking_type': 'lesson',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет circuit breaker через closed → open → half-open → closed '
+        'на локальной заглушке с настраиваемой долей ошибок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--open-timeout', type=int, default=1)
+        parser.add_argument('--latency', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        breaker_settings = {
+            **get_breaker_settings(),
+            'MIN_REQUESTS': 5,
+            'OPEN_TIMEOUT': options['open_timeout'],
+            'FALLBACK': 'reject',
+        }
+        # Повторы urllib3 на 503 здесь только мешают считать ошибки
+        http_settings = {'RETRIES': 0}
+
+        with StubAvailabilityServer(latency=options['latency'], error_rate=1.0) as stub, \
+                override_settings(AVAILABILITY_SERVICE_URL=stub.url,
+                                  AVAILABILITY_CIRCUIT_BREAKER=breaker_settings,
+                                  AVAILABILITY_HTTP=http_settings,
+                                  AVAILABILITY_CACHE={'BACKEND': None}):
+            from bookings import http_client
+            http_client.reset_session()
+
+            breaker = get_availability_breaker()
+            breaker.reset()
+            service = BookingService()
+
+            self._expect(breaker.state, CLOSED, 'начальное состояние')
+
+            for _ in range(breaker_settings['MIN_REQUESTS']):
+                service.check_remote_availability(BOOKING_DATA)
+            self._expect(breaker.state, OPEN, 'после серии ошибок')
+
+            requests_before = stub.requests
+            started = time.perf_counter()
+            result = service.check_remote_availability(BOOKING_DATA)
+            elapsed = (time.perf_counter() - started) * 1000
+            self._expect(result.get('error'), 'circuit_open', 'ответ при открытом выключателе')
+            self._expect(stub.requests, requests_before, 'запросов к сервису при открытом выключателе')
+            self.stdout.write(f'Быстрый отказ за {elapsed:.2f}ms')
+
+            time.sleep(options['open_timeout'] + 0.1)
+            self._expect(breaker.state, HALF_OPEN, 'после OPEN_TIMEOUT')
+
+            stub.error_rate = 0.0
+            result = service.check_remote_availability(BOOKING_DATA)
+            self._expect(result.get('success'), True, 'пробный запрос')
+            self._expect(breaker.state, CLOSED, 'после успешного пробного запроса')
+
+            self.stdout.write(str(breaker.metrics()))
+            breaker.reset()
+            http_client.reset_session()
+
+        self.stdout.write(self.style.SUCCESS('Circuit breaker работает корректно'))
+
+    def _expect(self, actual, expected, what):
+        if actual != expected:
+            raise CommandError(f'{what}: ожидалось {expected!r}, получено {actual!r}')
+        self.stdout.write(f'OK {what}: {actual}')
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router, transaction
+from django.test import Client, override_settings
+
+from bookings.cache import get_bookings_modified
+from bookings.db_router import current_read_alias, replica_reads
+from bookings.models import Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+
+REPLICA_ALIAS = 'replica_check'
+REPLICA_ONLY_EMAIL = 'replica-only@example.com'
+WRITER_EMAIL = 'writer@example.com'
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет чтение с реплики на двух SQLite-файлах: реплика — копия основной БД, '
+        'которая не получает новых записей (задержка репликации). Проверяются маршрутизация '
+        'чтения и записи, read-your-writes по cookie и по user_email, окно «липкости».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sticky-seconds', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка использует SQLite-файлы, задайте DATABASE_URL=sqlite:///...')
+
+        sticky = options['sticky_seconds']
+        # Отметкам изменения пользователя db_router верит только при общем для
+        # процессов кэше, поэтому вместо LocMem — файловый кэш
+        with temporary_database(), self._replica() as alias, tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(REPLICA_DATABASES=[alias], REPLICA_STICKY_SECONDS=sticky,
+                                  AVAILABILITY_MODE='local', BOOKING_CHECK_MODE='inline',
+                                  CACHES={'default': {
+                                      'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                      'LOCATION': cache_dir,
+                                  }}):
+            seed_bookings(200)
+            self._copy_to_replica(alias)
+            # Бронирование, которое есть только на реплике, показывает, откуда читали
+            Booking.objects.using(alias).bulk_create([Booking(
+                user_email=REPLICA_ONLY_EMAIL, room_number='R1', booking_date=date.today(),
+                start_time=dt_time(10), end_time=dt_time(11), booking_type='lesson', status='confirmed',
+            )])
+            # Неизвестное время изменения считается недавним (чтение из основной БД),
+            # поэтому отметки создаются до ожидания окна липкости
+            for user_email in (None, REPLICA_ONLY_EMAIL, WRITER_EMAIL):
+                get_bookings_modified(user_email)
+            time.sleep(sticky + 0.1)
+
+            self._check_router(alias)
+            self._check_views(sticky)
+
+        self.stdout.write(self.style.SUCCESS('Маршрутизация чтения с реплики работает'))
+
+    def _check_router(self, alias):
+        request = Client().get('/api/health/').wsgi_request
+        with replica_reads(request):
+            self._expect(current_read_alias(), alias, 'GET читает с реплики')
+            self._expect(router.db_for_read(Booking), alias, 'db_for_read вне транзакции')
+            self._expect(router.db_for_write(Booking), DEFAULT_DB_ALIAS, 'db_for_write')
+            with transaction.atomic():
+                self._expect(router.db_for_read(Booking), DEFAULT_DB_ALIAS, 'db_for_read в транзакции')
+        self._expect(router.allow_migrate(alias, 'bookings'), False, 'миграции на реплике')
+        self._expect(router.allow_migrate(DEFAULT_DB_ALIAS, 'bookings'), True, 'миграции в основной БД')
+
+    def _check_views(self, sticky):
+        writer, other = Client(), Client()
+
+        self._expect(self._emails(other, REPLICA_ONLY_EMAIL), [REPLICA_ONLY_EMAIL],
+                     'API-список читается с реплики')
+
+        response = writer.post('/api/create-booking/', {
+            'user_email': WRITER_EMAIL,
+            'room_number': 'W1',
+            'booking_date': str(date.today() + timedelta(days=1)),
+            'start_time': '10:00',
+            'end_time': '11:00',
+            'booking_type': 'lesson',
+        }, content_type='application/json')
+        self._expect(response.status_code, 201, 'создание бронирования')
+        self._expect(Booking.objects.using(REPLICA_ALIAS).filter(user_email=WRITER_EMAIL).exists(), False,
+                     'запись не попала на реплику')
+
+        self._expect(self._emails(writer, WRITER_EMAIL), [WRITER_EMAIL],
+                     'автор видит своё бронирование (cookie)')
+        self._expect(self._emails(other, WRITER_EMAIL, page_size=5), [WRITER_EMAIL],
+                     'read-your-writes по user_email без cookie')
+
+        # Общий список попадёт в кэш под новой версией — его собирает основная БД
+        page = other.get('/api/bookings/', {'page_size': 500}).json()['results']
+        emails = {row['user_email'] for row in page}
+        self._expect((WRITER_EMAIL in emails, REPLICA_ONLY_EMAIL in emails), (True, False),
+                     'кэшируемый ответ после записи читается из основной БД')
+
+        time.sleep(sticky + 0.1)
+        self._expect(self._emails(other, WRITER_EMAIL, page_size=6), [],
+                     'после окна липкости чтение снова с реплики')
+        response = writer.get('/bookings/', {'email': REPLICA_ONLY_EMAIL})
+        self._expect(REPLICA_ONLY_EMAIL in response.content.decode(), True, 'HTML-список читается с реплики')
+
+    @staticmethod
+    def _emails(client, user_email, **params):
+        response = client.get('/api/bookings/', {'user_email': user_email, **params})
+        return [row['user_email'] for row in response.json()['results']]
+
+    @contextmanager
+    def _replica(self):
+        temp_dir = tempfile.mkdtemp(prefix='booking-replica-')
+        path = os.path.join(temp_dir, 'replica.sqlite3')
+        connections.settings[REPLICA_ALIAS] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+            REPLICA_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+        })[REPLICA_ALIAS]
+        try:
+            yield REPLICA_ALIAS
+        finally:
+            connections[REPLICA_ALIAS].close()
+            del connections[REPLICA_ALIAS]
+            del connections.settings[REPLICA_ALIAS]
+            if os.path.exists(path):
+                os.remove(path)
+            os.rmdir(temp_dir)
+
+    @staticmethod
+    def _copy_to_replica(alias):
+        """Снимок основной БД в файл реплики (sqlite3 backup API)"""
+        source = sqlite3.connect(connection.settings_dict['NAME'])
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def _expect(self, actual, expected, what):
+        if actual != expected:
+            raise CommandError(f'{what}: ожидалось {expected!r}, получено {actual!r}')
+        self.stdout.write(f'OK  {what}')
@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from bookings.api_views import BookingViewSet
+from bookings.availability_index import AvailabilityIndex
+from bookings.models import Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.views import BookingListView
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет через EXPLAIN, что запросы представлений бронирований используют индексы. '
+        'По умолчанию создаёт временную БД и заполняет её 1 000 000 бронирований.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--current-db', action='store_true',
+                            help='Использовать текущую БД без заполнения')
+
+    def handle(self, *args, **options):
+        if options['current_db']:
+            self._check_all()
+            return
+
+        with temporary_database():
+            started = time.perf_counter()
+            seed_bookings(options['rows'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(
+                f'Создано {options["rows"]} бронирований за {time.perf_counter() - started:.1f}s'
+            )
+            self._check_all()
+
+    def _check_all(self):
+        sample = Booking.objects.order_by('?').values(
+            'user_email', 'room_number', 'booking_date'
+        ).first() or {'user_email': 'user1@university.edu', 'room_number': '101',
+                      'booking_date': '2026-01-01'}
+
+        checks = [
+            (
+                'BookingViewSet ?user_email=',
+                self._viewset_queryset({'user_email': sample['user_email']}),
+                'booking_email_created_idx',
+            ),
+            (
+                'BookingListView (без фильтров)',
+                self._list_view_queryset({})[:20],
+                'booking_created_idx',
+            ),
+            (
+                'BookingListView ?status=',
+                self._list_view_queryset({'status': 'pending'})[:20],
+                'booking_status_created_idx',
+            ),
+            (
+                'BookingListView ?date=',
+                self._list_view_queryset({'date': str(sample['booking_date'])})[:20],
+                'booking_date_created_idx',
+            ),
+            (
+                'BookingListView ?email= (icontains)',
+                self._list_view_queryset({'email': sample['user_email'].split('@')[0]})[:20],
+                'booking_email_trgm_idx' if connection.vendor == 'postgresql' else None,
+            ),
+            (
+                'AvailabilityIndex: корзина аудитории',
+                AvailabilityIndex.bucket_queryset(sample['room_number'], sample['booking_date']),
+                'booking_room_date_start_idx',
+            ),
+        ]
+
+        failed = []
+        for name, queryset, expected_index in checks:
+            plan = queryset.explain()
+            ok = expected_index is None or expected_index in plan
+            marker = self.style.SUCCESS('OK  ') if ok else self.style.ERROR('FAIL')
+            self.stdout.write(f'{marker} {name} (ожидается: {expected_index or "—"})')
+            self.stdout.write('     ' + plan.replace('\n', '\n     '))
+            if not ok:
+                failed.append(name)
+
+        if failed:
+            raise CommandError(f'Индекс не используется: {", ".join(failed)}')
+
+    @staticmethod
+    def _viewset_queryset(params):
+        view = BookingViewSet()
+        view.request = Request(RequestFactory().get('/api/bookings/', params))
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    @staticmethod
+    def _list_view_queryset(params):
+        view = BookingListView()
+        view.setup(RequestFactory().get('/bookings/', params))
+        return view.get_queryset()
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from bookings import http_client
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.timing import format_summary, summarize
+
+PAYLOAD = {
+    'room_number': '101',
+    'booking_date': '2026-02-15',
+    'start_time': '10:00:00',
+    'end_time': '12:00:00',
+    'booking_type': 'lesson',
+}
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: новое соединение на каждый запрос против общего пула'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--latency', type=float, default=0.002,
+                            help='Искусственная задержка заглушки, секунды')
+
+    def _run(self, stub, call, total, threads):
+        url = f'{stub.url}/check-availability/'
+
+        def one(_):
+            started = time.perf_counter()
+            response = call(url)
+            response.raise_for_status()
+            response.json()
+            return time.perf_counter() - started
+
+        stub.reset_stats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            samples = list(executor.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+        return samples, elapsed, stub.connections
+
+    def handle(self, *args, **options):
+        total, threads = options['requests'], options['threads']
+
+        with StubAvailabilityServer(latency=options['latency']) as stub:
+            unpooled = self._run(
+                stub,
+                lambda url: requests.post(url, json=PAYLOAD, timeout=(2, 10)),
+                total, threads,
+            )
+
+            http_client.reset_session()
+            session = http_client.get_session()
+            timeout = http_client.get_timeout()
+            pooled = self._run(
+                stub,
+                lambda url: session.post(url, json=PAYLOAD, timeout=timeout),
+                total, threads,
+            )
+
+        for name, (samples, elapsed, connections) in (('requests.post', unpooled),
+                                                      ('pooled session', pooled)):
+            self.stdout.write(format_summary(name, summarize(samples)))
+            self.stdout.write(
+                f'{"":<32} соединений={connections} '
+                f'запросов/с={total / elapsed:.0f}'
+            )
@@ -0,0 +1,110 @@
+import platform
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from bookings.availability_index import availability_index
+from bookings.models import Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.seed import seed_bookings
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.suite import (
+    SCENARIOS, SuiteState, compare_reports, load_report, run_scenario, save_report,
+)
+from bookings.perf.timing import format_summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводимый офлайн-прогон производительности: сид данных, сценарии '
+        'create/list/filter/stats/delete, отчёт p50/p95/p99 и пропускной способности '
+        'с возможностью сравнения с прошлым прогоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help='Сценарии через запятую: ' + ', '.join(SCENARIOS))
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--rows', type=int, default=50_000,
+                            help='Сколько бронирований засеять во временную БД')
+        parser.add_argument('--rooms', type=int, default=300)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--current-db', action='store_true',
+                            help='Прогон по текущей БД (засеянной seed_bookings) вместо временной')
+        parser.add_argument('--mode', choices=('local', 'authoritative'), default='local',
+                            help='authoritative — проверка доступности через локальную заглушку')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Задержка заглушки сервиса доступности, секунды')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Доля ответов 500 от заглушки')
+        parser.add_argument('--output', help='Куда сохранить отчёт JSON')
+        parser.add_argument('--compare', help='Отчёт прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+        baseline = load_report(options['compare']) if options['compare'] else None
+
+        with ExitStack() as stack:
+            if not options['current_db']:
+                stack.enter_context(temporary_database())
+                self.stdout.write(f'Сид {options["rows"]} бронирований во временную БД...')
+                seed_bookings(
+                    options['rows'], rooms=options['rooms'], users=options['users'],
+                    days=options['days'], seed=options['seed'],
+                )
+            if options['mode'] == 'authoritative':
+                stub = stack.enter_context(StubAvailabilityServer(
+                    latency=options['latency'], error_rate=options['error_rate'],
+                ))
+                stack.enter_context(override_settings(
+                    AVAILABILITY_SERVICE_URL=stub.url,
+                    AVAILABILITY_MODE='authoritative',
+                ))
+            availability_index.clear()
+
+            state = SuiteState(options['rooms'], options['users'], options['days'])
+            report = {
+                'meta': {
+                    'started_at': datetime.now().isoformat(timespec='seconds'),
+                    'rows': Booking.objects.count(),
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'mode': options['mode'],
+                    'check_mode': getattr(settings, 'BOOKING_CHECK_MODE', 'inline'),
+                    'latency': options['latency'],
+                    'error_rate': options['error_rate'],
+                    'requests': options['requests'],
+                    'threads': options['threads'],
+                    'seed': options['seed'],
+                },
+                'scenarios': {},
+            }
+
+            for name in names:
+                summary = run_scenario(
+                    SCENARIOS[name], state, options['requests'], options['threads'], options['seed'],
+                )
+                report['scenarios'][name] = summary
+                self.stdout.write(format_summary(name, summary))
+                self.stdout.write(
+                    f'{"":<32} запросов/с={summary["throughput_rps"]:.1f} ошибок={summary["errors"]}'
+                )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(f'Отчёт сохранён: {options["output"]}')
+
+        if baseline is not None:
+            self.stdout.write('Сравнение с ' + options['compare'] + ':')
+            for line in compare_reports(baseline, report):
+                self.stdout.write('  ' + line)
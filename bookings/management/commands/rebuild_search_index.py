@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from bookings.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс бронирований SQLite (FTS5) и восстанавливает '
+        'триггеры синхронизации. Индекс PostgreSQL обновляется самой СУБД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f'{connection.vendor}: перестраивать нечего')
+            return
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
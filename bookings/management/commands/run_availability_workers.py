@@ -0,0 +1,65 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from bookings.services import get_booking_service
+from bookings.task_queue import get_queue_settings, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры очереди отложенных проверок доступности '
+        '(BOOKING_CHECK_MODE=deferred). Останавливается по SIGINT/SIGTERM.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Число потоков-воркеров в процессе')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза при пустой очереди, секунды')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Остановка воркеров...')
+            stop_event.set()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, stop)
+            signal.signal(signal.SIGTERM, stop)
+
+        booking_service = get_booking_service()
+        batch_size = options['batch_size'] or get_queue_settings()['BATCH_SIZE']
+        totals = []
+
+        def work():
+            totals.append(run_worker(
+                booking_service,
+                stop_event,
+                poll_interval=options['poll_interval'],
+                batch_size=batch_size,
+                exit_when_empty=options['once'],
+            ))
+
+        threads = [
+            threading.Thread(target=work, name=f'availability-worker-{number}')
+            for number in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+
+        summary = {
+            key: sum(total[key] for total in totals)
+            for key in ('confirmed', 'rejected', 'retried', 'dead')
+        }
+        self.stdout.write(self.style.SUCCESS(
+            'Обработано: ' + ', '.join(f'{key}={value}' for key, value in summary.items())
+        ))
@@ -0,0 +1,106 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client, override_settings
+
+from bookings.models import Booking
+from bookings.perf.database import temporary_database
+from bookings.perf.stub_availability import StubAvailabilityServer
+from bookings.perf.timing import format_summary, summarize
+
+
+def find_overlaps(rows):
+    """Пары пересекающихся подтверждённых бронирований (rows отсортированы по аудитории, дате, началу)"""
+    overlaps = []
+    previous = None
+    for row in rows:
+        booking_id, room_number, booking_date, start, end = row
+        if previous and previous[1:3] == (room_number, booking_date) and start < previous[4]:
+            overlaps.append((previous[0], booking_id))
+        if not previous or previous[1:3] != (room_number, booking_date) or end > previous[4]:
+            previous = row
+    return overlaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка подтверждения: множество параллельных запросов на '
+        'пересекающиеся слоты одних и тех же аудиторий. Завершается ошибкой, если '
+        'в БД оказались пересекающиеся confirmed-бронирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=64)
+        parser.add_argument('--rooms', type=int, default=3)
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Задержка заглушки сервиса доступности, секунды')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        booking_date = str(date.today() + timedelta(days=1))
+        payloads = []
+        for number in range(options['requests']):
+            start_hour = rng.randint(8, 18)
+            payloads.append({
+                'user_email': f'user{number}@example.com',
+                'room_number': str(100 + rng.randrange(options['rooms'])),
+                'booking_date': booking_date,
+                'start_time': f'{start_hour:02d}:{rng.choice(("00", "30"))}',
+                'end_time': f'{start_hour + rng.randint(1, 2):02d}:00',
+                'booking_type': 'lesson',
+            })
+
+        with temporary_database(), StubAvailabilityServer(latency=options['latency']) as stub:
+            # В режиме authoritative все запросы проходят локальную проверку до
+            # того, как первый из них запишет бронирование, — окно гонки максимально
+            with override_settings(AVAILABILITY_SERVICE_URL=stub.url,
+                                   AVAILABILITY_MODE='authoritative',
+                                   AVAILABILITY_CACHE={'BACKEND': None},
+                                   BOOKING_CHECK_MODE='inline'):
+                samples, statuses, elapsed = self._fire(payloads, options['threads'])
+
+            rows = list(
+                Booking.objects.filter(status='confirmed')
+                .order_by('room_number', 'booking_date', 'start_time')
+                .values_list('id', 'room_number', 'booking_date', 'start_time', 'end_time')
+            )
+            overlaps = find_overlaps(rows)
+
+        self.stdout.write(format_summary('POST create-booking', summarize(samples)))
+        self.stdout.write(
+            f'{"":<32} время={elapsed:.2f}s запросов/с={len(payloads) / elapsed:.0f} '
+            f'статусы={dict(statuses)}'
+        )
+
+        if overlaps:
+            raise CommandError(f'Найдены пересекающиеся подтверждённые бронирования: {overlaps[:10]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересечений нет: подтверждено {len(rows)} из {len(payloads)}'
+        ))
+
+    def _fire(self, payloads, threads):
+        client = Client()
+        statuses = Counter()
+
+        def one(payload):
+            started = time.perf_counter()
+            try:
+                response = client.post('/api/create-booking/', payload, content_type='application/json')
+            finally:
+                close_old_connections()
+            if response.status_code != 201:
+                raise CommandError(f'HTTP {response.status_code}: {response.content[:300]!r}')
+            statuses[response.json()['booking']['status']] += 1
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            samples = list(executor.map(one, payloads))
+        return samples, statuses, time.perf_counter() - started
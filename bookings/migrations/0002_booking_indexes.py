@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+def create_email_trigram_index(apps, schema_editor):
+    """
+    Триграммный индекс для поиска user_email__icontains
+
+    Django строит для icontains на PostgreSQL условие UPPER(user_email::text) LIKE UPPER(...),
+    поэтому индекс создаётся по тому же выражению. На других СУБД пропускается.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS booking_email_trgm_idx ON bookings_booking '
+        'USING gin (UPPER("user_email"::text) gin_trgm_ops)'
+    )
+
+
+def drop_email_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS booking_email_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room_number', 'booking_date', 'start_time'], name='booking_room_date_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user_email', '-created_at'], name='booking_email_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', '-created_at'], name='booking_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_date', '-created_at'], name='booking_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at'], name='booking_created_idx'),
+        ),
+        migrations.RunPython(create_email_trigram_index, drop_email_trigram_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='booking',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Бронирование', 'verbose_name_plural': 'Бронирования'},
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_email_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_status_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_date_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user_email', '-created_at', '-id'], name='booking_email_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='booking_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_date', '-created_at', '-id'], name='booking_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+        ),
+    ]
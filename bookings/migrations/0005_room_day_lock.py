@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+OVERLAPS_REPORT_LIMIT = 50
+
+
+def find_overlapping_confirmed(connection, limit: int = OVERLAPS_REPORT_LIMIT) -> list:
+    """Пары пересекающихся подтверждённых бронирований одной аудитории"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT a.id, b.id, a.room_number, a.booking_date, '
+            'a.start_time, a.end_time, b.start_time, b.end_time '
+            'FROM bookings_booking a JOIN bookings_booking b '
+            'ON a.room_number = b.room_number AND a.booking_date = b.booking_date '
+            'AND a.id < b.id AND a.start_time < b.end_time AND b.start_time < a.end_time '
+            "WHERE a.status = 'confirmed' AND b.status = 'confirmed' "
+            'ORDER BY a.booking_date, a.room_number, a.id, b.id '
+            'LIMIT %s',
+            [limit],
+        )
+        return cursor.fetchall()
+
+
+def overlaps_report(overlaps: list) -> str:
+    lines = [
+        f'  аудитория {room_number}, {booking_date}: '
+        f'#{first_id} {first_start}-{first_end} и #{second_id} {second_start}-{second_end}'
+        for first_id, second_id, room_number, booking_date, first_start, first_end, second_start, second_end
+        in overlaps
+    ]
+    more = ' (показаны первые)' if len(overlaps) >= OVERLAPS_REPORT_LIMIT else ''
+    return (
+        f'Найдены пересекающиеся подтверждённые бронирования{more}:\n' + '\n'.join(lines) + '\n'
+        'Отклоните или перенесите лишние бронирования (статус rejected или cancelled) '
+        'и повторите migrate.'
+    )
+
+
+def create_overlap_exclusion(apps, schema_editor):
+    """
+    Запрет пересечения подтверждённых бронирований одной аудитории на уровне БД
+
+    Дополняет блокировку RoomDayLock: даже запись в обход BookingService не
+    сможет создать два пересекающихся confirmed-бронирования. Есть только
+    в PostgreSQL (нужно расширение btree_gist), на других СУБД пропускается.
+
+    Бронирования, созданные до блокировки, могут уже пересекаться, и тогда
+    ограничение не создать. Какое из них оставить, решает человек, поэтому
+    миграция останавливается со списком пересечений.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    overlaps = find_overlapping_confirmed(schema_editor.connection)
+    if overlaps:
+        raise RuntimeError(overlaps_report(overlaps))
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE bookings_booking ADD CONSTRAINT booking_no_overlap_confirmed '
+        'EXCLUDE USING gist ('
+        '"room_number" WITH =, '
+        'tsrange("booking_date" + "start_time", "booking_date" + "end_time") WITH &&'
+        ") WHERE (\"status\" = 'confirmed')"
+    )
+
+
+def drop_overlap_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_no_overlap_confirmed'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_availability_check_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_number', models.CharField(max_length=50, verbose_name='Номер аудитории')),
+                ('booking_date', models.DateField(verbose_name='Дата')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Блокировка аудитории на дату',
+                'verbose_name_plural': 'Блокировки аудиторий на дату',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomdaylock',
+            constraint=models.UniqueConstraint(fields=('room_number', 'booking_date'), name='room_day_lock_unique'),
+        ),
+        migrations.RunPython(create_overlap_exclusion, drop_overlap_exclusion),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+SLOT_MINUTES = 5
+BITMAP_BYTES = 36
+
+
+def _slot_mask(start, end):
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    last = -(-(end.hour * 60 + end.minute + (1 if end.second else 0)) // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def build_occupancy(apps, schema_editor):
+    """Карты занятости для уже существующих подтверждённых бронирований"""
+    Booking = apps.get_model('bookings', 'Booking')
+    RoomDayOccupancy = apps.get_model('bookings', 'RoomDayOccupancy')
+
+    masks = {}
+    rows = Booking.objects.filter(status='confirmed').values_list(
+        'room_number', 'booking_date', 'start_time', 'end_time'
+    )
+    for room_number, booking_date, start, end in rows.iterator(chunk_size=5000):
+        key = (room_number, booking_date)
+        masks[key] = masks.get(key, 0) | _slot_mask(start, end)
+
+    RoomDayOccupancy.objects.bulk_create(
+        [
+            RoomDayOccupancy(
+                room_number=room_number,
+                booking_date=booking_date,
+                bitmap=mask.to_bytes(BITMAP_BYTES, 'little'),
+            )
+            for (room_number, booking_date), mask in masks.items() if mask
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_room_day_lock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_number', models.CharField(max_length=50, verbose_name='Номер аудитории')),
+                ('booking_date', models.DateField(verbose_name='Дата')),
+                ('bitmap', models.BinaryField(verbose_name='Битовая карта слотов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Занятость аудитории за день',
+                'verbose_name_plural': 'Занятость аудиторий по дням',
+                'indexes': [models.Index(fields=['booking_date', 'room_number'], name='occupancy_date_room_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomdayoccupancy',
+            constraint=models.UniqueConstraint(fields=('room_number', 'booking_date'), name='room_day_occupancy_unique'),
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_room_day_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_email', models.EmailField(max_length=254, verbose_name='Email пользователя')),
+                ('room_number', models.CharField(max_length=50, verbose_name='Номер аудитории')),
+                ('start_time', models.TimeField(verbose_name='Время начала')),
+                ('end_time', models.TimeField(verbose_name='Время окончания')),
+                ('booking_type', models.CharField(choices=[('lesson', 'Занятие'), ('exam', 'Экзамен'), ('meeting', 'Собрание')], default='lesson', max_length=20, verbose_name='Тип бронирования')),
+                ('purpose', models.TextField(blank=True, verbose_name='Цель бронирования')),
+                ('frequency', models.CharField(choices=[('daily', 'Ежедневно'), ('weekly', 'Еженедельно')], default='weekly', max_length=10, verbose_name='Периодичность')),
+                ('interval', models.PositiveSmallIntegerField(default=1, verbose_name='Интервал')),
+                ('weekdays', models.JSONField(blank=True, default=list, verbose_name='Дни недели (0 — понедельник)')),
+                ('start_date', models.DateField(verbose_name='Дата начала')),
+                ('until', models.DateField(blank=True, null=True, verbose_name='Повторять до')),
+                ('count', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Количество повторений')),
+                ('status', models.CharField(choices=[('active', 'Активна'), ('cancelled', 'Отменена')], default='active', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Серия бронирований',
+                'verbose_name_plural': 'Серии бронирований',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В ожидании'), ('confirmed', 'Подтверждено'), ('rejected', 'Отклонено'), ('cancelled', 'Отменено')], default='pending', max_length=20, verbose_name='Статус'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='bookings.bookingseries', verbose_name='Серия'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_booking_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabilitychecktask',
+            name='request_id',
+            field=models.CharField(blank=True, max_length=64, verbose_name='ID запроса'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_availability_task_request_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('compression', models.CharField(choices=[('zstd', 'zstd'), ('gzip', 'gzip')], max_length=10, verbose_name='Сжатие')),
+                ('date_from', models.DateField(verbose_name='Даты с')),
+                ('date_to', models.DateField(verbose_name='Даты по')),
+                ('row_count', models.PositiveIntegerField(verbose_name='Бронирований')),
+                ('size_bytes', models.PositiveBigIntegerField(verbose_name='Размер, байт')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Сегмент архива бронирований',
+                'verbose_name_plural': 'Сегменты архива бронирований',
+                'ordering': ['date_from', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('booking_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID бронирования')),
+                ('user_email', models.EmailField(max_length=254, verbose_name='Email пользователя')),
+                ('booking_date', models.DateField(verbose_name='Дата бронирования')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.bookingarchivesegment', verbose_name='Сегмент')),
+            ],
+            options={
+                'verbose_name': 'Архивное бронирование',
+                'verbose_name_plural': 'Архивные бронирования',
+            },
+        ),
+    ]
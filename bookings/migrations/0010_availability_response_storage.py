@@ -0,0 +1,162 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:21
+
+import hashlib
+import json
+import zlib
+
+from django.db import migrations, models, transaction
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+COMPRESS_MIN_BYTES = 256
+
+
+def _encode(payload):
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode()
+    digest = hashlib.sha256(raw).hexdigest()
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            return digest, 'zlib', compressed, len(raw)
+    return digest, 'none', raw, len(raw)
+
+
+def _decode(compression, data):
+    data = bytes(data)
+    if compression == 'zlib':
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+def _batches(queryset, *fields):
+    """Пачки строк по возрастанию id"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values('id', *fields)[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def move_responses(apps, schema_editor):
+    """Переносит ответы из Booking.availability_check_response в AvailabilityResponse"""
+    Booking = apps.get_model('bookings', 'Booking')
+    AvailabilityResponse = apps.get_model('bookings', 'AvailabilityResponse')
+
+    queryset = Booking.objects.filter(availability_check_response__isnull=False)
+    for rows in _batches(queryset, 'availability_check_response'):
+        with transaction.atomic():
+            _move_batch(Booking, AvailabilityResponse, rows)
+
+
+def _move_batch(Booking, AvailabilityResponse, rows):
+    encoded = {}
+    digests = {}
+    for row in rows:
+        payload = row['availability_check_response']
+        digest, compression, data, size = _encode(payload)
+        digests[row['id']] = (digest, payload)
+        encoded.setdefault(digest, (compression, data, size))
+
+    ids = dict(AvailabilityResponse.objects.filter(digest__in=list(encoded)).values_list('digest', 'id'))
+    AvailabilityResponse.objects.bulk_create([
+        AvailabilityResponse(digest=digest, compression=compression, payload=data, size=size)
+        for digest, (compression, data, size) in encoded.items() if digest not in ids
+    ])
+    ids.update(AvailabilityResponse.objects.filter(digest__in=list(encoded)).values_list('digest', 'id'))
+
+    bookings = []
+    for booking_id, (digest, payload) in digests.items():
+        payload = payload if isinstance(payload, dict) else {}
+        bookings.append(Booking(
+            id=booking_id,
+            availability_response_id=ids[digest],
+            check_success=bool(payload.get('success')),
+            check_available=bool(payload.get('available')),
+            check_error=str(payload.get('error') or '')[:50],
+        ))
+    Booking.objects.bulk_update(
+        bookings, ['availability_response', 'check_success', 'check_available', 'check_error']
+    )
+
+
+def restore_responses(apps, schema_editor):
+    """Возвращает ответы в Booking.availability_check_response"""
+    Booking = apps.get_model('bookings', 'Booking')
+    AvailabilityResponse = apps.get_model('bookings', 'AvailabilityResponse')
+
+    queryset = Booking.objects.filter(availability_response__isnull=False)
+    for rows in _batches(queryset, 'availability_response'):
+        with transaction.atomic():
+            _restore_batch(Booking, AvailabilityResponse, rows)
+
+
+def _restore_batch(Booking, AvailabilityResponse, rows):
+    response_ids = {row['availability_response'] for row in rows}
+    payloads = {
+        response_id: _decode(compression, data)
+        for response_id, compression, data in AvailabilityResponse.objects.filter(
+            pk__in=response_ids
+        ).values_list('id', 'compression', 'payload')
+    }
+    Booking.objects.bulk_update(
+        [
+            Booking(id=row['id'], availability_check_response=payloads[row['availability_response']])
+            for row in rows
+        ],
+        ['availability_check_response'],
+    )
+
+
+class Migration(migrations.Migration):
+    # Данные переносятся пачками в отдельных транзакциях, без одной
+    # длинной транзакции на всю таблицу
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0009_booking_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('compression', models.CharField(choices=[('none', 'Без сжатия'), ('zlib', 'zlib')], default='none', max_length=10, verbose_name='Сжатие')),
+                ('payload', models.BinaryField(verbose_name='Ответ')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер без сжатия, байт')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Ответ сервиса доступности',
+                'verbose_name_plural': 'Ответы сервиса доступности',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='check_available',
+            field=models.BooleanField(blank=True, null=True, verbose_name='Аудитория свободна'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='check_error',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Код ошибки проверки'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='check_success',
+            field=models.BooleanField(blank=True, null=True, verbose_name='Проверка выполнена'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='availability_response',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='bookings.availabilityresponse', verbose_name='Ответ от сервиса доступности'),
+        ),
+        migrations.RunPython(move_responses, restore_responses),
+        migrations.RemoveField(
+            model_name='booking',
+            name='availability_check_response',
+        ),
+    ]
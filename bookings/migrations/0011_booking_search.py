@@ -0,0 +1,103 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'bookings_booking_fts'
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        room_number, user_email, purpose,
+        content='bookings_booking', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '@.-_'", prefix='2 3 4 6'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON bookings_booking BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, room_number, user_email, purpose)
+        VALUES (new.id, new.room_number, new.user_email, new.purpose);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON bookings_booking BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, room_number, user_email, purpose)
+        VALUES ('delete', old.id, old.room_number, old.user_email, old.purpose);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF room_number, user_email, purpose ON bookings_booking BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, room_number, user_email, purpose)
+        VALUES ('delete', old.id, old.room_number, old.user_email, old.purpose);
+        INSERT INTO {FTS_TABLE}(rowid, room_number, user_email, purpose)
+        VALUES (new.id, new.room_number, new.user_email, new.purpose);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# CONCURRENTLY не блокирует запись в таблицу на время построения индекса
+POSTGRES_INSTALL = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS booking_search_idx ON bookings_booking USING gin ((
+        setweight(to_tsvector('simple', coalesce(room_number, '')), 'A') ||
+        setweight(to_tsvector('simple', translate(coalesce(user_email, ''), '@._-', '    ')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(purpose, '')), 'C')
+    ))
+    """,
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX CONCURRENTLY IF EXISTS booking_search_idx',
+]
+
+
+def _has_fts5(cursor):
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(value)')
+    except OperationalError:
+        return False
+    cursor.execute('DROP TABLE temp.fts5_probe')
+    return True
+
+
+def install(apps, schema_editor):
+    """Поисковый индекс бронирований (bookings/search.py)"""
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite' and _has_fts5(cursor):
+            statements = SQLITE_INSTALL
+        elif vendor == 'postgresql':
+            statements = POSTGRES_INSTALL
+        else:
+            # Без FTS5 поиск работает через icontains
+            return
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0010_availability_response_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
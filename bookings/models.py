@@ -6,10 +6,15 @@ class Booking(models.Model):
     """
     Модель бронирования аудитории
     """
+    # Поля, которые меняет присваивание availability_check_response
+    # (для save(update_fields=...))
+    AVAILABILITY_FIELDS = ['availability_response', 'check_success', 'check_available', 'check_error']
+
     STATUS_CHOICES = [
         ('pending', 'В ожидании'),
         ('confirmed', 'Подтверждено'),
         ('rejected', 'Отклонено'),
+        ('cancelled', 'Отменено'),
     ]
 
     BOOKING_TYPE_CHOICES = [
@@ -33,6 +38,14 @@ class Booking(models.Model):
         verbose_name='Тип бронирования'
     )
     purpose = models.TextField(verbose_name='Цель бронирования', blank=True)
+    series = models.ForeignKey(
+        'BookingSeries',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        verbose_name='Серия'
+    )
 
     # Статус и результат проверки
     status = models.CharField(
@@ -41,11 +54,19 @@ class Booking(models.Model):
         default='pending',
         verbose_name='Статус'
     )
-    availability_check_response = models.JSONField(
+    # Полный ответ сервиса доступности — в AvailabilityResponse
+    # (см. availability_check_response и bookings/availability_responses.py)
+    availability_response = models.ForeignKey(
+        'AvailabilityResponse',
+        on_delete=models.PROTECT,
         null=True,
         blank=True,
+        related_name='bookings',
         verbose_name='Ответ от сервиса доступности'
     )
+    check_success = models.BooleanField(null=True, blank=True, verbose_name='Проверка выполнена')
+    check_available = models.BooleanField(null=True, blank=True, verbose_name='Аудитория свободна')
+    check_error = models.CharField(max_length=50, blank=True, verbose_name='Код ошибки проверки')
 
     # Метаданные
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
@@ -54,13 +75,307 @@ class Booking(models.Model):
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
-        ordering = ['-created_at']
+        # id разрешает совпадения created_at и задаёт стабильный порядок для keyset-пагинации
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Проверка конфликтов: бронирования аудитории за день по времени начала
+            models.Index(fields=['room_number', 'booking_date', 'start_time'], name='booking_room_date_start_idx'),
+            # /api/bookings/?user_email=... с сортировкой по умолчанию
+            models.Index(fields=['user_email', '-created_at', '-id'], name='booking_email_created_idx'),
+            # Фильтры списка по статусу и дате
+            models.Index(fields=['status', '-created_at', '-id'], name='booking_status_created_idx'),
+            models.Index(fields=['booking_date', '-created_at', '-id'], name='booking_date_created_idx'),
+            # Список без фильтров
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            # Max(updated_at) для ETag/Last-Modified (bookings/cache.py:get_bookings_state)
+            models.Index(fields=['updated_at'], name='booking_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.room_number} - {self.booking_date} ({self.user_email})"
 
+    @property
+    def availability_check_response(self):
+        """Ответ от сервиса доступности; загружается при первом обращении"""
+        if '_availability_payload' not in self.__dict__:
+            from .availability_responses import load_payload
+            self._availability_payload = load_payload(self.availability_response_id)
+        return self._availability_payload
+
+    @availability_check_response.setter
+    def availability_check_response(self, payload):
+        from .availability_responses import summary_fields
+
+        self._availability_payload = payload
+        self._availability_payload_dirty = True
+        for name, value in summary_fields(payload).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        if self.__dict__.pop('_availability_payload_dirty', False):
+            from .availability_responses import store_payloads
+            self.availability_response_id = store_payloads([self._availability_payload])[0]
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'availability_response' in fields:
+            self.__dict__.pop('_availability_payload', None)
+            self.__dict__.pop('_availability_payload_dirty', None)
+
     def clean(self):
         """Валидация данных"""
         if self.start_time and self.end_time:
             if self.start_time >= self.end_time:
                 raise ValidationError('Время начала должно быть раньше времени окончания')
+
+
+class AvailabilityResponse(models.Model):
+    """
+    Ответ сервиса доступности, общий для бронирований с одинаковым ответом
+
+    Хранится канонический JSON (сжатый zlib, если так короче),
+    digest — его SHA-256 (bookings/availability_responses.py).
+    """
+    COMPRESSION_CHOICES = [
+        ('none', 'Без сжатия'),
+        ('zlib', 'zlib'),
+    ]
+
+    digest = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    compression = models.CharField(
+        max_length=10,
+        choices=COMPRESSION_CHOICES,
+        default='none',
+        verbose_name='Сжатие'
+    )
+    payload = models.BinaryField(verbose_name='Ответ')
+    size = models.PositiveIntegerField(verbose_name='Размер без сжатия, байт')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Ответ сервиса доступности'
+        verbose_name_plural = 'Ответы сервиса доступности'
+
+    def __str__(self):
+        return self.digest[:12]
+
+    @property
+    def data(self):
+        from .availability_responses import decode_payload
+        return decode_payload(self.compression, self.payload)
+
+
+class AvailabilityCheckTask(models.Model):
+    """
+    Задача отложенной проверки доступности (очередь в таблице БД)
+
+    Бронирование сохраняется со статусом pending, а воркеры
+    (manage.py run_availability_workers) забирают задачи пачками,
+    проверяют доступность и переводят бронирование в confirmed/rejected.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('processing', 'Обрабатывается'),
+        ('done', 'Выполнена'),
+        ('dead', 'Не выполнена'),
+    ]
+
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='availability_task',
+        verbose_name='Бронирование'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    available_at = models.DateTimeField(verbose_name='Доступна с')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Воркер')
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name='Заблокирована до')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    request_id = models.CharField(max_length=64, blank=True, verbose_name='ID запроса')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Задача проверки доступности'
+        verbose_name_plural = 'Задачи проверки доступности'
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='task_status_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"Проверка бронирования #{self.booking_id} ({self.status})"
+
+
+class RoomDayLock(models.Model):
+    """
+    Строка-замок для пары (аудитория, дата)
+
+    Подтверждение бронирования блокирует эту строку на время транзакции,
+    поэтому параллельные подтверждения одной аудитории в один день
+    выполняются по очереди, а разные аудитории не мешают друг другу.
+    """
+    room_number = models.CharField(max_length=50, verbose_name='Номер аудитории')
+    booking_date = models.DateField(verbose_name='Дата')
+    version = models.PositiveBigIntegerField(default=0, verbose_name='Версия')
+
+    class Meta:
+        verbose_name = 'Блокировка аудитории на дату'
+        verbose_name_plural = 'Блокировки аудиторий на дату'
+        constraints = [
+            models.UniqueConstraint(fields=['room_number', 'booking_date'], name='room_day_lock_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_number} — {self.booking_date}"
+
+
+class RoomDayOccupancy(models.Model):
+    """
+    Битовая карта занятости аудитории за день
+
+    Сутки делятся на слоты по OCCUPANCY_SLOT_MINUTES минут, бит i установлен,
+    если слот занят подтверждённым бронированием. Строки есть только для дней
+    с бронированиями; карта пересчитывается при изменении Booking
+    (bookings/occupancy.py).
+    """
+    room_number = models.CharField(max_length=50, verbose_name='Номер аудитории')
+    booking_date = models.DateField(verbose_name='Дата')
+    bitmap = models.BinaryField(verbose_name='Битовая карта слотов')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Занятость аудитории за день'
+        verbose_name_plural = 'Занятость аудиторий по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['room_number', 'booking_date'], name='room_day_occupancy_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['booking_date', 'room_number'], name='occupancy_date_room_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_number} — {self.booking_date}"
+
+
+class BookingSeries(models.Model):
+    """
+    Повторяющееся бронирование (подмножество RRULE: FREQ, INTERVAL, BYDAY, UNTIL, COUNT)
+
+    Вхождения — обычные записи Booking со ссылкой на серию, создаются
+    пакетно (bookings/recurrence.py).
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Ежедневно'),
+        ('weekly', 'Еженедельно'),
+    ]
+
+    STATUS_CHOICES = [
+        ('active', 'Активна'),
+        ('cancelled', 'Отменена'),
+    ]
+
+    user_email = models.EmailField(verbose_name='Email пользователя')
+    room_number = models.CharField(max_length=50, verbose_name='Номер аудитории')
+    start_time = models.TimeField(verbose_name='Время начала')
+    end_time = models.TimeField(verbose_name='Время окончания')
+    booking_type = models.CharField(
+        max_length=20,
+        choices=Booking.BOOKING_TYPE_CHOICES,
+        default='lesson',
+        verbose_name='Тип бронирования'
+    )
+    purpose = models.TextField(verbose_name='Цель бронирования', blank=True)
+
+    # Правило повторения
+    frequency = models.CharField(
+        max_length=10,
+        choices=FREQUENCY_CHOICES,
+        default='weekly',
+        verbose_name='Периодичность'
+    )
+    interval = models.PositiveSmallIntegerField(default=1, verbose_name='Интервал')
+    weekdays = models.JSONField(default=list, blank=True, verbose_name='Дни недели (0 — понедельник)')
+    start_date = models.DateField(verbose_name='Дата начала')
+    until = models.DateField(null=True, blank=True, verbose_name='Повторять до')
+    count = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Количество повторений')
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='active',
+        verbose_name='Статус'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Серия бронирований'
+        verbose_name_plural = 'Серии бронирований'
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return f"Серия {self.room_number} с {self.start_date} ({self.get_frequency_display()})"
+
+
+class BookingArchiveSegment(models.Model):
+    """
+    Сжатый NDJSON-файл с архивными бронированиями прошлых дат
+
+    Файлы лежат в BOOKING_ARCHIVE['DIR'], строки — в формате ответа
+    GET /api/bookings/{id}/ (bookings/archive.py).
+    """
+    COMPRESSION_CHOICES = [
+        ('zstd', 'zstd'),
+        ('gzip', 'gzip'),
+    ]
+
+    file_name = models.CharField(max_length=255, unique=True, verbose_name='Файл')
+    compression = models.CharField(max_length=10, choices=COMPRESSION_CHOICES, verbose_name='Сжатие')
+    date_from = models.DateField(verbose_name='Даты с')
+    date_to = models.DateField(verbose_name='Даты по')
+    row_count = models.PositiveIntegerField(verbose_name='Бронирований')
+    size_bytes = models.PositiveBigIntegerField(verbose_name='Размер, байт')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Сегмент архива бронирований'
+        verbose_name_plural = 'Сегменты архива бронирований'
+        ordering = ['date_from', 'id']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.date_from} — {self.date_to})"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Указатель на бронирование в архиве: id → сегмент
+
+    Сама запись хранится только в сжатом сегменте; по указателю бронирование
+    находится без распаковки остальных сегментов.
+    """
+    booking_id = models.BigIntegerField(primary_key=True, verbose_name='ID бронирования')
+    segment = models.ForeignKey(
+        BookingArchiveSegment,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name='Сегмент'
+    )
+    user_email = models.EmailField(verbose_name='Email пользователя')
+    booking_date = models.DateField(verbose_name='Дата бронирования')
+
+    class Meta:
+        verbose_name = 'Архивное бронирование'
+        verbose_name_plural = 'Архивные бронирования'
+
+    def __str__(self):
+        return f"#{self.booking_id} ({self.booking_date})"
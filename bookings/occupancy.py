@@ -0,0 +1,236 @@
+"""
+Занятость аудиторий в виде битовых карт
+
+Сутки делятся на слоты по SLOT_MINUTES минут (288 слотов по 5 минут), карта
+дня хранится как 36 байт в RoomDayOccupancy и в памяти разворачивается в int.
+Свободные интервалы здания за месяц считаются одним запросом и побитовыми
+операциями, без чтения строк Booking.
+
+Слот считается занятым, если бронирование пересекает его хотя бы частично.
+"""
+from datetime import date, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from .availability_index import as_date, as_time
+from .models import Booking, RoomDayOccupancy
+from .slot_locks import lock_slots
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = (SLOTS_PER_DAY + 7) // 8
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute + (1 if value.second or value.microsecond else 0)
+
+
+def slot_mask(start_time, end_time) -> int:
+    """Маска слотов, пересекающихся с [start_time, end_time)"""
+    first = _minutes(as_time(start_time)) // SLOT_MINUTES
+    last = -(-_minutes(as_time(end_time)) // SLOT_MINUTES)  # округление вверх
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def window_mask(from_time=None, to_time=None) -> int:
+    """Маска слотов, целиком лежащих в окне [from_time, to_time)"""
+    first = -(-_minutes(as_time(from_time)) // SLOT_MINUTES) if from_time else 0
+    last = _minutes(as_time(to_time)) // SLOT_MINUTES if to_time else SLOTS_PER_DAY
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(BITMAP_BYTES, 'little')
+
+
+def from_bytes(value) -> int:
+    return int.from_bytes(bytes(value), 'little')
+
+
+def slot_time(slot: int) -> str:
+    minutes = slot * SLOT_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def mask_to_runs(mask: int) -> List[Tuple[int, int]]:
+    """Непрерывные серии установленных битов в виде пар слотов [start, end)"""
+    runs = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        # shifted + 1 гасит младшую серию единиц и ставит бит сразу за ней
+        length = ((shifted + 1) & ~shifted).bit_length() - 1
+        runs.append((start, start + length))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
+
+
+def format_runs(runs: Iterable[Tuple[int, int]]) -> List[Dict[str, str]]:
+    return [{'start_time': slot_time(start), 'end_time': slot_time(end)} for start, end in runs]
+
+
+def build_mask(intervals: Iterable[Tuple[Any, Any]]) -> int:
+    mask = 0
+    for start, end in intervals:
+        mask |= slot_mask(start, end)
+    return mask
+
+
+def refresh_days(slots: Iterable[Tuple[str, Any]]):
+    """
+    Пересчитывает карты дней по подтверждённым бронированиям
+
+    Для любого числа пар (аудитория, дата) выполняется два чтения и не более
+    трёх пакетных записей. Пустые дни не хранятся. Пары блокируются
+    RoomDayLock до конца транзакции (см. bookings/slot_locks.py).
+    """
+    keys = {(room_number, as_date(booking_date)) for room_number, booking_date in slots}
+    if not keys:
+        return
+
+    # Та же блокировка, что при подтверждении: иначе удаление или отмена
+    # и подтверждение в том же дне запишут карты, посчитанные по разным
+    # снимкам, и последняя запись затрёт чужое изменение
+    with transaction.atomic():
+        lock_slots(keys)
+        rooms = {room_number for room_number, _ in keys}
+        date_range = (min(day for _, day in keys), max(day for _, day in keys))
+
+        masks = dict.fromkeys(keys, 0)
+        rows = Booking.objects.filter(
+            room_number__in=rooms,
+            booking_date__range=date_range,
+            status='confirmed',
+        ).values_list('room_number', 'booking_date', 'start_time', 'end_time')
+        for room_number, booking_date, start, end in rows:
+            key = (room_number, booking_date)
+            if key in masks:
+                masks[key] |= slot_mask(start, end)
+
+        existing = {
+            (row.room_number, row.booking_date): row
+            for row in RoomDayOccupancy.objects.filter(room_number__in=rooms, booking_date__range=date_range)
+            if (row.room_number, row.booking_date) in keys
+        }
+
+        to_create, to_update, to_delete = [], [], []
+        for key, mask in masks.items():
+            row = existing.get(key)
+            if not mask:
+                if row is not None:
+                    to_delete.append(row.pk)
+            elif row is None:
+                to_create.append(RoomDayOccupancy(room_number=key[0], booking_date=key[1], bitmap=to_bytes(mask)))
+            elif from_bytes(row.bitmap) != mask:
+                row.bitmap = to_bytes(mask)
+                to_update.append(row)
+
+        if to_delete:
+            RoomDayOccupancy.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RoomDayOccupancy.objects.bulk_update(to_update, ['bitmap'], batch_size=500)
+        if to_create:
+            RoomDayOccupancy.objects.bulk_create(to_create, batch_size=1000)
+
+
+def rebuild_all(chunk_size: int = 5000):
+    """
+    Перестраивает все карты занятости одним проходом по подтверждённым бронированиям
+
+    Нужна после массовой загрузки в обход сигналов (bulk_create, сидер).
+    Бронирования читаются по индексу booking_room_date_start_idx.
+    """
+    RoomDayOccupancy.objects.all().delete()
+
+    rows = Booking.objects.filter(status='confirmed').order_by(
+        'room_number', 'booking_date'
+    ).values_list('room_number', 'booking_date', 'start_time', 'end_time').iterator(chunk_size=chunk_size)
+
+    batch = []
+    key, mask = None, 0
+    for room_number, booking_date, start, end in rows:
+        if (room_number, booking_date) != key:
+            if key is not None and mask:
+                batch.append(RoomDayOccupancy(room_number=key[0], booking_date=key[1], bitmap=to_bytes(mask)))
+            key, mask = (room_number, booking_date), 0
+        mask |= slot_mask(start, end)
+        if len(batch) >= chunk_size:
+            RoomDayOccupancy.objects.bulk_create(batch)
+            batch = []
+
+    if key is not None and mask:
+        batch.append(RoomDayOccupancy(room_number=key[0], booking_date=key[1], bitmap=to_bytes(mask)))
+    RoomDayOccupancy.objects.bulk_create(batch)
+
+
+class OccupancyService:
+    """
+    Свободные и занятые интервалы аудиторий по битовым картам
+    """
+
+    MAX_DAYS = 366
+
+    def get_occupancy(self, date_from, date_to=None, room_numbers: Optional[List[str]] = None,
+                      from_time=None, to_time=None, min_duration: int = 0) -> Dict[str, Any]:
+        """
+        Занятость аудиторий за диапазон дат
+
+        Args:
+            date_from, date_to: Диапазон дат (включительно)
+            room_numbers: Аудитории; по умолчанию — все, у которых есть
+                бронирования в диапазоне
+            from_time, to_time: Рабочее окно дня, по умолчанию сутки целиком
+            min_duration: Минимальная длина свободного интервала, минуты
+
+        Returns:
+            {'slot_minutes': 5, 'results': [{'room_number', 'date', 'busy', 'free'}, ...]}
+        """
+        try:
+            date_from = as_date(date_from)
+            date_to = as_date(date_to) if date_to else date_from
+            window = window_mask(from_time, to_time)
+            min_duration = int(min_duration)
+        except ValueError:
+            raise ValueError('Некорректные параметры: даты YYYY-MM-DD, время HH:MM, min_duration в минутах')
+        if date_to < date_from:
+            raise ValueError('date_to не может быть раньше date_from')
+        if (date_to - date_from).days >= self.MAX_DAYS:
+            raise ValueError(f'Диапазон не может превышать {self.MAX_DAYS} дней')
+
+        min_slots = -(-min_duration // SLOT_MINUTES)
+
+        rows = RoomDayOccupancy.objects.filter(booking_date__range=(date_from, date_to))
+        if room_numbers:
+            rows = rows.filter(room_number__in=room_numbers)
+        bitmaps = {
+            (room_number, booking_date): from_bytes(bitmap)
+            for room_number, booking_date, bitmap in rows.values_list('room_number', 'booking_date', 'bitmap')
+        }
+
+        rooms = sorted(room_numbers) if room_numbers else sorted({room for room, _ in bitmaps})
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+        results = []
+        for room_number in rooms:
+            for day in days:
+                busy = bitmaps.get((room_number, day), 0) & window
+                free = window & ~busy
+                results.append({
+                    'room_number': room_number,
+                    'date': day.isoformat(),
+                    'busy': format_runs(mask_to_runs(busy)),
+                    'free': format_runs(
+                        (start, end) for start, end in mask_to_runs(free) if end - start >= min_slots
+                    ),
+                })
+
+        return {'slot_minutes': SLOT_MINUTES, 'results': results}
+
+
+occupancy_service = OccupancyService()
@@ -0,0 +1,143 @@
+"""
+Keyset-пагинация по (created_at, id)
+
+Вместо OFFSET следующая страница выбирается условием
+(created_at, id) < (последний created_at, последний id), поэтому глубина
+страницы не влияет на время запроса, вставки новых записей не сдвигают
+страницы, а общий COUNT(*) не нужен.
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, pk: int, reverse: bool = False) -> str:
+    raw = f"{'p' if reverse else 'n'}|{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, bool]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk), direction == 'p'
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Некорректный курсор') from e
+
+
+def keyset_page(queryset: QuerySet, cursor: Optional[str],
+                page_size: int) -> Tuple[List, Optional[str], Optional[str]]:
+    """
+    Возвращает страницу и курсоры соседних страниц
+
+    queryset может быть результатом .values() с колонками created_at и id —
+    тогда страница состоит из словарей.
+
+    Returns:
+        tuple: (объекты страницы, курсор следующей страницы, курсор предыдущей страницы)
+    """
+    reverse = False
+    queryset = queryset.order_by(*ORDERING)
+
+    if cursor:
+        created_at, pk, reverse = decode_cursor(cursor)
+        # Первое условие задаёт диапазон по индексу, второе отсекает совпадения created_at
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+            ).order_by('created_at', 'id')
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+            )
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if reverse:
+        items.reverse()
+
+    if not items:
+        return items, None, None
+
+    first, last = _position(items[0]), _position(items[-1])
+    if reverse:
+        next_cursor = encode_cursor(*last)
+        previous_cursor = encode_cursor(*first, reverse=True) if has_more else None
+    else:
+        next_cursor = encode_cursor(*last) if has_more else None
+        previous_cursor = encode_cursor(*first, reverse=True) if cursor else None
+    return items, next_cursor, previous_cursor
+
+
+def _position(item) -> Tuple[datetime, int]:
+    """(created_at, id) объекта модели или строки .values()"""
+    if isinstance(item, dict):
+        return item['created_at'], item['id']
+    return item.created_at, item.pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация DRF поверх keyset_page
+
+    GET /api/bookings/?cursor=...&page_size=50
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 1000
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            page, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return page
+
+    def _cursor_url(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._cursor_url(self.next_cursor),
+            'previous': self._cursor_url(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, см. API_JSON_BACKEND в settings.py
+    orjson = None
+
+
+def _is_utf8(encoding: str) -> bool:
+    return encoding.lower().replace('-', '').replace('_', '') == 'utf8'
+
+
+class ORJSONParser(BaseParser):
+    """
+    Замена rest_framework.parsers.JSONParser на orjson
+
+    orjson принимает только UTF-8, поэтому тело в другой кодировке
+    сначала перекодируется.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        data = stream.read()
+        if not _is_utf8(encoding):
+            data = data.decode(encoding).encode('utf-8')
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class NDJSONParser(BaseParser):
+    """
+    Разбирает поток NDJSON (один JSON-объект на строку) в список
+
+    Тело читается построчно, без загрузки всего запроса в одну строку.
+    Строки разбираются orjson, если он установлен.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        items = []
+        if stream is None:
+            return items
+
+        if orjson is not None and _is_utf8(encoding):
+            loads = orjson.loads
+        else:
+            def loads(line):
+                return json.loads(line.decode(encoding))
+
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error at line {line_number}: {exc}')
+        return items
@@ -0,0 +1,3 @@
+"""
+Инструменты для нагрузочного тестирования и бенчмарков
+"""
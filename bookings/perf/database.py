@@ -0,0 +1,42 @@
+"""
+Временная база данных для бенчмарков
+
+Бенчмарки не должны писать в рабочую БД, поэтому они создают тестовую
+базу так же, как это делает test runner Django.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def temporary_database(verbosity: int = 0):
+    settings_dict = connection.settings_dict
+    test_settings = settings_dict.setdefault('TEST', {})
+    original_test_name = test_settings.get('NAME')
+    temp_dir = None
+
+    if connection.vendor == 'sqlite':
+        # Файл в отдельном каталоге: БД в памяти с общим кэшем блокирует
+        # таблицы целиком при работе из нескольких потоков, а каталог
+        # удаляется вместе с -wal и -shm
+        temp_dir = tempfile.mkdtemp(prefix='booking-bench-')
+        test_settings['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        serialize=False,
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        test_settings['NAME'] = original_test_name
+        if temp_dir:
+            # В режиме WAL рядом с файлом остаются -wal и -shm соединений
+            # других потоков, поэтому удаляется весь каталог
+            shutil.rmtree(temp_dir, ignore_errors=True)
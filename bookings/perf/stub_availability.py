@@ -0,0 +1,130 @@
+"""
+Локальная заглушка сервиса доступности для бенчмарков
+
+Отвечает на POST /api/check-availability/ так же, как настоящий сервис,
+с настраиваемой задержкой и долей ошибок (HTTP 503). Считает количество
+принятых TCP-соединений и обработанных запросов.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Иначе на keep-alive соединениях ответы задерживаются алгоритмом Нейгла
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        with self.server.stats_lock:
+            self.server.requests += 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._send_json(503, {'detail': 'Service unavailable (stub)'})
+            return
+
+        self._send_json(200, {
+            'available': True,
+            'message': 'Аудитория свободна',
+            'conflicts': [],
+            'room_number': payload.get('room_number'),
+        })
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Бенчмарки открывают сотни соединений одновременно
+    request_queue_size = 1024
+
+
+class StubAvailabilityServer:
+    """
+    Заглушка, запускаемая в фоновом потоке
+
+    Пример:
+        with StubAvailabilityServer(latency=0.005) as stub:
+            settings.AVAILABILITY_SERVICE_URL = stub.url
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0):
+        self._server = _StubServer((host, port), _StubHandler)
+        self._server.latency = latency
+        self._server.error_rate = error_rate
+        self._server.stats_lock = threading.Lock()
+        self._server.connections = 0
+        self._server.requests = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/api'
+
+    @property
+    def latency(self) -> float:
+        return self._server.latency
+
+    @latency.setter
+    def latency(self, value: float):
+        self._server.latency = value
+
+    @property
+    def error_rate(self) -> float:
+        return self._server.error_rate
+
+    @error_rate.setter
+    def error_rate(self, value: float):
+        self._server.error_rate = value
+
+    @property
+    def connections(self) -> int:
+        return self._server.connections
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def reset_stats(self):
+        with self._server.stats_lock:
+            self._server.connections = 0
+            self._server.requests = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,167 @@
+"""
+Сценарии нагрузочного прогона API бронирований и отчёт по ним
+
+Каждый сценарий — функция (client, rng, state) -> response, выполняемая
+из нескольких потоков через django.test.Client. Отчёт — JSON с p50/p95/p99
+и пропускной способностью, который можно сравнить с отчётом прошлого прогона.
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import connections
+from django.test import Client
+
+from .timing import summarize
+
+# Метрики, по которым сравниваются прогоны; для throughput больше — лучше
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+class SuiteState:
+    """Общие для сценариев данные: параметры сида и id созданных бронирований"""
+
+    def __init__(self, rooms: int, users: int, days: int):
+        self.rooms = rooms
+        self.users = users
+        self.days = days
+        self.first_day = date.today() - timedelta(days=days // 2)
+        self._created: List[int] = []
+        self._lock = threading.Lock()
+
+    def remember(self, booking_id: int):
+        with self._lock:
+            self._created.append(booking_id)
+
+    def take(self) -> Optional[int]:
+        with self._lock:
+            return self._created.pop() if self._created else None
+
+    def random_email(self, rng: random.Random) -> str:
+        return f'user{rng.randrange(self.users)}@university.edu'
+
+    def random_room(self, rng: random.Random) -> str:
+        return str(100 + rng.randrange(self.rooms))
+
+    def random_date(self, rng: random.Random) -> date:
+        return self.first_day + timedelta(days=rng.randrange(self.days))
+
+
+def create_scenario(client: Client, rng: random.Random, state: SuiteState):
+    start_hour = rng.randint(8, 18)
+    response = client.post('/api/create-booking/', {
+        'user_email': state.random_email(rng),
+        'room_number': state.random_room(rng),
+        'booking_date': str(state.random_date(rng)),
+        'start_time': f'{start_hour:02d}:00',
+        'end_time': f'{start_hour + rng.randint(1, 3):02d}:00',
+        'booking_type': 'lesson',
+    }, content_type='application/json')
+    if response.status_code in (201, 202):
+        state.remember(response.json()['booking']['id'])
+    return response
+
+
+def list_scenario(client: Client, rng: random.Random, state: SuiteState):
+    return client.get('/api/bookings/', {'page_size': 50})
+
+
+def filter_scenario(client: Client, rng: random.Random, state: SuiteState):
+    return client.get('/api/bookings/', {'user_email': state.random_email(rng)})
+
+
+def stats_scenario(client: Client, rng: random.Random, state: SuiteState):
+    day = state.random_date(rng)
+    return client.get('/api/bookings/stats/', {
+        'room_number': state.random_room(rng),
+        'date_from': str(day),
+        'date_to': str(day + timedelta(days=30)),
+        'group_by': 'booking_type',
+    })
+
+
+def delete_scenario(client: Client, rng: random.Random, state: SuiteState):
+    booking_id = state.take()
+    if booking_id is None:
+        from ..models import Booking
+
+        booking_id = Booking.objects.order_by('-id').values_list('id', flat=True).first()
+    return client.delete(f'/api/bookings/{booking_id}/')
+
+
+SCENARIOS: Dict[str, Callable] = {
+    'create': create_scenario,
+    'list': list_scenario,
+    'filter': filter_scenario,
+    'stats': stats_scenario,
+    'delete': delete_scenario,
+}
+
+
+def run_scenario(scenario: Callable, state: SuiteState, requests: int, threads: int,
+                 seed: int = 42) -> Dict[str, Any]:
+    """
+    Выполняет requests вызовов сценария в threads потоках
+
+    Returns:
+        Сводка summarize() плюс errors (ответы 4xx/5xx) и throughput_rps
+    """
+    per_thread = [requests // threads + (1 if i < requests % threads else 0) for i in range(threads)]
+
+    def worker(number: int, count: int):
+        client = Client()
+        rng = random.Random(seed * 1000 + number)
+        samples, errors = [], 0
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = scenario(client, rng, state)
+                samples.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+        finally:
+            connections.close_all()
+        return samples, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads), per_thread))
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for thread_samples, _ in results for sample in thread_samples]
+    summary = summarize(samples)
+    summary['errors'] = sum(errors for _, errors in results)
+    summary['throughput_rps'] = len(samples) / elapsed if elapsed else 0.0
+    return summary
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as report_file:
+        return json.load(report_file)
+
+
+def save_report(report: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Строки сравнения двух отчётов: значение базового прогона, текущего и изменение в %"""
+    lines = []
+    for name, summary in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            lines.append(f'{name:<8} нет в базовом отчёте')
+            continue
+        parts = []
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), summary.get(metric)
+            if not old or new is None:
+                continue
+            parts.append(f'{metric}={old:.1f}→{new:.1f} ({(new - old) / old * 100:+.1f}%)')
+        lines.append(f'{name:<8} ' + ' '.join(parts))
+    return lines
@@ -0,0 +1,212 @@
+"""
+Повторяющиеся бронирования
+
+Серия разворачивается в список дат, после чего все вхождения проходят
+через BookingService.create_bookings_bulk: конфликты с существующими
+бронированиями ищутся по временному индексу (отсортированные массивы
+интервалов, один запрос к БД), вхождения сохраняются одним bulk_create.
+Изменение и отмена серии тоже выполняются пакетными UPDATE.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .availability_index import availability_index
+from .cache import bump_bookings_version
+from .models import AvailabilityCheckTask, Booking, BookingSeries
+from .occupancy import refresh_days
+from .services import get_booking_service, invalidate_availability_cache
+
+MAX_OCCURRENCES = 366
+
+# Изменение этих полей меняет расписание: будущие вхождения пересоздаются
+SCHEDULE_FIELDS = (
+    'room_number', 'start_time', 'end_time',
+    'frequency', 'interval', 'weekdays', 'start_date', 'until', 'count',
+)
+# Эти поля просто копируются в будущие вхождения
+DETAIL_FIELDS = ('user_email', 'booking_type', 'purpose')
+
+
+def expand_dates(start_date: date, frequency: str = 'weekly', interval: int = 1,
+                 weekdays: Optional[List[int]] = None, until: Optional[date] = None,
+                 count: Optional[int] = None) -> List[date]:
+    """
+    Даты вхождений серии
+
+    Args:
+        start_date: Первая возможная дата (DTSTART)
+        frequency: daily или weekly (FREQ)
+        interval: Шаг в днях или неделях (INTERVAL)
+        weekdays: Дни недели для weekly, 0 — понедельник (BYDAY);
+            по умолчанию день недели start_date
+        until: Последняя возможная дата включительно (UNTIL)
+        count: Количество вхождений (COUNT)
+
+    Raises:
+        ValueError: не задано ни until, ни count, или вхождений больше MAX_OCCURRENCES
+    """
+    if until is None and count is None:
+        raise ValueError('Нужно указать until или count')
+    if interval < 1:
+        raise ValueError('interval должен быть не меньше 1')
+
+    limit = min(count, MAX_OCCURRENCES + 1) if count else MAX_OCCURRENCES + 1
+    dates = []
+
+    if frequency == 'daily':
+        current = start_date
+        while len(dates) < limit and (until is None or current <= until):
+            dates.append(current)
+            current += timedelta(days=interval)
+    elif frequency == 'weekly':
+        days = sorted(set(weekdays or [start_date.weekday()]))
+        if any(day not in range(7) for day in days):
+            raise ValueError('Дни недели задаются числами от 0 (понедельник) до 6')
+        week_start = start_date - timedelta(days=start_date.weekday())
+        while len(dates) < limit:
+            for day in days:
+                current = week_start + timedelta(days=day)
+                if current < start_date:
+                    continue
+                if until is not None and current > until:
+                    return _checked(dates)
+                dates.append(current)
+                if len(dates) >= limit:
+                    break
+            week_start += timedelta(weeks=interval)
+    else:
+        raise ValueError(f'Неизвестная периодичность: {frequency}')
+
+    return _checked(dates)
+
+
+def _checked(dates: List[date]) -> List[date]:
+    if len(dates) > MAX_OCCURRENCES:
+        raise ValueError(f'Серия не может содержать больше {MAX_OCCURRENCES} вхождений')
+    return dates
+
+
+def series_dates(series: BookingSeries) -> List[date]:
+    return expand_dates(
+        series.start_date, series.frequency, series.interval,
+        series.weekdays, series.until, series.count,
+    )
+
+
+class BookingSeriesService:
+    """
+    Создание, изменение и отмена серий бронирований
+    """
+
+    def create_series(self, data: Dict[str, Any]) -> tuple:
+        """
+        Создаёт серию и её вхождения
+
+        Returns:
+            tuple: (series, [(booking_object, availability_result), ...])
+        """
+        series = BookingSeries(**data)
+        dates = series_dates(series)
+        series.save()
+
+        try:
+            created = self._create_occurrences(series, dates)
+        except Exception:
+            series.delete()
+            raise
+        return series, created
+
+    def update_series(self, series: BookingSeries, changes: Dict[str, Any],
+                      from_date: Optional[date] = None) -> tuple:
+        """
+        Изменяет серию начиная с from_date (по умолчанию — с сегодняшнего дня)
+
+        Изменение описания обновляет будущие вхождения одним UPDATE.
+        Изменение расписания отменяет будущие вхождения и создаёт новые
+        пакетно по новому правилу.
+
+        Returns:
+            tuple: (series, [(booking_object, availability_result), ...] для новых вхождений)
+        """
+        from_date = from_date or timezone.localdate()
+        changed = {field for field, value in changes.items() if getattr(series, field) != value}
+        for field in changed:
+            setattr(series, field, changes[field])
+
+        dates = series_dates(series) if changed & set(SCHEDULE_FIELDS) else None
+
+        # Одна транзакция: если создание новых вхождений упадёт, серия и её
+        # старые вхождения останутся как были. Отменённые вхождения не
+        # конфликтуют с новыми: пакетная проверка строит индекс по БД в этой
+        # же транзакции, а не по общему индексу процесса
+        with transaction.atomic():
+            series.save()
+            detail_changes = {field: changes[field] for field in changed if field in DETAIL_FIELDS}
+            if detail_changes and dates is None:
+                occurrences = self._future(series, from_date)
+                user_emails = set(occurrences.values_list('user_email', flat=True)) | {series.user_email}
+                if occurrences.update(**detail_changes, updated_at=timezone.now()):
+                    transaction.on_commit(lambda: bump_bookings_version(user_emails))
+
+            if dates is None:
+                return series, []
+
+            self.cancel_occurrences(series, from_date)
+            return series, self._create_occurrences(series, [day for day in dates if day >= from_date])
+
+    def cancel_series(self, series: BookingSeries, from_date: Optional[date] = None) -> int:
+        """Отменяет серию и её будущие вхождения, возвращает число отменённых"""
+        with transaction.atomic():
+            series.status = 'cancelled'
+            series.save(update_fields=['status', 'updated_at'])
+            return self.cancel_occurrences(series, from_date or timezone.localdate())
+
+    def cancel_occurrences(self, series: BookingSeries, from_date: date) -> int:
+        """Переводит вхождения серии начиная с from_date в статус cancelled одним UPDATE"""
+        with transaction.atomic():
+            occurrences = self._future(series, from_date)
+            rows = list(occurrences.values_list('id', 'room_number', 'booking_date', 'status', 'user_email'))
+            if not rows:
+                return 0
+
+            ids = [row[0] for row in rows]
+            Booking.objects.filter(id__in=ids).update(status='cancelled', updated_at=timezone.now())
+            AvailabilityCheckTask.objects.filter(booking_id__in=ids).delete()
+
+            # UPDATE не отправляет сигналы, поэтому производные данные
+            # обновляются вручную
+            slots = {(room_number, booking_date) for _, room_number, booking_date, status, _ in rows
+                     if status == 'confirmed'}
+            user_emails = {row[4] for row in rows}
+            refresh_days(slots)
+            transaction.on_commit(lambda: [availability_index.remove(booking_id) for booking_id in ids])
+            transaction.on_commit(lambda: invalidate_availability_cache(slots))
+            transaction.on_commit(lambda: bump_bookings_version(user_emails))
+
+        return len(rows)
+
+    @staticmethod
+    def _future(series: BookingSeries, from_date: date):
+        return series.occurrences.filter(booking_date__gte=from_date).exclude(status='cancelled')
+
+    @staticmethod
+    def _create_occurrences(series: BookingSeries, dates: List[date]) -> List[tuple]:
+        items = [
+            {
+                'user_email': series.user_email,
+                'room_number': series.room_number,
+                'booking_date': day,
+                'start_time': series.start_time,
+                'end_time': series.end_time,
+                'booking_type': series.booking_type,
+                'purpose': series.purpose,
+            }
+            for day in dates
+        ]
+        return get_booking_service().create_bookings_bulk(items, series=series)
+
+
+booking_series_service = BookingSeriesService()
@@ -0,0 +1,67 @@
+from rest_framework import renderers
+from rest_framework.compat import parse_header_parameters
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, см. API_JSON_BACKEND в settings.py
+    orjson = None
+
+
+def _orjson_default(obj):
+    """Типы, которых нет в orjson (Decimal, timedelta, ленивые строки...), — как в DRF"""
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(renderers.BaseRenderer):
+    """
+    Замена rest_framework.renderers.JSONRenderer на orjson
+
+    datetime/date/time кодируются в тот же ISO 8601, что и в DRF (UTC с
+    суффиксом Z), остальные типы — через JSONEncoder DRF. Ответ всегда
+    компактный, кроме запросов с Accept: application/json; indent=...
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if accepted_media_type:
+            _, params = parse_header_parameters(accepted_media_type)
+            if params.get('indent'):
+                option |= orjson.OPT_INDENT_2
+
+        with timed('serialize'):
+            return orjson.dumps(data, default=_orjson_default, option=option)
+
+
+class NDJSONPassthroughRenderer(renderers.BaseRenderer):
+    """
+    Для представлений, которые сами формируют поток NDJSON
+
+    Нужен только для согласования формата (?format=ndjson / Accept).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class CSVPassthroughRenderer(renderers.BaseRenderer):
+    """
+    Для представлений, которые сами формируют поток CSV
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
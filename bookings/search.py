@@ -0,0 +1,276 @@
+"""
+Полнотекстовый и префиксный поиск бронирований
+
+Ищется по аудитории, email и цели бронирования. Запрос разбивается на
+слова, каждое ищется как префикс слова в индексе, найтись должны все
+слова: «ivanov@uni» находит ivanov@university.edu, «лекц 101» — лекции
+в аудиториях 101*. В SQLite символы @ . - _ внутри слова — его часть,
+поэтому email и номер вроде «А-101» индексируются одним словом: общий
+домен почты не совпадает со всеми строками таблицы (зато «101» не
+находит «А-101»).
+
+Ранжируются только BOOKING_SEARCH_RANK_CANDIDATES самых новых совпадений: у запросов
+вроде «лекц» совпадений сотни тысяч, и полная сортировка по
+релевантности заняла бы секунды.
+
+Индекс зависит от СУБД (миграция 0011_booking_search):
+- SQLite — FTS5-таблица bookings_booking_fts с внешним содержимым
+  (content=bookings_booking), которую синхронизируют триггеры, в том
+  числе при bulk_create и удалении в обход сигналов; ранжирование bm25.
+  Фильтр по подстроке email (contains) — обычный icontains: индекс
+  находит только префиксы слов, а email индексируется одним словом.
+- PostgreSQL — GIN-индекс по взвешенному tsvector (аудитория A, email B,
+  цель C); ранжирование ts_rank. Фильтр по подстроке email (contains)
+  обслуживает триграммный индекс booking_email_trgm_idx из миграции 0002
+  (pg_trgm, UPPER(user_email)), по которому icontains находит и
+  подстроки из середины слова.
+Для остальных СУБД и SQLite без FTS5 используется icontains по полям —
+последовательный просмотр без ранжирования.
+
+Django пересоздаёт таблицу SQLite при некоторых изменениях схемы, и
+триггеры удаляются вместе со старой таблицей. Поэтому после migrate
+индекс проверяется (ensure_search_index) и при потере триггеров
+перестраивается; вручную — manage.py rebuild_search_index.
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Booking
+
+logger = logging.getLogger(__name__)
+
+# Слово — буквы, цифры и символы tokenchars FTS5-таблицы (@ . - _)
+TERM_RE = re.compile(r'[\w@.-]+')
+TERM_PUNCTUATION = '@.-_'
+# Части слова для PostgreSQL: его парсер разбивает email на части (см. PG_SEARCH_VECTOR)
+SUBTERM_RE = re.compile(r'[^\W_]+')
+MAX_TERMS = 8
+
+# GET /api/bookings/search/: размер страницы по умолчанию и максимальный
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+SEARCH_COLUMNS = ('room_number', 'user_email', 'purpose')
+
+FTS_TABLE = 'bookings_booking_fts'
+# Вес столбцов в bm25, порядок как в SEARCH_COLUMNS
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON bookings_booking BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, room_number, user_email, purpose)
+            VALUES (new.id, new.room_number, new.user_email, new.purpose);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON bookings_booking BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, room_number, user_email, purpose)
+            VALUES ('delete', old.id, old.room_number, old.user_email, old.purpose);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF room_number, user_email, purpose ON bookings_booking BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, room_number, user_email, purpose)
+            VALUES ('delete', old.id, old.room_number, old.user_email, old.purpose);
+            INSERT INTO {FTS_TABLE}(rowid, room_number, user_email, purpose)
+            VALUES (new.id, new.room_number, new.user_email, new.purpose);
+        END
+    """,
+}
+
+# Выражение должно совпадать с индексом booking_search_idx из миграции 0011,
+# иначе PostgreSQL его не использует
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(room_number, '')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(user_email, ''), '@._-', '    ')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(purpose, '')), 'C')"
+)
+PG_COLUMN_WEIGHTS = {'room_number': 'A', 'user_email': 'B', 'purpose': 'C'}
+
+
+def parse_terms(text: Optional[str]) -> List[str]:
+    """Слова запроса в нижнем регистре без знаков по краям, не больше MAX_TERMS"""
+    terms = (term.strip(TERM_PUNCTUATION).lower() for term in TERM_RE.findall(text or ''))
+    return [term for term in terms if term][:MAX_TERMS]
+
+
+def get_rank_candidates() -> int:
+    return getattr(settings, 'BOOKING_SEARCH_RANK_CANDIDATES', 1000)
+
+
+class FallbackSearchBackend:
+    """icontains по полям: для СУБД без полнотекстового индекса"""
+
+    def filter(self, queryset, text: str, column: Optional[str] = None):
+        columns = (column,) if column else SEARCH_COLUMNS
+        for term in parse_terms(text):
+            condition = Q()
+            for name in columns:
+                condition |= Q(**{f'{name}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def contains(self, queryset, column: str, value: str):
+        """Строки, в которых column содержит подстроку value без учёта регистра"""
+        return queryset.filter(**{f'{column}__icontains': value})
+
+    def ranked_ids(self, text: str, filters: Dict[str, str], limit: int, offset: int) -> List[int]:
+        queryset = self.filter(Booking.objects.filter(**filters), text)
+        return list(queryset.values_list('id', flat=True)[offset:offset + limit])
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5-таблица bookings_booking_fts
+
+    Для префиксов длиной 2, 3, 4 и 6 символов в таблице есть готовые
+    индексы (prefix='2 3 4 6'), более длинные читаются из основного.
+    """
+
+    def match_expression(self, terms: List[str], column: Optional[str] = None) -> str:
+        # В словах только буквы, цифры и @ . - _, кавычки внутри невозможны
+        prefix = f'{column} : ' if column else ''
+        return ' AND '.join(f'{prefix}"{term}"*' for term in terms)
+
+    def filter(self, queryset, text: str, column: Optional[str] = None):
+        terms = parse_terms(text)
+        if not terms:
+            return queryset
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self.match_expression(terms, column)],
+        ))
+
+    def contains(self, queryset, column: str, value: str):
+        # Индекс ищет только префиксы слов, а email — одно слово: «university»
+        # не нашёл бы ivanov@university.edu. Подстроку проверяет icontains
+        return queryset.filter(**{f'{column}__icontains': value})
+
+    def ranked_ids(self, text: str, filters: Dict[str, str], limit: int, offset: int) -> List[int]:
+        match = self.match_expression(parse_terms(text))
+        if filters.get('user_email'):
+            # Бронирования пользователя отбирает индекс, а не проверка каждого совпадения;
+            # точное сравнение ниже сохраняется (индекс не различает регистр)
+            email = filters['user_email'].replace('"', '""')
+            match = f'{match} AND user_email : "{email}"'
+        conditions, params = [f'{FTS_TABLE} MATCH %s'], [match]
+        for name, value in filters.items():
+            conditions.append(f'bookings_booking.{name} = %s')
+            params.append(value)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # Таблица бронирований нужна только для фильтров
+        join = f'JOIN bookings_booking ON bookings_booking.id = {FTS_TABLE}.rowid ' if filters else ''
+        # FTS5 отдаёт совпадения по убыванию rowid без сортировки,
+        # bm25 считается только для отобранных кандидатов
+        sql = (
+            f'SELECT id FROM ('
+            f'SELECT {FTS_TABLE}.rowid AS id, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} {join}'
+            f'WHERE {" AND ".join(conditions)} ORDER BY {FTS_TABLE}.rowid DESC LIMIT %s'
+            f') ORDER BY score, id DESC LIMIT %s OFFSET %s'
+        )
+        return _fetch_ids(sql, [*params, get_rank_candidates(), limit, offset])
+
+
+class PostgresSearchBackend:
+    """GIN-индекс booking_search_idx по PG_SEARCH_VECTOR"""
+
+    def tsquery(self, terms: List[str], column: Optional[str] = None) -> str:
+        weight = PG_COLUMN_WEIGHTS[column] if column else ''
+        return ' & '.join(
+            f'{subterm}:*{weight}' for term in terms for subterm in SUBTERM_RE.findall(term)
+        )
+
+    def filter(self, queryset, text: str, column: Optional[str] = None):
+        terms = parse_terms(text)
+        if not terms:
+            return queryset
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM bookings_booking WHERE ({PG_SEARCH_VECTOR}) @@ to_tsquery('simple', %s)",
+            [self.tsquery(terms, column)],
+        ))
+
+    def contains(self, queryset, column: str, value: str):
+        # UPPER(user_email) LIKE UPPER('%...%') читает триграммный индекс
+        # booking_email_trgm_idx; tsvector здесь не нужен и терял бы
+        # подстроки из середины слова
+        return queryset.filter(**{f'{column}__icontains': value})
+
+    def ranked_ids(self, text: str, filters: Dict[str, str], limit: int, offset: int) -> List[int]:
+        query = self.tsquery(parse_terms(text))
+        conditions, params = [f"({PG_SEARCH_VECTOR}) @@ to_tsquery('simple', %s)"], [query]
+        for name, value in filters.items():
+            conditions.append(f'{name} = %s')
+            params.append(value)
+        sql = (
+            f'SELECT id FROM ('
+            f'SELECT id, {PG_SEARCH_VECTOR} AS vector FROM bookings_booking '
+            f'WHERE {" AND ".join(conditions)} ORDER BY id DESC LIMIT %s'
+            f") AS candidates ORDER BY ts_rank(vector, to_tsquery('simple', %s)) DESC, id DESC "
+            f'LIMIT %s OFFSET %s'
+        )
+        return _fetch_ids(sql, [*params, get_rank_candidates(), query, limit, offset])
+
+
+def _fetch_ids(sql: str, params: list) -> List[int]:
+    # Чтение идёт туда же, куда и запросы ORM (реплика текущего запроса, см. db_router.py)
+    with connections[router.db_for_read(Booking)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+_fts_tables: Dict[tuple, bool] = {}
+
+
+def has_fts_table(connection) -> bool:
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def get_search_backend(using: Optional[str] = None):
+    connection = connections[using or router.db_for_read(Booking)]
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite' and has_fts_table(connection):
+        return SQLiteSearchBackend()
+    return FallbackSearchBackend()
+
+
+def rebuild_search_index(using: str) -> None:
+    """Создаёт недостающие триггеры SQLite и заново заполняет FTS-таблицу"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not has_fts_table(connection):
+        return
+    with connection.cursor() as cursor:
+        for sql in FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_search_index(sender=None, using: str = 'default', **kwargs) -> None:
+    """Обработчик post_migrate: перестраивает FTS-индекс, если миграция удалила триггеры"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    _fts_tables.pop((connection.alias, connection.settings_dict['NAME']), None)
+    if not has_fts_table(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'bookings_booking'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if existing.issuperset(FTS_TRIGGERS):
+        return
+    logger.warning('Триггеры поискового индекса бронирований отсутствуют, индекс перестраивается')
+    rebuild_search_index(using)
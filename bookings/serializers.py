@@ -1,11 +1,16 @@
 from rest_framework import serializers
-from .models import Booking
+from .models import Booking, BookingSeries
+from .recurrence import MAX_OCCURRENCES, expand_dates
 
 
 class BookingSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Booking
+
+    availability_check_response — свойство модели: ответ загружается из
+    AvailabilityResponse только при сериализации этого поля.
     """
+    availability_check_response = serializers.JSONField(read_only=True)
 
     class Meta:
         model = Booking
@@ -19,11 +24,18 @@ class BookingSerializer(serializers.ModelSerializer):
             'booking_type',
             'purpose',
             'status',
+            'series',
+            'check_success',
+            'check_available',
+            'check_error',
             'availability_check_response',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['id', 'status', 'availability_check_response', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'status', 'series', 'check_success', 'check_available', 'check_error',
+            'availability_check_response', 'created_at', 'updated_at',
+        ]
 
 
 class BookingCreateSerializer(serializers.Serializer):
@@ -47,4 +59,81 @@ class BookingCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "Время начала должно быть раньше времени окончания"
             )
-        return data
\ No newline at end of file
+        return data
+
+class BookingSeriesSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для модели BookingSeries
+    """
+
+    class Meta:
+        model = BookingSeries
+        fields = [
+            'id',
+            'user_email',
+            'room_number',
+            'start_time',
+            'end_time',
+            'booking_type',
+            'purpose',
+            'frequency',
+            'interval',
+            'weekdays',
+            'start_date',
+            'until',
+            'count',
+            'status',
+            'created_at',
+            'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class BookingSeriesCreateSerializer(serializers.Serializer):
+    """
+    Сериализатор для создания и изменения серии бронирований
+    """
+    user_email = serializers.EmailField()
+    room_number = serializers.CharField(max_length=50)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    booking_type = serializers.ChoiceField(
+        choices=['lesson', 'exam', 'meeting'],
+        default='lesson'
+    )
+    purpose = serializers.CharField(required=False, allow_blank=True, default='')
+    frequency = serializers.ChoiceField(choices=['daily', 'weekly'], default='weekly')
+    interval = serializers.IntegerField(min_value=1, max_value=52, default=1)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        required=False,
+        default=list
+    )
+    start_date = serializers.DateField()
+    until = serializers.DateField(required=False, allow_null=True, default=None)
+    count = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_OCCURRENCES,
+        required=False,
+        allow_null=True,
+        default=None
+    )
+
+    def validate(self, data):
+        """Проверка времени и правила повторения"""
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError(
+                "Время начала должно быть раньше времени окончания"
+            )
+        if data['until'] is not None and data['until'] < data['start_date']:
+            raise serializers.ValidationError(
+                "Дата окончания серии должна быть не раньше даты начала"
+            )
+        try:
+            expand_dates(
+                data['start_date'], data['frequency'], data['interval'],
+                data['weekdays'], data['until'], data['count'],
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return data
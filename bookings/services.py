@@ -1,7 +1,22 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from typing import Dict, Any
+from django.db import transaction
+from django.utils import timezone
+from typing import Dict, Any, List
 import logging
+import threading
+
+from .availability_cache import get_availability_cache
+from .availability_responses import assign_responses
+from .circuit_breaker import CircuitOpenError, get_availability_breaker, get_breaker_settings
+from .availability_index import AvailabilityIndex, LocalAvailabilityService, availability_index
+from . import http_client
+from .cache import bump_bookings_version
+from .instrumentation import timed
+from .structured_logging import get_request_id, payload_sampled, request_id_headers
+from .occupancy import refresh_days
+from .slot_locks import find_confirmed_conflicts, lock_slots
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +28,29 @@ class AvailabilityService:
 
     def __init__(self):
         self.base_url = settings.AVAILABILITY_SERVICE_URL
-        self.timeout = 10  # секунды
+        self.timeout = http_client.get_timeout()  # (connect, read), секунды
+
+    @staticmethod
+    def build_payload(booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Формирует тело запроса к сервису доступности"""
+        return {
+            'room_number': booking_data.get('room_number'),
+            'booking_date': str(booking_data.get('booking_date')),
+            'start_time': str(booking_data.get('start_time')),
+            'end_time': str(booking_data.get('end_time')),
+            'booking_type': booking_data.get('booking_type'),
+        }
+
+    @staticmethod
+    def parse_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Приводит успешный ответ сервиса доступности к внутреннему формату"""
+        return {
+            'success': True,
+            'available': result.get('available', False),
+            'message': result.get('message', ''),
+            'conflicts': result.get('conflicts', []),
+            'response_data': result
+        }
 
     def check_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -30,39 +67,31 @@ class AvailabilityService:
             url = f"{self.base_url}/check-availability/"
 
             # Формируем данные для отправки
-            payload = {
-                'room_number': booking_data.get('room_number'),
-                'booking_date': str(booking_data.get('booking_date')),
-                'start_time': str(booking_data.get('start_time')),
-                'end_time': str(booking_data.get('end_time')),
-                'booking_type': booking_data.get('booking_type'),
-            }
-
-            logger.info(f"Отправка запроса на проверку доступности: {url}")
-            logger.info(f"Данные: {payload}")
+            payload = self.build_payload(booking_data)
 
-            response = requests.post(
-                url,
-                json=payload,
-                timeout=self.timeout,
-                headers={'Content-Type': 'application/json'}
-            )
+            with timed('upstream'):
+                response = http_client.get_session().post(
+                    url,
+                    json=payload,
+                    timeout=self.timeout,
+                    headers=request_id_headers()
+                )
 
             response.raise_for_status()
             result = response.json()
 
-            logger.info(f"Получен ответ от сервиса доступности: {result}")
+            if payload_sampled():
+                logger.info(
+                    "Проверка доступности аудитории %s: %s", payload['room_number'],
+                    'свободна' if result.get('available') else 'занята',
+                    extra={'payload': payload, 'response': result},
+                )
 
-            return {
-                'success': True,
-                'available': result.get('available', False),
-                'message': result.get('message', ''),
-                'conflicts': result.get('conflicts', []),
-                'response_data': result
-            }
+            return self.parse_result(result)
 
         except requests.exceptions.Timeout:
-            logger.error("Превышено время ожидания ответа от сервиса доступности")
+            logger.error("Превышено время ожидания ответа от сервиса доступности",
+                         extra={'payload': payload})
             return {
                 'success': False,
                 'available': False,
@@ -71,7 +100,7 @@ class AvailabilityService:
             }
 
         except requests.exceptions.ConnectionError:
-            logger.error("Ошибка подключения к сервису доступности")
+            logger.error("Ошибка подключения к сервису доступности", extra={'payload': payload})
             return {
                 'success': False,
                 'available': False,
@@ -80,7 +109,7 @@ class AvailabilityService:
             }
 
         except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP ошибка от сервиса доступности: {e}")
+            logger.error("HTTP ошибка от сервиса доступности: %s", e, extra={'payload': payload})
             try:
                 error_data = e.response.json()
             except:
@@ -91,11 +120,12 @@ class AvailabilityService:
                 'available': False,
                 'message': f'Ошибка сервиса доступности: {error_data.get("detail", str(e))}',
                 'error': 'http_error',
+                'status_code': e.response.status_code,
                 'response_data': error_data
             }
 
         except Exception as e:
-            logger.error(f"Неожиданная ошибка при проверке доступности: {e}")
+            logger.exception("Неожиданная ошибка при проверке доступности: %s", e)
             return {
                 'success': False,
                 'available': False,
@@ -111,6 +141,73 @@ class BookingService:
 
     def __init__(self):
         self.availability_service = AvailabilityService()
+        self.local_availability_service = LocalAvailabilityService()
+
+    @property
+    def mode(self) -> str:
+        return getattr(settings, 'AVAILABILITY_MODE', 'local')
+
+    def check_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Проверяет доступность аудитории
+
+        Сначала выполняется проверка по локальному индексу. Внешний сервис
+        вызывается только в режиме authoritative и только если локальная
+        проверка не нашла конфликтов.
+        """
+        local_result = self.local_availability_service.check_availability(booking_data)
+
+        if self.mode != 'authoritative' or not local_result['available']:
+            return local_result
+
+        return self.check_remote_availability(booking_data)
+
+    def check_remote_availability(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Проверка во внешнем сервисе через кэш результатов (если он включён)"""
+        cache = get_availability_cache()
+        if cache is None:
+            return self._call_availability_service(booking_data)
+        return cache.get_or_check(booking_data, self._call_availability_service)
+
+    def _call_availability_service(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Запрос к внешнему сервису через circuit breaker (если он включён)"""
+        config = get_breaker_settings()
+        if not config['ENABLED']:
+            return self.availability_service.check_availability(booking_data)
+
+        try:
+            return get_availability_breaker().call(
+                self.availability_service.check_availability, booking_data
+            )
+        except CircuitOpenError:
+            logger.warning("Circuit breaker открыт, применяется политика %s", config['FALLBACK'])
+            return self._circuit_open_fallback(booking_data, config['FALLBACK'])
+
+    def _circuit_open_fallback(self, booking_data: Dict[str, Any], policy: str) -> Dict[str, Any]:
+        """Результат проверки, пока сервис доступности считается недоступным"""
+        if policy == 'local':
+            return {
+                **self.local_availability_service.check_availability(booking_data),
+                'fallback': 'local'
+            }
+
+        if policy == 'pending':
+            return {
+                'success': False,
+                'available': False,
+                'deferred': True,
+                'message': 'Сервис проверки доступности временно недоступен, бронирование ожидает проверки',
+                'error': 'circuit_open',
+                'fallback': 'pending'
+            }
+
+        return {
+            'success': False,
+            'available': False,
+            'message': 'Сервис проверки доступности временно недоступен',
+            'error': 'circuit_open',
+            'fallback': 'reject'
+        }
 
     def create_booking(self, booking_data: Dict[str, Any]) -> tuple:
         """
@@ -119,31 +216,280 @@ class BookingService:
         Args:
             booking_data: Данные о бронировании
 
+        Returns:
+            tuple: (booking_object, availability_result)
+        """
+        if self.check_mode == 'deferred':
+            # Проверку выполнит воркер очереди, запрос не ждёт внешний сервис
+            availability_result = self.deferred_result()
+        else:
+            # Проверяем доступность (локальный индекс и, при необходимости, внешний сервис)
+            availability_result = self.check_availability(booking_data)
+
+        return self.save_booking(booking_data, availability_result)
+
+    def save_booking(self, booking_data: Dict[str, Any],
+                     availability_result: Dict[str, Any]) -> tuple:
+        """
+        Сохраняет бронирование по результату проверки
+
+        Подтверждение выполняется под блокировкой пары (аудитория, дата) с
+        повторной проверкой пересечений в БД, поэтому параллельные запросы
+        на один слот не могут оба получить статус confirmed.
+
         Returns:
             tuple: (booking_object, availability_result)
         """
         from .models import Booking
+        from . import task_queue
+
+        with transaction.atomic():
+            if availability_result['success'] and availability_result['available']:
+                availability_result = self.recheck_under_lock(booking_data, availability_result)
+
+            # Создаём запись о бронировании
+            booking = Booking.objects.create(**self.build_booking_fields(booking_data, availability_result))
+            if booking.status == 'pending':
+                task_queue.enqueue(booking)
+
+        return booking, availability_result
+
+    @staticmethod
+    def recheck_under_lock(booking_data: Dict[str, Any],
+                           availability_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Блокирует (аудитория, дата) и ищет пересечения среди закоммиченных бронирований
+
+        Вызывается внутри transaction.atomic() непосредственно перед записью
+        подтверждённого бронирования.
+        """
+        lock_slots([(booking_data['room_number'], booking_data['booking_date'])])
+        conflicts = find_confirmed_conflicts(
+            booking_data['room_number'],
+            booking_data['booking_date'],
+            booking_data['start_time'],
+            booking_data['end_time'],
+        )
+        if conflicts:
+            return LocalAvailabilityService.build_result(conflicts)
+        return availability_result
+
+    @property
+    def check_mode(self) -> str:
+        return getattr(settings, 'BOOKING_CHECK_MODE', 'inline')
 
-        # Проверяем доступность через внешний сервис
-        availability_result = self.availability_service.check_availability(booking_data)
+    @staticmethod
+    def deferred_result() -> Dict[str, Any]:
+        """Результат для бронирования, поставленного в очередь на проверку"""
+        return {
+            'success': False,
+            'available': False,
+            'deferred': True,
+            'message': 'Бронирование поставлено в очередь на проверку доступности',
+        }
 
+    @staticmethod
+    def build_booking_fields(booking_data: Dict[str, Any],
+                             availability_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Поля модели Booking по входным данным и результату проверки"""
         # Определяем статус на основе результата проверки
         if availability_result['success'] and availability_result['available']:
             status = 'confirmed'
+        elif availability_result.get('deferred'):
+            status = 'pending'
         else:
             status = 'rejected'
 
-        # Создаём запись о бронировании
-        booking = Booking.objects.create(
-            user_email=booking_data['user_email'],
-            room_number=booking_data['room_number'],
-            booking_date=booking_data['booking_date'],
-            start_time=booking_data['start_time'],
-            end_time=booking_data['end_time'],
-            booking_type=booking_data.get('booking_type', 'lesson'),
-            purpose=booking_data.get('purpose', ''),
-            status=status,
-            availability_check_response=availability_result
-        )
+        return {
+            'user_email': booking_data['user_email'],
+            'room_number': booking_data['room_number'],
+            'booking_date': booking_data['booking_date'],
+            'start_time': booking_data['start_time'],
+            'end_time': booking_data['end_time'],
+            'booking_type': booking_data.get('booking_type', 'lesson'),
+            'purpose': booking_data.get('purpose', ''),
+            'status': status,
+            'availability_check_response': availability_result,
+        }
+
+    def create_bookings_bulk(self, items: List[Dict[str, Any]], series=None) -> List[tuple]:
+        """
+        Создаёт пачку бронирований одной транзакцией
+
+        Конфликты с существующими бронированиями ищутся по временному индексу,
+        построенному одним запросом. В режиме authoritative внешний сервис
+        опрашивается параллельно через общий пул соединений. Пересечения внутри
+        пачки разрешаются в порядке следования: подтверждается первое.
+        Окончательная проверка и запись выполняются под блокировкой всех
+        затронутых пар (аудитория, дата). При BOOKING_CHECK_MODE='deferred',
+        как и в create_booking, бронирования сохраняются в статусе pending
+        и проверяются воркером очереди.
+
+        Args:
+            items: Провалидированные данные бронирований
+            series: Серия BookingSeries, к которой относятся бронирования
+
+        Returns:
+            list: [(booking_object, availability_result), ...] в порядке items
+        """
+        from .models import AvailabilityCheckTask, Booking
+
+        if not items:
+            return []
+
+        if self.check_mode == 'deferred':
+            # Проверку и пересечения внутри пачки разберёт воркер очереди
+            results = [self.deferred_result() for _ in items]
+        else:
+            results = self._check_bulk(items)
+
+        with transaction.atomic():
+            self._recheck_bulk_under_lock(items, results)
+
+            bookings = [
+                Booking(**self.build_booking_fields(item, result), series=series)
+                for item, result in zip(items, results)
+            ]
+            assign_responses(bookings)
+            Booking.objects.bulk_create(bookings, batch_size=1000)
+            AvailabilityCheckTask.objects.bulk_create([
+                AvailabilityCheckTask(booking=booking, available_at=timezone.now(),
+                                      request_id=get_request_id())
+                for booking in bookings
+                if booking.status == 'pending' and booking.pk is not None
+            ], batch_size=1000)
+            # bulk_create не отправляет сигналы, поэтому индекс и карты занятости
+            # обновляются вручную
+            confirmed = [
+                (booking.pk, booking.room_number, booking.booking_date,
+                 booking.start_time, booking.end_time)
+                for booking in bookings
+                if booking.status == 'confirmed' and booking.pk is not None
+            ]
+            refresh_days({(room_number, booking_date) for _, room_number, booking_date, _, _ in confirmed})
+            transaction.on_commit(lambda: availability_index.add_many(confirmed))
+            transaction.on_commit(lambda: invalidate_availability_cache(
+                {(room_number, booking_date) for _, room_number, booking_date, _, _ in confirmed}
+            ))
+            user_emails = {booking.user_email for booking in bookings}
+            transaction.on_commit(lambda: bump_bookings_version(user_emails))
+
+        return list(zip(bookings, results))
+
+    def _check_bulk(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Проверки пачки до блокировки: временный индекс и, в режиме authoritative, внешний сервис"""
+        from .models import Booking
+
+        batch_index = AvailabilityIndex()
+        batch_index.build(Booking.objects.filter(
+            status='confirmed',
+            room_number__in={item['room_number'] for item in items},
+            booking_date__range=(
+                min(item['booking_date'] for item in items),
+                max(item['booking_date'] for item in items),
+            ),
+        ))
+        local_service = LocalAvailabilityService(batch_index)
+
+        # 1. Конфликты с уже существующими бронированиями
+        results = [local_service.check_availability(item) for item in items]
+
+        # 2. Внешний сервис — только для тех, кто прошёл локальную проверку
+        if self.mode == 'authoritative':
+            candidates = [i for i, result in enumerate(results) if result['available']]
+            workers = min(len(candidates), http_client.get_http_settings()['POOL_SIZE']) or 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                remote_results = executor.map(
+                    self.check_remote_availability,
+                    [items[i] for i in candidates],
+                )
+                for i, result in zip(candidates, remote_results):
+                    results[i] = result
+        return results
+
+    def _recheck_bulk_under_lock(self, items: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> None:
+        """
+        Окончательная проверка пачки внутри transaction.atomic(), обновляет results
+
+        Под блокировкой затронутых (аудитория, дата) индекс строится заново:
+        за время внешних проверок могли появиться новые подтверждённые
+        бронирования. Пересечения внутри пачки разрешаются в порядке следования.
+        """
+        from .models import Booking
+
+        candidates = [i for i, result in enumerate(results) if result['success'] and result['available']]
+        if not candidates:
+            return
+        slots = {(items[i]['room_number'], items[i]['booking_date']) for i in candidates}
+        lock_slots(slots)
+        batch_index = AvailabilityIndex()
+        batch_index.build(Booking.objects.filter(
+            status='confirmed',
+            room_number__in={room_number for room_number, _ in slots},
+            booking_date__range=(
+                min(booking_date for _, booking_date in slots),
+                max(booking_date for _, booking_date in slots),
+            ),
+        ))
+
+        for i in candidates:
+            item = items[i]
+            conflicts = batch_index.find_conflicts(
+                item['room_number'], item['booking_date'], item['start_time'], item['end_time']
+            )
+            if conflicts:
+                results[i] = self._batch_conflict_result(conflicts)
+            else:
+                batch_index.add(item['room_number'], item['booking_date'],
+                                item['start_time'], item['end_time'], ('batch', i), load=False)
+
+    @staticmethod
+    def _batch_conflict_result(conflicts) -> Dict[str, Any]:
+        """
+        Результат проверки под блокировкой для бронирования из пачки
+
+        Пересечения с бронированиями в БД (подтверждёнными, пока шли внешние
+        проверки) и с более ранними бронированиями той же пачки различаются
+        сообщением и полем конфликта: booking_id или batch_index.
+        """
+        if any(not isinstance(booking_id, tuple) for booking_id, _, _ in conflicts):
+            message = 'Аудитория уже забронирована на это время'
+        else:
+            message = 'Аудитория уже забронирована на это время другим бронированием из пакета'
+        result = LocalAvailabilityService.build_result(conflicts, message=message)
+        for conflict in result['conflicts']:
+            booking_id = conflict.pop('booking_id')
+            if isinstance(booking_id, tuple):
+                conflict['batch_index'] = booking_id[1]
+            else:
+                conflict['booking_id'] = booking_id
+        return result
+
+
+def invalidate_availability_cache(slots):
+    """Сбрасывает кэш проверок доступности для пар (аудитория, дата)"""
+    cache = get_availability_cache()
+    if cache is None:
+        return
+    for room_number, booking_date in slots:
+        cache.invalidate(room_number, booking_date)
+
+
+_booking_service = None
+_booking_service_lock = threading.Lock()
+
+
+def get_booking_service() -> BookingService:
+    """
+    Возвращает общий для процесса экземпляр BookingService
+
+    Сервис не хранит состояния запроса, поэтому один экземпляр
+    безопасно использовать из всех потоков.
+    """
+    global _booking_service
 
-        return booking, availability_result
\ No newline at end of file
+    if _booking_service is None:
+        with _booking_service_lock:
+            if _booking_service is None:
+                _booking_service = BookingService()
+    return _booking_service
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .availability_index import availability_index
+from .cache import bump_bookings_version
+from .models import Booking
+from .occupancy import refresh_days
+from .services import invalidate_availability_cache
+
+
+@receiver(post_save, sender=Booking)
+def update_availability_index_on_save(sender, instance, **kwargs):
+    """Обновляет локальный индекс занятости после сохранения бронирования"""
+    availability_index.on_booking_saved(instance)
+
+
+@receiver(post_delete, sender=Booking)
+def update_availability_index_on_delete(sender, instance, **kwargs):
+    """Удаляет бронирование из локального индекса занятости"""
+    availability_index.on_booking_deleted(instance)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_bookings_cache(sender, instance, **kwargs):
+    """Сбрасывает кэши, зависящие от данных бронирований (статистика, ответы API и т.п.)"""
+    user_emails = {instance.user_email}
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        user_emails.add(previous['user_email'])
+    transaction.on_commit(lambda: bump_bookings_version(user_emails))
+
+
+@receiver(post_save, sender=Booking)
+def invalidate_availability_cache_on_save(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированные проверки доступности аудитории на эту дату
+
+    Только если бронирование подтверждено или сменило статус: отклонённое
+    или ожидающее проверки бронирование слот не занимает, и повтор запроса
+    после отказа должен попадать в кэш. При переносе сбрасывается и прежний день.
+    """
+    previous = getattr(instance, '_previous_state', None)
+    if instance.status != 'confirmed' and (previous is None or previous['status'] == instance.status):
+        return
+    slots = {(instance.room_number, instance.booking_date)}
+    if previous:
+        slots.add((previous['room_number'], previous['booking_date']))
+    transaction.on_commit(lambda: invalidate_availability_cache(slots))
+
+
+@receiver(post_delete, sender=Booking)
+def invalidate_availability_cache_on_delete(sender, instance, **kwargs):
+    slots = {(instance.room_number, instance.booking_date)}
+    transaction.on_commit(lambda: invalidate_availability_cache(slots))
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_state(sender, instance, **kwargs):
+    """
+    Запоминает прежние аудиторию, дату, статус и email, чтобы обновить
+    старую карту занятости, кэш проверок прежнего дня и кэши прежнего
+    пользователя
+    """
+    instance._previous_state = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._previous_state = (
+            Booking.objects.filter(pk=instance.pk)
+            .values('room_number', 'booking_date', 'user_email', 'status')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy_on_save(sender, instance, created, **kwargs):
+    """Пересчитывает битовую карту занятости аудитории на эту дату"""
+    if created and instance.status != 'confirmed':
+        # Неподтверждённое бронирование не меняет занятость
+        return
+    slots = {(instance.room_number, instance.booking_date)}
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        slots.add((previous['room_number'], previous['booking_date']))
+    refresh_days(slots)
+
+
+@receiver(post_delete, sender=Booking)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    if instance.status == 'confirmed':
+        refresh_days([(instance.room_number, instance.booking_date)])
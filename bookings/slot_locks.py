@@ -0,0 +1,114 @@
+"""
+Сериализация подтверждений по (аудитория, дата)
+
+Проверка доступности и запись бронирования — два отдельных шага, и без
+блокировки два параллельных запроса на один слот могут оба получить
+«свободно» и оба сохраниться как confirmed. Перед записью подтверждённого
+бронирования транзакция блокирует строку RoomDayLock своей пары
+(аудитория, дата) и повторно ищет пересечения в БД.
+
+- PostgreSQL/MySQL: SELECT ... FOR UPDATE по строкам RoomDayLock в
+  фиксированном порядке (без взаимоблокировок), разные аудитории
+  не ждут друг друга.
+- SQLite: блокировки строк нет, но первый же UPDATE берёт блокировку
+  записи всей БД до конца транзакции, поэтому повторная проверка
+  видит все закоммиченные бронирования.
+
+Правка существующего бронирования (API, админка) идёт под той же
+блокировкой через lock_for_update.
+
+На PostgreSQL дополнительно действует exclusion constraint
+booking_no_overlap_confirmed (миграция 0005).
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .availability_index import as_date, as_time
+from .models import Booking, RoomDayLock
+
+LOCK_CHUNK_SIZE = 200
+
+# Поля, от которых зависит занятость слота
+SLOT_FIELDS = ('room_number', 'booking_date', 'start_time', 'end_time', 'status')
+
+
+def lock_slots(slots: Iterable[Tuple[str, object]]):
+    """
+    Блокирует пары (аудитория, дата) до конца текущей транзакции
+
+    Должна вызываться внутри transaction.atomic().
+    """
+    keys = sorted({(room_number, as_date(booking_date)) for room_number, booking_date in slots})
+    if not keys:
+        return
+
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError('lock_slots() должна вызываться внутри transaction.atomic()')
+
+    # Сначала запись: на SQLite так транзакция сразу получает блокировку
+    # записи и не упирается в повышение блокировки чтения
+    RoomDayLock.objects.bulk_create(
+        [RoomDayLock(room_number=room_number, booking_date=booking_date)
+         for room_number, booking_date in keys],
+        ignore_conflicts=True,
+    )
+
+    # Пачками, чтобы не упереться в ограничение глубины выражения SQLite
+    for offset in range(0, len(keys), LOCK_CHUNK_SIZE):
+        condition = Q()
+        for room_number, booking_date in keys[offset:offset + LOCK_CHUNK_SIZE]:
+            condition |= Q(room_number=room_number, booking_date=booking_date)
+        locks = RoomDayLock.objects.filter(condition)
+
+        if connection.features.has_select_for_update:
+            list(locks.order_by('room_number', 'booking_date').select_for_update().values_list('id', flat=True))
+        locks.update(version=F('version') + 1)
+
+
+def find_confirmed_conflicts(room_number: str, booking_date, start_time, end_time,
+                             exclude_id: Optional[int] = None) -> List[Tuple[int, object, object]]:
+    """
+    Подтверждённые бронирования из БД, пересекающиеся с [start_time, end_time)
+
+    exclude_id — изменяемое бронирование, которое не конфликтует само с собой.
+    """
+    conflicts = Booking.objects.filter(
+        room_number=room_number,
+        booking_date=as_date(booking_date),
+        status='confirmed',
+        start_time__lt=as_time(end_time),
+        end_time__gt=as_time(start_time),
+    )
+    if exclude_id is not None:
+        conflicts = conflicts.exclude(pk=exclude_id)
+    return list(conflicts.order_by('start_time').values_list('id', 'start_time', 'end_time'))
+
+
+def lock_for_update(booking_id: Optional[int], fields: Dict[str, Any]) -> List[Tuple[int, object, object]]:
+    """
+    Блокирует слот изменяемого бронирования и ищет пересечения
+
+    Для правки бронирования в обход BookingService (PUT/PATCH в API,
+    админка): fields — итоговые значения полей. Неподтверждённое
+    бронирование слот не занимает, и для него проверка не нужна.
+    Должна вызываться внутри transaction.atomic(), до save().
+
+    Returns:
+        list: пересекающиеся подтверждённые бронирования (пустой — можно сохранять)
+    """
+    if fields['status'] != 'confirmed':
+        return []
+    lock_slots([(fields['room_number'], fields['booking_date'])])
+    return find_confirmed_conflicts(
+        fields['room_number'], fields['booking_date'], fields['start_time'], fields['end_time'],
+        exclude_id=booking_id,
+    )
+
+
+def conflicts_message(conflicts: List[Tuple[int, object, object]]) -> str:
+    """Текст ошибки валидации с перечнем пересечений"""
+    return 'Аудитория уже забронирована на это время: ' + ', '.join(
+        f"#{booking_id} {start.strftime('%H:%M')}–{end.strftime('%H:%M')}" for booking_id, start, end in conflicts
+    )
@@ -0,0 +1,113 @@
+"""
+Статистика бронирований
+
+Все счётчики считаются одним запросом с условной агрегацией
+(COUNT(...) FILTER (WHERE ...)) и кэшируются до следующего изменения
+бронирований. Ключ кэша строится по состоянию данных (get_bookings_state),
+а не по версии из кэша процесса: с LocMem версия не меняется в воркерах,
+которые не делали запись, и они отдавали бы устаревшие счётчики.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .cache import BookingsState, get_bookings_modified, get_bookings_state
+from .db_router import fresh_reads
+from .models import Booking
+
+GROUP_BY_FIELDS = {
+    'room': 'room_number',
+    'booking_type': 'booking_type',
+    'date': 'booking_date',
+}
+
+
+def _status_counters() -> Dict[str, Count]:
+    counters = {'total': Count('id')}
+    for status, _ in Booking.STATUS_CHOICES:
+        counters[status] = Count('id', filter=Q(status=status))
+    return counters
+
+
+class BookingStatsService:
+    """
+    Сервис статистики бронирований
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        if timeout is None:
+            timeout = getattr(settings, 'BOOKING_STATS_CACHE_TIMEOUT', 60)
+        self.timeout = timeout
+
+    def get_stats(self, room_number: str = None, date_from=None, date_to=None,
+                  booking_type: str = None, group_by: str = None) -> Dict[str, Any]:
+        """
+        Счётчики по статусам с необязательными фильтрами и разбивкой
+
+        Args:
+            room_number: Фильтр по аудитории
+            date_from, date_to: Диапазон дат бронирования (включительно)
+            booking_type: Фильтр по типу бронирования
+            group_by: Разбивка — room, booking_type или date
+
+        Returns:
+            {'total': ..., 'confirmed': ..., 'rejected': ..., 'pending': ...,
+             'by_<group_by>': [{...}, ...]}
+        """
+        if group_by is not None and group_by not in GROUP_BY_FIELDS:
+            raise ValueError(f'Неизвестная разбивка: {group_by}')
+
+        params = {
+            'room_number': room_number,
+            'date_from': str(date_from) if date_from else None,
+            'date_to': str(date_to) if date_to else None,
+            'booking_type': booking_type,
+            'group_by': group_by,
+        }
+        state = get_bookings_state()
+        key = self._cache_key(params, state)
+        stats = cache.get(key)
+        if stats is None:
+            # Счётчики попадут в кэш под текущим состоянием — считать их с отстающей реплики нельзя
+            modified = state.modified.timestamp() if state.modified else 0
+            with fresh_reads(max(modified, get_bookings_modified())):
+                stats = self._compute(room_number, date_from, date_to, booking_type, group_by)
+            cache.set(key, stats, self.timeout)
+        return stats
+
+    @staticmethod
+    def _cache_key(params: Dict[str, Any], state: BookingsState) -> str:
+        digest = hashlib.md5(json.dumps(
+            {**params, 'state': [str(state.modified), state.last_id, state.count]}, sort_keys=True,
+        ).encode()).hexdigest()
+        return f'bookings:stats:{digest}'
+
+    @staticmethod
+    def _compute(room_number, date_from, date_to, booking_type, group_by) -> Dict[str, Any]:
+        queryset = Booking.objects.order_by()
+        if room_number:
+            queryset = queryset.filter(room_number=room_number)
+        if date_from:
+            queryset = queryset.filter(booking_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(booking_date__lte=date_to)
+        if booking_type:
+            queryset = queryset.filter(booking_type=booking_type)
+
+        counters = _status_counters()
+        stats = queryset.aggregate(**counters)
+
+        if group_by:
+            field = GROUP_BY_FIELDS[group_by]
+            stats[f'by_{group_by}'] = [
+                {**row, field: str(row[field])}
+                for row in queryset.values(field).annotate(**counters).order_by(field)
+            ]
+        return stats
+
+
+booking_stats_service = BookingStatsService()
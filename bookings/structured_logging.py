@@ -0,0 +1,234 @@
+"""
+Структурированное логирование с идентификатором запроса
+
+- RequestIDMiddleware берёт X-Request-ID из запроса (или генерирует новый),
+  кладёт его в contextvar и возвращает в ответе. Идентификатор уходит
+  в сервис доступности и сохраняется в задаче очереди, поэтому по нему
+  видна вся цепочка обработки бронирования.
+- RequestIDFilter добавляет request_id в каждую запись лога.
+- QueueLogHandler ставит запись в ограниченную очередь без форматирования;
+  форматирование (JSONFormatter) и вывод выполняются в фоновом потоке,
+  так что логирование не блокирует поток запроса. При переполнении
+  очереди записи отбрасываются. Поток запускается при первой записи
+  в каждом процессе: после fork (gunicorn --preload) поток родителя
+  в дочернем процессе не существует.
+- payload_sampled() решает, логировать ли полные тела запросов/ответов:
+  для доли LOG_PAYLOAD_SAMPLE_RATE запросов, ошибки логируются всегда.
+"""
+import contextvars
+import json
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id = contextvars.ContextVar('booking_request_id', default='')
+_payload_sampled = contextvars.ContextVar('booking_payload_sampled', default=None)
+
+# Атрибуты LogRecord, которые не считаются структурированными полями
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def bind_request_id(request_id: Optional[str]):
+    """Выполняет блок с заданным request_id (воркеры очереди, потоки пула)"""
+    token = _request_id.set(request_id or '')
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+def request_id_headers() -> Dict[str, str]:
+    """Заголовки для исходящих запросов к сервису доступности"""
+    request_id = _request_id.get()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+def get_payload_sample_rate() -> float:
+    return getattr(settings, 'LOG_PAYLOAD_SAMPLE_RATE', 0.01)
+
+
+def payload_sampled() -> bool:
+    """
+    Логировать ли полные тела для текущего запроса
+
+    Решение принимается один раз на HTTP-запрос (в middleware), чтобы все
+    записи запроса были либо с телами, либо без. Вне запроса — на каждый вызов.
+    """
+    sampled = _payload_sampled.get()
+    if sampled is None:
+        return random.random() < get_payload_sample_rate()
+    return sampled
+
+
+class RequestIDMiddleware:
+    """
+    Назначает запросу идентификатор для корреляции логов
+
+    Входящий X-Request-ID принимается, если он похож на идентификатор
+    (до 64 символов [A-Za-z0-9._-]), иначе генерируется новый.
+    Работает и в синхронной, и в асинхронной цепочке middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        tokens = self._bind(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._unbind(tokens)
+
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        tokens = self._bind(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._unbind(tokens)
+
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    @staticmethod
+    def _bind(request) -> tuple:
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = new_request_id()
+        request.request_id = request_id
+        return (
+            _request_id.set(request_id),
+            _payload_sampled.set(random.random() < get_payload_sample_rate()),
+        )
+
+    @staticmethod
+    def _unbind(tokens: tuple):
+        id_token, sample_token = tokens
+        _payload_sampled.reset(sample_token)
+        _request_id.reset(id_token)
+
+
+class RequestIDFilter(logging.Filter):
+    """Добавляет в запись request_id текущего запроса"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = _request_id.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Одна запись — одна строка JSON
+
+    Поля extra=... попадают в запись как есть, значения без JSON-представления
+    приводятся к строке.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', ''),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Неблокирующий обработчик: запись уходит в очередь, вывод — в фоновом потоке
+
+    Args:
+        stream: 'stderr' или 'stdout'
+        max_size: Размер очереди; при переполнении записи отбрасываются
+    """
+
+    def __init__(self, stream: str = 'stderr', max_size: int = 10000):
+        super().__init__(queue.Queue(max_size))
+        self.max_size = max_size
+        self.dropped = 0
+        self.target = logging.StreamHandler(getattr(sys, stream))
+        self.listener = None
+        self._listener_pid = None
+
+    def _ensure_listener(self):
+        """
+        Запускает поток вывода текущего процесса
+
+        Вызывается из emit под блокировкой обработчика (Handler.handle),
+        которую logging пересоздаёт после fork.
+        """
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        if self._listener_pid is not None:
+            # Дочерний процесс: записи, унаследованные в очереди, выводит
+            # родитель, а блокировки старой очереди могли остаться захваченными
+            self.queue = queue.Queue(self.max_size)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self._listener_pid = pid
+
+    def setFormatter(self, fmt):
+        # Форматирует целевой обработчик в фоновом потоке
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        В отличие от QueueHandler.prepare сообщение не форматируется здесь
+
+        Аргументы записи — неизменяемые значения или объекты, созданные
+        для этой записи, поэтому форматировать их позже безопасно.
+        """
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # logging.shutdown() при выходе закрывает обработчик: очередь дописывается
+        if self._listener_pid == os.getpid() and self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
@@ -0,0 +1,270 @@
+"""
+Очередь отложенных проверок доступности в таблице БД
+
+Внешний брокер не нужен: задачи хранятся в AvailabilityCheckTask.
+Воркер захватывает пачку задач на время lease (на PostgreSQL —
+SELECT ... FOR UPDATE SKIP LOCKED, на остальных СУБД — условным UPDATE),
+проверяет доступность параллельно и обновляет бронирования. Ошибки сервиса
+повторяются с экспоненциальной задержкой, после MAX_ATTEMPTS задача
+переходит в статус dead и ждёт ручного разбора в админке.
+
+Ошибка БД (например, database is locked на SQLite) не останавливает воркер:
+задача уходит на повтор, а при сбое всей итерации захваченные задачи
+возвращаются в очередь. Задачу, удалённую отменой серии или захваченную
+другим воркером после истечения lease, воркер пропускает.
+"""
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .circuit_breaker import is_failure
+from .models import AvailabilityCheckTask, Booking
+from .structured_logging import bind_request_id, get_request_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SETTINGS = {
+    'BATCH_SIZE': 50,
+    'LEASE_SECONDS': 60,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_DELAY': 5,
+    'RETRY_MAX_DELAY': 600,
+    'CONCURRENCY': 10,
+}
+
+
+def get_queue_settings() -> dict:
+    return {**DEFAULT_QUEUE_SETTINGS, **getattr(settings, 'AVAILABILITY_QUEUE', {})}
+
+
+def enqueue(booking: Booking) -> AvailabilityCheckTask:
+    """Ставит бронирование в очередь на проверку доступности"""
+    task, _ = AvailabilityCheckTask.objects.update_or_create(
+        booking=booking,
+        defaults={
+            'status': 'queued',
+            'request_id': get_request_id(),
+            'available_at': timezone.now(),
+            'locked_by': '',
+            'locked_until': None,
+        },
+    )
+    return task
+
+
+def retry_delay(attempts: int, config: dict) -> float:
+    """Экспоненциальная задержка с разбросом (full jitter)"""
+    delay = min(config['RETRY_MAX_DELAY'], config['RETRY_BASE_DELAY'] * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def claim_batch(worker_id: str, batch_size: int, lease_seconds: int) -> List[AvailabilityCheckTask]:
+    """
+    Захватывает до batch_size готовых задач
+
+    Задачи в статусе processing с истёкшим lease (упавший воркер) тоже
+    считаются готовыми.
+    """
+    now = timezone.now()
+    ready = AvailabilityCheckTask.objects.filter(
+        Q(status='queued', available_at__lte=now)
+        | Q(status='processing', locked_until__lt=now)
+    ).order_by('available_at', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size])
+            _lease(ids, worker_id, now, lease_seconds)
+    else:
+        # Без SKIP LOCKED (SQLite) чтение идёт вне транзакции, а захват —
+        # одним условным UPDATE: если задачу успел забрать другой воркер,
+        # она не попадёт в нашу пачку
+        ids = list(ready.values_list('id', flat=True)[:batch_size])
+        _lease(ids, worker_id, now, lease_seconds)
+
+    if not ids:
+        return []
+
+    return list(
+        AvailabilityCheckTask.objects.filter(id__in=ids, locked_by=worker_id, status='processing')
+        .select_related('booking')
+    )
+
+
+def _lease(ids: List[int], worker_id: str, now, lease_seconds: int):
+    if not ids:
+        return
+    AvailabilityCheckTask.objects.filter(id__in=ids).filter(
+        Q(status='queued') | Q(status='processing', locked_until__lt=now)
+    ).update(
+        status='processing',
+        locked_by=worker_id,
+        locked_until=now + timedelta(seconds=lease_seconds),
+        updated_at=now,
+    )
+
+
+def _booking_data(booking: Booking) -> dict:
+    return {
+        'user_email': booking.user_email,
+        'room_number': booking.room_number,
+        'booking_date': booking.booking_date,
+        'start_time': booking.start_time,
+        'end_time': booking.end_time,
+        'booking_type': booking.booking_type,
+        'purpose': booking.purpose,
+    }
+
+
+def process_batch(tasks: List[AvailabilityCheckTask], booking_service, config: dict) -> dict:
+    """
+    Проверяет доступность для пачки задач
+
+    Returns:
+        dict: количество подтверждённых, отклонённых, отложенных и dead-задач
+    """
+    counts = {'confirmed': 0, 'rejected': 0, 'retried': 0, 'dead': 0}
+    if not tasks:
+        return counts
+
+    data = [_booking_data(task.booking) for task in tasks]
+
+    def check(task, booking_data):
+        # Логи и запрос к сервису доступности идут с request_id исходного запроса
+        with bind_request_id(task.request_id):
+            try:
+                return booking_service.check_availability(booking_data)
+            finally:
+                # Поток пула живёт одну пачку: открытое им соединение
+                # иначе осталось бы незакрытым до сборки мусора
+                connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(config['CONCURRENCY'], len(tasks))) as executor:
+        results = list(executor.map(check, tasks, data))
+
+    for task, booking_data, result in zip(tasks, data, results):
+        with bind_request_id(task.request_id):
+            try:
+                _finish(task, booking_data, result, booking_service, config, counts)
+            except DatabaseError as e:
+                logger.exception(
+                    "Не удалось сохранить результат проверки бронирования #%s", task.booking_id,
+                    extra={'booking_id': task.booking_id},
+                )
+                _retry(task, {'message': f'Ошибка БД: {e}'}, config, counts)
+
+    return counts
+
+
+def _finish(task: AvailabilityCheckTask, booking_data: dict, result: dict, booking_service,
+            config: dict, counts: dict):
+    if is_failure(result) or result.get('deferred'):
+        _retry(task, result, config, counts)
+        return
+
+    booking = task.booking
+    with transaction.atomic():
+        # Сначала закрывается задача: если её удалила отмена серии или забрал
+        # другой воркер, бронирование не перезаписывается
+        if not _update_leased(task, status='done', locked_by='', locked_until=None):
+            logger.info("Задача проверки бронирования #%s уже не наша, пропускаем", task.booking_id,
+                        extra={'booking_id': task.booking_id})
+            return
+        if result['success'] and result['available']:
+            # Слот мог занять другой запрос или бронирование из этой же пачки
+            result = booking_service.recheck_under_lock(booking_data, result)
+        booking.status = booking_service.build_booking_fields(booking_data, result)['status']
+        booking.availability_check_response = result
+        booking.save(update_fields=['status', *Booking.AVAILABILITY_FIELDS, 'updated_at'])
+    counts[booking.status] += 1
+
+
+def _update_leased(task: AvailabilityCheckTask, **fields) -> bool:
+    """Обновляет задачу, только если она всё ещё захвачена этим воркером"""
+    return bool(
+        AvailabilityCheckTask.objects.filter(pk=task.pk, locked_by=task.locked_by, status='processing')
+        .update(updated_at=timezone.now(), **fields)
+    )
+
+
+def _retry(task: AvailabilityCheckTask, result: dict, config: dict, counts: dict):
+    attempts = task.attempts + 1
+    last_error = result.get('message', '')
+
+    if attempts >= config['MAX_ATTEMPTS']:
+        status, available_at = 'dead', task.available_at
+    else:
+        status = 'queued'
+        available_at = timezone.now() + timedelta(seconds=retry_delay(attempts, config))
+
+    if not _update_leased(task, status=status, attempts=attempts, last_error=last_error,
+                          locked_by='', locked_until=None, available_at=available_at):
+        return
+
+    if status == 'dead':
+        counts['dead'] += 1
+        logger.error(
+            "Проверка бронирования #%s не выполнена после %s попыток: %s",
+            task.booking_id, attempts, last_error,
+            extra={'booking_id': task.booking_id},
+        )
+    else:
+        counts['retried'] += 1
+
+
+def release_tasks(worker_id: str) -> int:
+    """Возвращает в очередь задачи, захваченные воркером, не дожидаясь истечения lease"""
+    return AvailabilityCheckTask.objects.filter(locked_by=worker_id, status='processing').update(
+        status='queued', locked_by='', locked_until=None, updated_at=timezone.now(),
+    )
+
+
+def run_worker(booking_service, stop_event: threading.Event, poll_interval: float = 1.0,
+               batch_size: int = None, exit_when_empty: bool = False) -> dict:
+    """Цикл воркера: забрать пачку, обработать, повторить"""
+    config = get_queue_settings()
+    batch_size = batch_size or config['BATCH_SIZE']
+    worker_id = f'{threading.current_thread().name}-{uuid.uuid4().hex[:8]}'
+    totals = {'confirmed': 0, 'rejected': 0, 'retried': 0, 'dead': 0}
+
+    try:
+        while not stop_event.is_set():
+            try:
+                tasks = claim_batch(worker_id, batch_size, config['LEASE_SECONDS'])
+                if not tasks:
+                    if exit_when_empty:
+                        break
+                    stop_event.wait(poll_interval)
+                    continue
+
+                counts = process_batch(tasks, booking_service, config)
+            except Exception:
+                logger.exception("Ошибка воркера %s, захваченные задачи возвращаются в очередь", worker_id)
+                _release_after_error(worker_id)
+                stop_event.wait(poll_interval)
+                continue
+
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        close_old_connections()
+
+    return totals
+
+
+def _release_after_error(worker_id: str):
+    close_old_connections()
+    try:
+        release_tasks(worker_id)
+    except DatabaseError:
+        # Задачи вернутся в очередь сами по истечении lease
+        logger.exception("Не удалось вернуть задачи воркера %s в очередь", worker_id)
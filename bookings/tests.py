@@ -1,3 +1,1142 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import importlib
+import io
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from bookings.admin import BookingAdminForm
+from bookings.api_views import BookingViewSet, BulkCreateBookingView
+from bookings.async_services import AsyncAvailabilityService, AsyncBookingService
+from bookings.availability_cache import LRUBackend, reset_availability_cache
+from bookings.availability_index import AvailabilityIndex, availability_index
+from bookings.availability_responses import summary_fields
+from bookings.cache import bump_bookings_version, get_bookings_modified
+from bookings.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker_settings, is_failure,
+)
+from bookings.db_router import (
+    STICKY_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, choose_read_alias, current_read_alias, fresh_reads,
+    replica_reads,
+)
+from bookings.fast_serializers import LIST_FIELDS
+from bookings.http_client import build_session, get_http_settings
+from bookings.instrumentation import InstrumentationMiddleware
+from bookings.management.commands.stress_booking_confirmation import find_overlaps
+from bookings.models import (
+    ArchivedBooking, AvailabilityCheckTask, AvailabilityResponse, Booking, BookingArchiveSegment, RoomDayLock,
+    RoomDayOccupancy,
+)
+from bookings.occupancy import FULL_DAY, SLOTS_PER_DAY, mask_to_runs, slot_mask
+from bookings.parsers import ORJSONParser, orjson
+from bookings.perf.seed import seed_bookings
+from bookings.recurrence import booking_series_service
+from bookings.renderers import ORJSONRenderer
+from bookings.search import PostgresSearchBackend
+from bookings.serializers import BookingSerializer
+from bookings.services import AvailabilityService, BookingService, get_booking_service
+from bookings.slot_locks import find_confirmed_conflicts
+from bookings.stats import booking_stats_service
+from bookings.structured_logging import REQUEST_ID_HEADER, QueueLogHandler, RequestIDMiddleware, get_request_id
+from bookings.task_queue import claim_batch, get_queue_settings, process_batch, run_worker
+from bookings.views import BookingListView
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def booking_data(number: int = 0, room_number: str = '101', start: str = '10:00', end: str = '11:00',
+                 booking_date: date = TOMORROW) -> dict:
+    return {
+        'user_email': f'user{number}@university.edu',
+        'room_number': room_number,
+        'booking_date': booking_date,
+        'start_time': start,
+        'end_time': end,
+        'booking_type': 'lesson',
+        'purpose': '',
+    }
+
+
+def run_in_threads(function, items, threads: int = 16) -> list:
+    """Вызывает function для каждого элемента из пула потоков, возвращает исключения"""
+    errors = []
+
+    def one(item):
+        try:
+            function(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one, items))
+    return errors
+
+
+LOCAL_CHECKS = override_settings(
+    AVAILABILITY_MODE='local',
+    BOOKING_CHECK_MODE='inline',
+    AVAILABILITY_CACHE={'BACKEND': None},
+)
+
+
+class BookingTestMixin:
+    def setUp(self):
+        super().setUp()
+        # Индекс занятости общий для процесса и не откатывается вместе с транзакцией теста
+        availability_index.clear()
+        cache.clear()
+
+
+@LOCAL_CHECKS
+class AvailabilityResponseStorageTests(BookingTestMixin, TestCase):
+    def test_same_response_is_stored_once(self):
+        service = get_booking_service()
+        first, _ = service.create_booking(booking_data(1))
+        second, _ = service.create_booking(booking_data(2))
+
+        self.assertEqual(second.status, 'rejected')
+        third, _ = service.create_booking(booking_data(3))
+        self.assertEqual(second.availability_response_id, third.availability_response_id)
+        self.assertNotEqual(first.availability_response_id, second.availability_response_id)
+        self.assertEqual(AvailabilityResponse.objects.count(), 2)
+
+    def test_payload_and_summary_fields_round_trip(self):
+        booking, result = get_booking_service().create_booking(booking_data())
+
+        stored = Booking.objects.get(pk=booking.pk)
+        self.assertEqual(stored.availability_check_response, result)
+        for name, value in summary_fields(result).items():
+            self.assertEqual(getattr(stored, name), value)
+
+
+class AvailabilityIndexTests(BookingTestMixin, TestCase):
+    def build(self, *intervals) -> AvailabilityIndex:
+        index = AvailabilityIndex()
+        index.build_from_rows(
+            (number, '101', TOMORROW, start, end) for number, (start, end) in enumerate(intervals, 1)
+        )
+        return index
+
+    def conflict_ids(self, index, start: str, end: str) -> list:
+        return [booking_id for booking_id, _, _ in index.find_conflicts('101', TOMORROW, start, end)]
+
+    def test_adjacent_intervals_do_not_conflict(self):
+        index = self.build(('10:00', '11:00'))
+
+        self.assertEqual(self.conflict_ids(index, '09:00', '10:00'), [])
+        self.assertEqual(self.conflict_ids(index, '11:00', '12:00'), [])
+        self.assertEqual(self.conflict_ids(index, '10:59', '11:30'), [1])
+        self.assertEqual(self.conflict_ids(index, '09:00', '10:01'), [1])
+
+    def test_long_interval_found_behind_later_starts(self):
+        # Длинное бронирование начинается раньше коротких, но перекрывает их все
+        index = self.build(('08:00', '18:00'), ('09:00', '10:00'), ('12:00', '13:00'))
+
+        self.assertEqual(self.conflict_ids(index, '14:00', '15:00'), [1])
+        self.assertEqual(self.conflict_ids(index, '09:30', '12:30'), [1, 2, 3])
+
+    def test_removed_interval_frees_slot(self):
+        index = self.build(('10:00', '11:00'), ('10:30', '12:00'))
+        index.remove(2)
+
+        self.assertEqual(self.conflict_ids(index, '11:00', '12:00'), [])
+        self.assertEqual(self.conflict_ids(index, '10:00', '10:30'), [1])
+
+    def test_bucket_reloads_after_ttl(self):
+        index = AvailabilityIndex(ttl=60)
+        self.assertEqual(self.conflict_ids(index, '10:00', '11:00'), [])
+        # Запись другого воркера: сигналы этого процесса её не видят
+        Booking.objects.bulk_create([Booking(**booking_data(), status='confirmed')])
+        self.assertEqual(self.conflict_ids(index, '10:00', '11:00'), [])
+
+        monotonic = time.monotonic
+        with mock.patch('bookings.availability_index.time_module.monotonic', side_effect=lambda: monotonic() + 61):
+            self.assertEqual(len(self.conflict_ids(index, '10:00', '11:00')), 1)
+
+
+class ArchivedBookingTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+
+    def test_segment_without_check_fields(self):
+        # Сегменты, записанные до миграции 0010, не содержат check_*
+        response = {'success': True, 'available': False, 'message': 'Занято', 'conflicts': []}
+        row = {
+            'id': 7, 'user_email': 'old@university.edu', 'room_number': '101',
+            'booking_date': '2020-01-10', 'start_time': '10:00:00', 'end_time': '11:00:00',
+            'booking_type': 'lesson', 'purpose': '', 'status': 'rejected', 'series': None,
+            'availability_check_response': response,
+            'created_at': '2020-01-01T10:00:00Z', 'updated_at': '2020-01-01T10:00:00Z',
+        }
+        with gzip.open(os.path.join(self.archive_dir.name, 'old.ndjson.gz'), 'wt', encoding='utf-8') as file:
+            file.write(json.dumps(row) + '\n')
+        segment = BookingArchiveSegment.objects.create(
+            file_name='old.ndjson.gz', compression='gzip', date_from=date(2020, 1, 10),
+            date_to=date(2020, 1, 10), row_count=1, size_bytes=0,
+        )
+        ArchivedBooking.objects.create(booking_id=7, segment=segment, user_email=row['user_email'],
+                                       booking_date=date(2020, 1, 10))
+
+        with override_settings(BOOKING_ARCHIVE={'DIR': self.archive_dir.name}):
+            data = self.client.get('/api/bookings/7/').json()
+
+        self.assertEqual(data['availability_check_response'], response)
+        self.assertEqual(
+            (data['check_success'], data['check_available'], data['check_error']),
+            (True, False, ''),
+        )
+
+
+class ConditionalGetTests(BookingTestMixin, TestCase):
+    # В TestCase транзакция не коммитится и версия в кэше не меняется —
+    # как в воркере, который не обрабатывал запись
+    def create(self, number: int = 0, **kwargs) -> Booking:
+        return Booking.objects.create(**booking_data(number, **kwargs), status='confirmed')
+
+    def test_etag_follows_data_not_process_cache(self):
+        self.create(1)
+        first = self.client.get('/api/bookings/')
+        etag = first['ETag']
+        self.assertEqual(self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        booking = self.create(2, start='12:00', end='13:00')
+        second = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()['results']), 2)
+
+        booking.delete()
+        third = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(len(third.json()['results']), 1)
+
+    def test_last_modified_is_latest_updated_at(self):
+        booking = self.create()
+        updated_at = datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc)
+        Booking.objects.filter(pk=booking.pk).update(updated_at=updated_at)
+        response = self.client.get(f'/api/bookings/?user_email={booking.user_email}')
+        self.assertEqual(response['Last-Modified'], http_date(updated_at.timestamp()))
+
+    def test_user_scope_ignores_other_users(self):
+        booking = self.create(1)
+        etag = self.client.get(f'/api/bookings/?user_email={booking.user_email}')['ETag']
+        self.create(2, start='12:00', end='13:00')
+        response = self.client.get(f'/api/bookings/?user_email={booking.user_email}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_stats_body_follows_data(self):
+        # Тело кэшируется под новым ETag — внутренний кэш статистики не должен подставить старые счётчики
+        self.create(1)
+        self.assertEqual(self.client.get('/api/bookings/stats/').json()['total'], 1)
+
+        self.create(2, start='12:00', end='13:00')
+        self.assertEqual(self.client.get('/api/bookings/stats/').json()['total'], 2)
+
+    def test_html_list_counters_follow_data(self):
+        self.create(1)
+        self.assertEqual(self.client.get('/bookings/').context['total_bookings'], 1)
+
+        self.create(2, start='12:00', end='13:00')
+        response = self.client.get('/bookings/')
+        self.assertEqual((response.context['total_bookings'], response.context['confirmed_count']), (2, 2))
+
+
+class StatsCacheTests(BookingTestMixin, TestCase):
+    # Как и в ConditionalGetTests, версия в кэше после записи не меняется
+    def test_stats_follow_data_not_process_cache(self):
+        Booking.objects.create(**booking_data(1), status='confirmed')
+        self.assertEqual(booking_stats_service.get_stats()['total'], 1)
+
+        booking = Booking.objects.create(**booking_data(2, start='12:00', end='13:00'), status='rejected')
+        stats = booking_stats_service.get_stats()
+        self.assertEqual((stats['total'], stats['confirmed'], stats['rejected']), (2, 1, 1))
+
+        booking.delete()
+        self.assertEqual(booking_stats_service.get_stats()['total'], 1)
+
+
+class ExportTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = Booking.objects.create(**{**booking_data(1), 'purpose': 'Лекция "Сети", часть 1'},
+                                            status='confirmed')
+        self.second = Booking.objects.create(**booking_data(2, start='12:00', end='13:00'), status='rejected')
+
+    def export(self, **params) -> str:
+        response = self.client.get('/api/bookings/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_rows_in_id_order(self):
+        rows = [json.loads(line) for line in self.export(format='ndjson').splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [self.first.pk, self.second.pk])
+        self.assertEqual(rows[0]['purpose'], 'Лекция "Сети", часть 1')
+        self.assertEqual(
+            (rows[1]['booking_date'], rows[1]['start_time'], rows[1]['status']),
+            (TOMORROW.isoformat(), '12:00:00', 'rejected'),
+        )
+
+    def test_csv_matches_ndjson_and_filters_by_user(self):
+        ndjson = [json.loads(line) for line in self.export(format='ndjson').splitlines()]
+        rows = list(csv.DictReader(io.StringIO(self.export(format='csv'))))
+
+        self.assertEqual(rows, [{name: str(value) for name, value in row.items()} for row in ndjson])
+        filtered = list(csv.DictReader(io.StringIO(self.export(format='csv', user_email=self.second.user_email))))
+        self.assertEqual([row['id'] for row in filtered], [str(self.second.pk)])
+
+
+class OccupancyTests(BookingTestMixin, TestCase):
+    def test_slot_mask_covers_partially_touched_slots(self):
+        self.assertEqual(slot_mask('10:00', '10:05'), 1 << 120)
+        self.assertEqual(slot_mask('10:02', '10:07'), 0b11 << 120)
+        self.assertEqual(slot_mask('10:00', '10:05:30'), 0b11 << 120)
+        self.assertEqual(slot_mask('10:00', '10:00'), 0)
+        self.assertEqual(slot_mask('00:00', '23:59:59'), FULL_DAY)
+
+    def test_mask_to_runs(self):
+        self.assertEqual(mask_to_runs(0), [])
+        self.assertEqual(mask_to_runs(0b1101110), [(1, 4), (5, 7)])
+        self.assertEqual(mask_to_runs(FULL_DAY), [(0, SLOTS_PER_DAY)])
+        self.assertEqual(mask_to_runs(1 << (SLOTS_PER_DAY - 1)), [(SLOTS_PER_DAY - 1, SLOTS_PER_DAY)])
+
+    def test_min_duration_drops_short_gaps(self):
+        Booking.objects.create(**booking_data(1, start='10:00', end='11:00'), status='confirmed')
+        Booking.objects.create(**booking_data(2, start='11:30', end='12:00'), status='confirmed')
+        params = {'date_from': TOMORROW.isoformat(), 'room_number': '101', 'from_time': '09:00', 'to_time': '13:00'}
+
+        day = self.client.get('/api/occupancy/', {**params, 'min_duration': 31}).json()['results'][0]
+        self.assertEqual(day['busy'], [{'start_time': '10:00', 'end_time': '11:00'},
+                                       {'start_time': '11:30', 'end_time': '12:00'}])
+        self.assertEqual(day['free'], [{'start_time': '09:00', 'end_time': '10:00'},
+                                       {'start_time': '12:00', 'end_time': '13:00'}])
+
+        day = self.client.get('/api/occupancy/', {**params, 'min_duration': 30}).json()['results'][0]
+        self.assertIn({'start_time': '11:00', 'end_time': '11:30'}, day['free'])
+
+
+@LOCAL_CHECKS
+class FieldsProjectionTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.booking, self.result = get_booking_service().create_booking(booking_data())
+
+    def test_detail_matches_drf_serializer(self):
+        data = self.client.get(f'/api/bookings/{self.booking.pk}/').json()
+
+        self.assertEqual(data, json.loads(json.dumps(BookingSerializer(Booking.objects.get(pk=self.booking.pk)).data)))
+
+    def test_list_projection(self):
+        default = self.client.get('/api/bookings/').json()['results'][0]
+        self.assertEqual(list(default), LIST_FIELDS)
+
+        rows = self.client.get('/api/bookings/', {'fields': 'status,id'}).json()['results']
+        self.assertEqual(rows, [{'status': 'confirmed', 'id': self.booking.pk}])
+
+        row = self.client.get('/api/bookings/', {'fields': 'id,availability_check_response'}).json()['results'][0]
+        self.assertEqual(row['availability_check_response'], self.result)
+
+    def test_unknown_field_is_rejected(self):
+        for url in ('/api/bookings/', f'/api/bookings/{self.booking.pk}/'):
+            response = self.client.get(url, {'fields': 'id,password'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('password', response.json()['message'])
+
+
+@skipUnless(orjson, 'orjson не установлен')
+class ORJSONRendererTests(TestCase):
+    def test_output_matches_drf_renderer(self):
+        data = {
+            'created_at': datetime(2024, 5, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc),
+            'booking_date': date(2024, 5, 1),
+            'start_time': dt_time(10, 30),
+            'price': Decimal('1.50'),
+            'uid': uuid.UUID(int=1),
+            'duration': timedelta(hours=1),
+            'message': gettext_lazy('Аудитория свободна'),
+            'conflicts': [{'booking_id': 1, 'available': False, 'ratio': 0.5}],
+            7: None,
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parser_matches_drf_parser(self):
+        body = json.dumps({'purpose': 'Лекция', 'items': [1, 2.5, None]}, ensure_ascii=False)
+        for encoding in ('utf-8', 'cp1251'):
+            context = {'encoding': encoding}
+            self.assertEqual(
+                ORJSONParser().parse(io.BytesIO(body.encode(encoding)), parser_context=context),
+                JSONParser().parse(io.BytesIO(body.encode(encoding)), parser_context=context),
+            )
+
+
+class KeysetPaginationTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        bookings = [Booking.objects.create(**booking_data(number, start=f'{8 + number}:00', end=f'{9 + number}:00'))
+                    for number in range(5)]
+        # Одинаковый created_at у части строк: порядок внутри определяет id
+        created_at = datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc)
+        Booking.objects.filter(pk__in=[booking.pk for booking in bookings[1:4]]).update(created_at=created_at)
+        self.expected = list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url: str, link: str) -> list:
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([row['id'] for row in data['results']])
+            url = data[link]
+        return pages
+
+    def test_cursor_round_trip(self):
+        forward = self.walk('/api/bookings/?page_size=2', 'next')
+        self.assertEqual(forward, [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+
+        last = self.client.get('/api/bookings/?page_size=2').json()
+        while last['next']:
+            last = self.client.get(last['next']).json()
+        backward = self.walk(last['previous'], 'previous')
+        self.assertEqual(backward, [self.expected[2:4], self.expected[0:2]])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/bookings/', {'cursor': 'not-a-cursor'}).status_code, 404)
+        self.assertEqual(self.client.get('/bookings/', {'cursor': '!!!'}).status_code, 404)
+
+
+class HttpClientTests(TestCase):
+    def test_read_timeout_is_not_retried(self):
+        # Повтор после таймаута чтения умножает ожидание на RETRIES + 1
+        retry = build_session().get_adapter('http://availability').max_retries
+
+        self.assertEqual(retry.read, 0)
+        self.assertEqual(retry.connect, get_http_settings()['RETRIES'])
+        self.assertFalse(retry.is_retry('POST', 500))
+        self.assertTrue(retry.is_retry('POST', 503))
+
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    def count_query(self):
+        return HttpResponse(str(Booking.objects.count()))
+
+    def test_sync_request_counts_queries(self):
+        response = InstrumentationMiddleware(lambda request: self.count_query())(RequestFactory().get('/'))
+
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_async_chain_stays_async(self):
+        async def get_response(request):
+            # Под ASGI синхронный код представления выполняется в другом потоке
+            return await sync_to_async(self.count_query)()
+
+        middleware = InstrumentationMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+class LoggingConfigTests(TestCase):
+    def test_django_records_go_only_through_queue(self):
+        django_logger = logging.getLogger('django')
+
+        self.assertEqual(django_logger.handlers, [])
+        self.assertTrue(django_logger.propagate)
+        self.assertEqual([type(handler).__name__ for handler in logging.getLogger().handlers], ['QueueLogHandler'])
+
+    def test_listener_starts_in_each_process(self):
+        handler = QueueLogHandler()
+        self.addCleanup(handler.close)
+        self.assertIsNone(handler.listener)
+        record = logging.LogRecord('bookings', logging.INFO, __file__, 0, 'запись', (), None)
+
+        handler.handle(record)
+        parent = handler.listener
+        self.assertIsNotNone(parent._thread)
+
+        # Как в дочернем процессе после fork: поток родителя там не работает
+        with mock.patch('bookings.structured_logging.os.getpid', return_value=os.getpid() + 1):
+            handler.handle(record)
+            self.assertIsNot(handler.listener, parent)
+            self.assertIsNotNone(handler.listener._thread)
+            handler.close()
+        parent.stop()
+
+    def test_request_id_middleware_stays_async(self):
+        async def get_response(request):
+            return HttpResponse(get_request_id())
+
+        middleware = RequestIDMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = async_to_sync(middleware)(RequestFactory().get('/', HTTP_X_REQUEST_ID='abc-1'))
+        self.assertEqual((response.content, response[REQUEST_ID_HEADER]), (b'abc-1', 'abc-1'))
+
+
+class EmailFilterTests(BookingTestMixin, TestCase):
+    def test_html_list_filters_by_email_substring(self):
+        for number, email in enumerate(('ivanov@university.edu', 'petrov@university.edu')):
+            Booking.objects.create(**{**booking_data(number, start=f'1{number}:00', end=f'1{number}:30'),
+                                      'user_email': email})
+
+        response = self.client.get('/bookings/', {'email': 'IVANOV@uni'})
+
+        self.assertEqual([booking.user_email for booking in response.context['bookings']], ['ivanov@university.edu'])
+
+    def test_email_filter_matches_middle_of_word(self):
+        # Email индексируется одним словом, префиксный поиск не нашёл бы «university»
+        for number, email in enumerate(('ivanov@university.edu', 'petrov@college.edu')):
+            Booking.objects.create(**{**booking_data(number, start=f'1{number}:00', end=f'1{number}:30'),
+                                      'user_email': email})
+
+        response = self.client.get('/bookings/', {'email': 'University'})
+
+        self.assertEqual([booking.user_email for booking in response.context['bookings']], ['ivanov@university.edu'])
+
+    def test_postgres_contains_is_plain_icontains(self):
+        # На PostgreSQL подстроку ищет триграммный индекс booking_email_trgm_idx по UPPER(user_email)
+        sql = str(PostgresSearchBackend().contains(Booking.objects.all(), 'user_email', 'vanov').query)
+
+        self.assertNotIn('to_tsquery', sql)
+        self.assertIn('LIKE', sql)
+
+class SearchApiTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        rows = [
+            ('205', 'ivanov@university.edu', 'Лекция по сетям', 'confirmed'),
+            ('310', 'petrov@university.edu', 'Консультация, аудитория 205', 'confirmed'),
+            ('311', 'ivanov@university.edu', 'Консультация', 'rejected'),
+        ]
+        self.bookings = [
+            Booking.objects.create(**{**booking_data(number, room_number=room_number), 'user_email': email,
+                                      'purpose': purpose}, status=status)
+            for number, (room_number, email, purpose, status) in enumerate(rows)
+        ]
+
+    def search(self, **params) -> dict:
+        response = self.client.get('/api/bookings/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, **params) -> list:
+        return [row['id'] for row in self.search(**params)['results']]
+
+    def test_room_match_ranks_above_purpose(self):
+        # Совпадение в аудитории весит больше, хотя второе бронирование новее
+        self.assertEqual(self.ids(q='205'), [self.bookings[0].pk, self.bookings[1].pk])
+
+    def test_all_terms_match_as_prefixes(self):
+        self.assertEqual(self.ids(q='ivanov лекц'), [self.bookings[0].pk])
+        self.assertEqual(self.ids(q='консульт'), [self.bookings[2].pk, self.bookings[1].pk])
+
+    def test_filters_and_pages(self):
+        self.assertEqual(self.ids(q='консульт', user_email='ivanov@university.edu'), [self.bookings[2].pk])
+        self.assertEqual(self.ids(q='консульт', status='confirmed'), [self.bookings[1].pk])
+
+        first = self.search(q='консульт', page_size=1)
+        self.assertEqual(len(first['results']), 1)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'][0]['id'], self.bookings[1].pk)
+        self.assertIsNone(second['next'])
+
+    def test_empty_query_is_rejected(self):
+        self.assertEqual(self.client.get('/api/bookings/search/', {'q': ' @ '}).status_code, 400)
+
+
+class AsyncAvailabilityTests(TestCase):
+    def check_with_status(self, status_code: int) -> dict:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(status_code, json={'detail': 'Некорректный запрос'})
+        ))
+        with mock.patch('bookings.async_services.get_async_client', return_value=client):
+            return async_to_sync(AsyncAvailabilityService().check_availability)(booking_data())
+
+    def test_client_errors_are_not_breaker_failures(self):
+        result = self.check_with_status(400)
+        self.assertEqual(result['status_code'], 400)
+        self.assertFalse(is_failure(result))
+        self.assertTrue(is_failure(self.check_with_status(503)))
+
+
+@override_settings(AVAILABILITY_MODE='authoritative', AVAILABILITY_CIRCUIT_BREAKER={'ENABLED': False},
+                   AVAILABILITY_CACHE={'BACKEND': 'lru', 'TTL': 30, 'MAX_ENTRIES': 100})
+class AsyncAvailabilityCacheTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        reset_availability_cache()
+        self.addCleanup(reset_availability_cache)
+        self.requests = []
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={'available': True})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        patcher = mock.patch('bookings.async_services.get_async_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_check_is_cached(self):
+        service = AsyncBookingService()
+        first = async_to_sync(service.check_availability)(booking_data())
+        second = async_to_sync(service.check_availability)(booking_data())
+
+        self.assertTrue(first['available'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(len(self.requests), 1)
+
+    def test_concurrent_checks_share_one_request(self):
+        service = AsyncBookingService()
+
+        async def check_many():
+            return await asyncio.gather(*(service.check_remote_availability(booking_data()) for _ in range(5)))
+
+        results = async_to_sync(check_many)()
+
+        self.assertTrue(all(result['available'] for result in results))
+        self.assertEqual(len(self.requests), 1)
+
+
+@override_settings(AVAILABILITY_MODE='authoritative', BOOKING_CHECK_MODE='inline',
+                   AVAILABILITY_CACHE={'BACKEND': 'lru', 'TTL': 30, 'MAX_ENTRIES': 100})
+class AvailabilityCacheInvalidationTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        reset_availability_cache()
+        self.addCleanup(reset_availability_cache)
+        self.service = BookingService()
+        self.remote = mock.Mock(return_value=AvailabilityService.parse_result({'available': True}))
+        self.service.availability_service.check_availability = self.remote
+
+    def create(self, data: dict) -> Booking:
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.service.create_booking(data)[0]
+
+    def test_rejected_create_keeps_cached_result(self):
+        self.remote.return_value = AvailabilityService.parse_result({'available': False})
+        self.assertEqual(self.create(booking_data(1)).status, 'rejected')
+        self.assertEqual(self.create(booking_data(1)).status, 'rejected')
+        self.assertEqual(self.remote.call_count, 1)
+
+    def test_confirmed_create_invalidates_slot(self):
+        self.assertEqual(self.create(booking_data(1)).status, 'confirmed')
+        self.create(booking_data(2, start='12:00', end='13:00'))
+        self.create(booking_data(2, start='12:00', end='13:00'))
+        self.assertEqual(self.remote.call_count, 2)
+
+    def test_moving_booking_invalidates_previous_day(self):
+        booking = self.create(booking_data(1))
+        # Проверка другого слота того же дня попадает в кэш
+        self.create(booking_data(2, start='14:00', end='15:00', room_number='102'))
+        self.service.check_remote_availability(booking_data(3, start='12:00', end='13:00'))
+        calls = self.remote.call_count
+
+        booking.booking_date = TOMORROW + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.service.check_remote_availability(booking_data(3, start='12:00', end='13:00'))
+        self.assertEqual(self.remote.call_count, calls + 1)
+
+    def test_lru_generations_expire(self):
+        backend = LRUBackend(ttl=30)
+        with mock.patch('bookings.availability_cache.time.monotonic', return_value=100.0):
+            for number in range(50):
+                backend.bump_generation(f'gen:{number}')
+            self.assertEqual(backend.get_generation('gen:1'), 2)
+        with mock.patch('bookings.availability_cache.time.monotonic', return_value=200.0):
+            backend.bump_generation('gen:1')
+            self.assertEqual(len(backend._generations), 1)
+            self.assertEqual(backend.get_generation('gen:1'), 51)
+            self.assertEqual(backend.get_generation('gen:2'), 0)
+
+
+FAILURE = {'success': False, 'available': False, 'error': 'timeout'}
+SUCCESS = {'success': True, 'available': True, 'message': '', 'conflicts': []}
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        patcher = mock.patch('bookings.circuit_breaker.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', {
+            **get_breaker_settings(), 'MIN_REQUESTS': 4, 'FAILURE_RATE_THRESHOLD': 0.5,
+            'WINDOW': 30, 'OPEN_TIMEOUT': 10,
+        })
+
+    def call(self, result: dict) -> dict:
+        return self.breaker.call(lambda booking_data: result, booking_data())
+
+    def open_breaker(self):
+        for _ in range(4):
+            self.call(FAILURE)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_opens_only_after_min_requests(self):
+        for _ in range(3):
+            self.call(FAILURE)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.call(FAILURE)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_stays_closed_below_failure_rate(self):
+        for result in (SUCCESS, SUCCESS, SUCCESS, FAILURE, SUCCESS):
+            self.call(result)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_client_errors_do_not_count(self):
+        for _ in range(6):
+            self.call({'success': False, 'available': False, 'error': 'http_error', 'status_code': 409})
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_open_breaker_short_circuits(self):
+        self.open_breaker()
+        func = mock.Mock(return_value=SUCCESS)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(func, booking_data())
+        func.assert_not_called()
+        self.assertEqual(self.breaker.metrics()['short_circuited'], 1)
+
+    def test_half_open_lets_one_trial_through_and_closes_on_success(self):
+        self.open_breaker()
+        self.now += 10.5
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_result(SUCCESS)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.now += 10.5
+        self.call(FAILURE)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.now += 5
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+@override_settings(AVAILABILITY_CACHE={'BACKEND': None})
+class CircuitOpenFallbackTests(BookingTestMixin, TestCase):
+    def check_with_open_breaker(self, policy: str) -> dict:
+        config = {**get_breaker_settings(), 'FALLBACK': policy}
+        service = BookingService()
+        service.availability_service = mock.Mock()
+        with override_settings(AVAILABILITY_CIRCUIT_BREAKER=config), \
+                mock.patch.object(CircuitBreaker, 'allow_request', return_value=False):
+            result = service.check_remote_availability(booking_data())
+        service.availability_service.check_availability.assert_not_called()
+        return result
+
+    def test_pending_policy_defers_booking(self):
+        result = self.check_with_open_breaker('pending')
+        self.assertTrue(result['deferred'])
+        self.assertEqual(BookingService.build_booking_fields(booking_data(), result)['status'], 'pending')
+
+    def test_reject_policy(self):
+        result = self.check_with_open_breaker('reject')
+        self.assertEqual((result['error'], result['fallback']), ('circuit_open', 'reject'))
+
+    def test_local_policy_uses_local_index(self):
+        Booking.objects.create(**booking_data(1), status='confirmed')
+        result = self.check_with_open_breaker('local')
+        self.assertEqual(result['fallback'], 'local')
+        self.assertFalse(result['available'])
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def later(self, seconds: float):
+        """Часы db_router, сдвинутые на seconds вперёд"""
+        return mock.patch('bookings.db_router.time.time', return_value=time.time() + seconds)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        with replica_reads(self.factory.get('/api/bookings/')):
+            self.assertEqual(self.router.db_for_read(Booking), 'replica_0')
+            self.assertEqual(self.router.db_for_write(Booking), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertIsNone(self.router.db_for_read(Booking))
+        self.assertIsNone(self.router.db_for_read(Booking))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'bookings'))
+
+    def test_unsafe_methods_read_primary(self):
+        self.assertIsNone(choose_read_alias(self.factory.post('/api/bookings/')))
+
+    def test_sticky_cookie_after_write(self):
+        response = ReplicaStickinessMiddleware(lambda request: HttpResponse(status=201))(
+            self.factory.post('/api/create-booking/')
+        )
+        cookie = response.cookies[STICKY_COOKIE].value
+        request = self.factory.get('/api/bookings/')
+        request.COOKIES[STICKY_COOKIE] = cookie
+        self.assertIsNone(choose_read_alias(request))
+        with self.later(6):
+            self.assertEqual(choose_read_alias(request), 'replica_0')
+
+    def test_failed_write_is_not_sticky(self):
+        response = ReplicaStickinessMiddleware(lambda request: HttpResponse(status=400))(
+            self.factory.post('/api/create-booking/')
+        )
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    @mock.patch('bookings.db_router.markers_shared', return_value=True)
+    def test_recent_write_of_user_reads_primary(self, markers_shared):
+        request = self.factory.get('/api/bookings/', {'user_email': 'writer@university.edu'})
+        # Без отметки изменения чтение идёт из основной БД, отметка создаётся с текущим временем
+        self.assertIsNone(choose_read_alias(request, 'new@university.edu'))
+        with self.later(-10):
+            get_bookings_modified('writer@university.edu')
+            get_bookings_modified('other@university.edu')
+        self.assertEqual(choose_read_alias(request, 'writer@university.edu'), 'replica_0')
+
+        bump_bookings_version(['writer@university.edu'])
+        self.assertIsNone(choose_read_alias(request, 'writer@university.edu'))
+        self.assertEqual(choose_read_alias(request, 'other@university.edu'), 'replica_0')
+        with self.later(6):
+            self.assertEqual(choose_read_alias(request, 'writer@university.edu'), 'replica_0')
+
+    def test_user_reads_primary_with_process_local_markers(self):
+        # Запись из другого воркера не оставит отметку в LocMem этого процесса
+        request = self.factory.get('/api/bookings/', {'user_email': 'writer@university.edu'})
+        with self.later(-10):
+            get_bookings_modified('writer@university.edu')
+
+        self.assertIsNone(choose_read_alias(request, 'writer@university.edu'))
+        self.assertEqual(choose_read_alias(request), 'replica_0')
+
+    def test_stickiness_middleware_stays_async(self):
+        async def get_response(request):
+            return HttpResponse(status=201)
+
+        middleware = ReplicaStickinessMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(self.factory.post('/api/async/create-booking/'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_fresh_reads_switch_to_primary_after_recent_change(self):
+        with replica_reads(self.factory.get('/api/bookings/')):
+            with fresh_reads(time.time()):
+                self.assertEqual(current_read_alias(), DEFAULT_DB_ALIAS)
+            with fresh_reads(time.time() - 60):
+                self.assertEqual(current_read_alias(), 'replica_0')
+
+
+class IndexUsageTests(TestCase):
+    """Запросы горячих путей используют составные индексы Booking (EXPLAIN)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bookings(3000, rooms=30, users=200)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.sample = Booking.objects.values('user_email', 'room_number', 'booking_date').first()
+
+    def assertUsesIndex(self, queryset, index_name: str):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def viewset_queryset(self, params: dict):
+        view = BookingViewSet()
+        view.request = Request(RequestFactory().get('/api/bookings/', params))
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    def list_view_queryset(self, params: dict):
+        view = BookingListView()
+        view.setup(RequestFactory().get('/bookings/', params))
+        return view.get_queryset()
+
+    def test_api_list_by_user_email(self):
+        self.assertUsesIndex(
+            self.viewset_queryset({'user_email': self.sample['user_email']})[:20], 'booking_email_created_idx'
+        )
+
+    def test_html_list(self):
+        self.assertUsesIndex(self.list_view_queryset({})[:20], 'booking_created_idx')
+        self.assertUsesIndex(self.list_view_queryset({'status': 'pending'})[:20], 'booking_status_created_idx')
+        self.assertUsesIndex(
+            self.list_view_queryset({'date': str(self.sample['booking_date'])})[:20], 'booking_date_created_idx'
+        )
+
+    def test_availability_bucket(self):
+        self.assertUsesIndex(
+            AvailabilityIndex.bucket_queryset(self.sample['room_number'], self.sample['booking_date']),
+            'booking_room_date_start_idx',
+        )
+
+
+@LOCAL_CHECKS
+class BookingUpdateLockTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        service = get_booking_service()
+        self.first, _ = service.create_booking(booking_data(1, start='10:00', end='11:00'))
+        self.second, _ = service.create_booking(booking_data(2, start='12:00', end='13:00'))
+
+    def test_conflicts_exclude_booking_itself(self):
+        self.assertEqual(find_confirmed_conflicts('101', TOMORROW, '10:30', '11:30', exclude_id=self.first.pk), [])
+        self.assertEqual(
+            [row[0] for row in find_confirmed_conflicts('101', TOMORROW, '10:30', '12:30', exclude_id=self.first.pk)],
+            [self.second.pk],
+        )
+
+    def test_api_update_rejects_overlap(self):
+        response = self.client.patch(f'/api/bookings/{self.first.pk}/', {'end_time': '12:30'},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.get(pk=self.first.pk).end_time.strftime('%H:%M'), '11:00')
+
+    def test_api_update_within_own_slot(self):
+        response = self.client.patch(f'/api/bookings/{self.first.pk}/', {'end_time': '11:30'},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.get(pk=self.first.pk).end_time.strftime('%H:%M'), '11:30')
+
+    def test_admin_form_rejects_overlap(self):
+        data = {**BookingAdminForm(instance=self.first).initial, 'start_time': '11:30', 'end_time': '12:30'}
+        data = {name: value for name, value in data.items() if value is not None}
+        form = BookingAdminForm(data, instance=self.first)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn(f'#{self.second.pk}', str(form.non_field_errors()))
+
+    def test_delete_refreshes_occupancy_under_slot_lock(self):
+        version = RoomDayLock.objects.get(room_number='101', booking_date=TOMORROW).version
+
+        self.second.delete()
+        self.first.delete()
+
+        self.assertEqual(RoomDayLock.objects.get(room_number='101', booking_date=TOMORROW).version, version + 2)
+        self.assertFalse(RoomDayOccupancy.objects.filter(room_number='101', booking_date=TOMORROW).exists())
+
+    def test_migration_reports_existing_overlaps(self):
+        migration = importlib.import_module('bookings.migrations.0005_room_day_lock')
+        Booking.objects.filter(pk=self.second.pk).update(start_time='10:30')
+
+        overlaps = migration.find_overlapping_confirmed(connection)
+
+        self.assertEqual([row[:2] for row in overlaps], [(self.first.pk, self.second.pk)])
+        self.assertIn(f'#{self.second.pk}', migration.overlaps_report(overlaps))
+
+
+
+@LOCAL_CHECKS
+class SeriesUpdateTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.series, _ = booking_series_service.create_series({
+            'user_email': 'series@university.edu', 'room_number': '101',
+            'start_time': dt_time(10), 'end_time': dt_time(11), 'booking_type': 'lesson',
+            'frequency': 'daily', 'start_date': TOMORROW, 'count': 3,
+        })
+
+    def reschedule(self):
+        return booking_series_service.update_series(
+            self.series, {'start_time': dt_time(10, 30), 'end_time': dt_time(11, 30)}, from_date=TOMORROW,
+        )
+
+    def test_reschedule_replaces_overlapping_occurrences(self):
+        _, created = self.reschedule()
+
+        self.assertEqual([booking.status for booking, _ in created], ['confirmed'] * 3)
+        self.assertEqual(Booking.objects.filter(series=self.series, status='cancelled').count(), 3)
+
+    def test_failed_reschedule_keeps_old_occurrences(self):
+        with mock.patch.object(booking_series_service, '_create_occurrences',
+                               side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.reschedule()
+
+        self.assertEqual(Booking.objects.filter(series=self.series, status='confirmed').count(), 3)
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.start_time, dt_time(10))
+
+
+@LOCAL_CHECKS
+class BulkCreateTests(BookingTestMixin, TestCase):
+    def test_overlap_inside_batch_confirms_first(self):
+        created = get_booking_service().create_bookings_bulk([
+            booking_data(1, start='10:00', end='11:00'),
+            booking_data(2, start='10:30', end='11:30'),
+            booking_data(3, start='11:00', end='12:00'),
+        ])
+
+        # Третье примыкает к первому, а отклонённое второе слот не занимает
+        self.assertEqual([booking.status for booking, _ in created], ['confirmed', 'rejected', 'confirmed'])
+        _, result = created[1]
+        self.assertIn('из пакета', result['message'])
+        self.assertEqual([conflict['batch_index'] for conflict in result['conflicts']], [0])
+
+    def test_conflict_found_under_lock_is_not_reported_as_batch(self):
+        # Бронирование подтвердили, пока пачка ждала внешние проверки
+        service = get_booking_service()
+        check_bulk = service._check_bulk
+        existing = []
+
+        def check_then_confirm_other(items):
+            results = check_bulk(items)
+            existing.append(Booking.objects.create(**booking_data(9), status='confirmed'))
+            return results
+
+        with mock.patch.object(service, '_check_bulk', side_effect=check_then_confirm_other):
+            created = service.create_bookings_bulk([booking_data(1)])
+
+        booking, result = created[0]
+        self.assertEqual(booking.status, 'rejected')
+        self.assertNotIn('из пакета', result['message'])
+        self.assertEqual(result['conflicts'][0]['booking_id'], existing[0].pk)
+        self.assertNotIn('batch_index', result['conflicts'][0])
+
+    @override_settings(BOOKING_CHECK_MODE='deferred', AVAILABILITY_MODE='authoritative')
+    def test_deferred_mode_queues_without_checks(self):
+        service = get_booking_service()
+        with mock.patch.object(service.availability_service, 'check_availability') as remote_check:
+            created = service.create_bookings_bulk([booking_data(1), booking_data(2, start='10:30', end='11:30')])
+
+        remote_check.assert_not_called()
+        self.assertEqual([booking.status for booking, _ in created], ['pending', 'pending'])
+        self.assertEqual(AvailabilityCheckTask.objects.filter(status='queued').count(), 2)
+
+
+@LOCAL_CHECKS
+class ConcurrentCreateTests(BookingTestMixin, TransactionTestCase):
+    def test_parallel_rejected_creates_do_not_lock_database(self):
+        # Отклонённые бронирования сохраняются без блокировки слота;
+        # сохранение ответа не должно упираться в повышение блокировки SQLite
+        service = get_booking_service()
+        errors = run_in_threads(
+            lambda number: service.create_booking(booking_data(number, room_number=str(100 + number % 3))),
+            range(150),
+            threads=32,
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Booking.objects.count(), 150)
+        self.assertEqual(Booking.objects.filter(status='confirmed').count(), 3)
+
+    def test_parallel_confirmations_never_overlap(self):
+        # В режиме authoritative все запросы проходят локальную проверку до того,
+        # как первый запишет бронирование: решает только повторная проверка под блокировкой
+        def remote_check(booking_data):
+            time.sleep(0.02)
+            return AvailabilityService.parse_result({'available': True})
+
+        rng = random.Random(7)
+        payloads = []
+        for number in range(120):
+            start_hour = rng.randint(8, 16)
+            payloads.append(booking_data(
+                number, room_number=str(100 + number % 2),
+                start=f'{start_hour:02d}:{rng.choice(("00", "30"))}', end=f'{start_hour + rng.randint(1, 2):02d}:00',
+            ))
+
+        service = get_booking_service()
+        with override_settings(AVAILABILITY_MODE='authoritative'), \
+                mock.patch.object(service.availability_service, 'check_availability', side_effect=remote_check):
+            errors = run_in_threads(service.create_booking, payloads, threads=32)
+
+        self.assertEqual(errors, [])
+        rows = list(
+            Booking.objects.filter(status='confirmed')
+            .order_by('room_number', 'booking_date', 'start_time')
+            .values_list('id', 'room_number', 'booking_date', 'start_time', 'end_time')
+        )
+        self.assertTrue(rows)
+        self.assertEqual(find_overlaps(rows), [])
+
+
+
+@override_settings(AVAILABILITY_MODE='local', BOOKING_CHECK_MODE='deferred', AVAILABILITY_CACHE={'BACKEND': None})
+class TaskQueueTests(BookingTestMixin, TransactionTestCase):
+    # run_worker закрывает соединение в finally, поэтому без обёртки теста в транзакцию
+    def setUp(self):
+        super().setUp()
+        self.service = get_booking_service()
+        self.booking, _ = self.service.create_booking(booking_data())
+
+    def test_task_cancelled_after_claim_is_skipped(self):
+        tasks = claim_batch('worker-1', 10, 60)
+        # Так отменяет вхождения серии cancel_occurrences
+        Booking.objects.filter(pk=self.booking.pk).update(status='cancelled')
+        AvailabilityCheckTask.objects.filter(booking=self.booking).delete()
+
+        counts = process_batch(tasks, self.service, get_queue_settings())
+
+        self.assertEqual(counts['confirmed'], 0)
+        self.assertEqual(Booking.objects.get(pk=self.booking.pk).status, 'cancelled')
+
+    def test_check_threads_close_their_connections(self):
+        opened = []
+
+        def check_availability(booking_data):
+            # Локальная проверка читает БД из потока пула
+            opened.append(connections[DEFAULT_DB_ALIAS])
+            opened[-1].ensure_connection()
+            return {'success': True, 'available': True}
+
+        with mock.patch.object(self.service, 'check_availability', side_effect=check_availability):
+            process_batch(claim_batch('worker-1', 10, 60), self.service, get_queue_settings())
+
+        self.assertEqual(len(opened), 1)
+        self.assertIsNone(opened[0].connection)
+
+    def test_database_error_is_retried_and_worker_keeps_running(self):
+        with mock.patch('bookings.task_queue._finish', side_effect=OperationalError('database is locked')):
+            totals = run_worker(self.service, mock.Mock(**{'is_set.return_value': False}),
+                                poll_interval=0, exit_when_empty=True)
+
+        self.assertEqual(totals['retried'], 1)
+        task = AvailabilityCheckTask.objects.get(booking=self.booking)
+        self.assertEqual((task.status, task.attempts, task.locked_by), ('queued', 1, ''))
+        self.assertIn('database is locked', task.last_error)
+
+    def test_failed_iteration_releases_claimed_tasks(self):
+        with mock.patch('bookings.task_queue.process_batch', side_effect=[OperationalError('database is locked')]):
+            stop_event = mock.Mock(**{'is_set.side_effect': [False, True]})
+            run_worker(self.service, stop_event, poll_interval=0)
+
+        task = AvailabilityCheckTask.objects.get(booking=self.booking)
+        self.assertEqual((task.status, task.locked_by, task.attempts), ('queued', '', 0))
+
+    def test_bulk_summary_counts_statuses(self):
+        confirmed, result = get_booking_service().save_booking(
+            booking_data(1, room_number='102'), AvailabilityService.parse_result({'available': True}),
+        )
+        summary = BulkCreateBookingView.summarize([(self.booking, {}), (confirmed, result)])
+
+        self.assertEqual((summary['confirmed'], summary['rejected'], summary['pending']), (1, 0, 1))
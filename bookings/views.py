@@ -1,14 +1,21 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
 from django.views.generic import ListView, DetailView
 from datetime import date
 
+from .db_router import ReplicaReadMixin, fresh_reads
+from .http_cache import CacheScope
 from .models import Booking
-from .services import BookingService
+from .pagination import InvalidCursor, keyset_page
+from .search import get_search_backend
+from .services import get_booking_service
+from .stats import booking_stats_service
 
 
-class HomeView(View):
+class HomeView(ReplicaReadMixin, View):
     """
     Главная страница с формой создания бронирования
     """
@@ -37,7 +44,7 @@ class HomeView(View):
             }
 
             # Создаём бронирование через сервис
-            booking_service = BookingService()
+            booking_service = get_booking_service()
             booking, availability_result = booking_service.create_booking(booking_data)
 
             if booking.status == 'confirmed':
@@ -45,6 +52,11 @@ class HomeView(View):
                     request,
                     f'✅ Бронирование успешно подтверждено! Аудитория {booking.room_number} забронирована.'
                 )
+            elif booking.status == 'pending':
+                messages.info(
+                    request,
+                    f'⏳ Бронирование ожидает проверки: {availability_result.get("message", "")}'
+                )
             else:
                 messages.warning(
                     request,
@@ -58,22 +70,48 @@ class HomeView(View):
             return redirect('home')
 
 
-class BookingListView(ListView):
+class BookingListView(ReplicaReadMixin, ListView):
     """
     Список всех бронирований
     """
     model = Booking
     template_name = 'bookings/booking_list.html'
     context_object_name = 'bookings'
-    paginate_by = 20
+    # Keyset-пагинация по (created_at, id) вместо OFFSET, см. get_context_data
+    page_size = 20
+
+    def get(self, request, *args, **kwargs):
+        """
+        Условный GET по состоянию данных бронирований
+
+        Страница содержит CSRF-токен и flash-сообщения, поэтому она не
+        кэшируется на сервере, а только отвечает 304 на повторный опрос
+        того же клиента.
+        """
+        if len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        scope = CacheScope(request, None, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+        response = scope.not_modified(request)
+        if response is None:
+            # Страница получит ETag этого состояния — она не должна быть собрана с отстающей реплики
+            with fresh_reads(scope.changed):
+                response = super().get(request, *args, **kwargs)
+            scope.set_headers(response)
+        return response
 
     def get_queryset(self):
         queryset = Booking.objects.all()
 
-        # Фильтрация по email
+        # Поиск по аудитории, email и цели (bookings/search.py)
+        query = self.request.GET.get('q')
+        if query:
+            queryset = get_search_backend().filter(queryset, query)
+
+        # Фильтрация по подстроке email (см. contains в bookings/search.py)
         user_email = self.request.GET.get('email')
         if user_email:
-            queryset = queryset.filter(user_email__icontains=user_email)
+            queryset = get_search_backend().contains(queryset, 'user_email', user_email)
 
         # Фильтрация по статусу
         status = self.request.GET.get('status')
@@ -88,14 +126,34 @@ class BookingListView(ListView):
         return queryset
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['total_bookings'] = Booking.objects.count()
-        context['confirmed_count'] = Booking.objects.filter(status='confirmed').count()
-        context['rejected_count'] = Booking.objects.filter(status='rejected').count()
+        try:
+            page, next_cursor, previous_cursor = keyset_page(
+                self.object_list, self.request.GET.get('cursor'), self.page_size
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор')
+
+        context = super().get_context_data(object_list=page, **kwargs)
+        context['next_url'] = next_cursor and self._cursor_url(next_cursor)
+        context['previous_url'] = previous_cursor and self._cursor_url(previous_cursor)
+        context['first_url'] = self._cursor_url(None)
+        context['is_paginated'] = bool(next_cursor or previous_cursor)
+        stats = booking_stats_service.get_stats()
+        context['total_bookings'] = stats['total']
+        context['confirmed_count'] = stats['confirmed']
+        context['rejected_count'] = stats['rejected']
         return context
 
+    def _cursor_url(self, cursor):
+        """Ссылка на страницу с сохранением фильтров (cursor=None — первая страница)"""
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        if cursor is not None:
+            params['cursor'] = cursor
+        return f'?{params.urlencode()}'
+
 
-class BookingDetailView(DetailView):
+class BookingDetailView(ReplicaReadMixin, DetailView):
     """
     Детальная информация о бронировании
     """
@@ -62,12 +62,13 @@ def test_list_bookings():
     print("-" * 50)
 
     response = requests.get(f"{BASE_URL}/bookings/")
+    bookings = response.json()['results']
     print(f"Status Code: {response.status_code}")
-    print(f"Количество бронирований: {len(response.json())}")
+    print(f"Количество бронирований на странице: {len(bookings)}")
 
-    if response.json():
+    if bookings:
         print(f"\nПервое бронирование:")
-        print(json.dumps(response.json()[0], indent=2, ensure_ascii=False))
+        print(json.dumps(bookings[0], indent=2, ensure_ascii=False))
 
     return response.status_code == 200
 